@@ -0,0 +1,151 @@
+# als.py
+# ===============================================================
+# FACTORIZACIÓN POR MÍNIMOS CUADRADOS ALTERNADOS (ALS)
+# ===============================================================
+# La SVD trata cada "no vista" como un 0 literal: sesga las predicciones
+# hacia 0 y obliga a trabajar con la matriz completa. ALS ajusta solo las
+# entradas observadas:
+#   min Σ_(u,i observadas) (r_ui - x_u · y_i)² + λ (Σ ||x_u||² + Σ ||y_i||²)
+# Fijando Y, cada x_u es un problema de mínimos cuadrados independiente:
+#   (Y_u^T Y_u + λ I) x_u = Y_u^T r_u       (Y_u = filas de Y que u calificó)
+# y análogamente para cada y_i con X fijo. Se alterna hasta converger.
+#
+# Variante implícita (Hu, Koren y Volinsky): toda la matriz participa con
+# preferencia p_ui = 1 si hubo interacción y confianza c_ui = 1 + α r_ui:
+#   (Y^T Y + Y^T (C_u - I) Y + λ I) x_u = Y^T C_u p_u
+# Y^T Y se calcula una vez por pasada; el resto solo usa lo observado.
+#
+# Los sistemas k x k de un lote de usuarios se arman con un producto de
+# matrices por lotes y se resuelven juntos con np.linalg.solve; los lotes se
+# reparten en un grupo de hilos (NumPy libera el GIL en esas operaciones).
+# El resultado se expresa como (U_k, S_k, Vt_k) con S_k = I, así que sirve
+# directamente para predicciones_svd, iterar_top_n_svd y artefactos.
+# ===============================================================
+
+from concurrent.futures import ThreadPoolExecutor
+import os
+
+import numpy as np
+
+from instrumentacion import medir
+from matriz_calificaciones import como_csr
+
+
+# -------------------------
+# _lotes_por_longitud
+# -------------------------
+# Las filas se ordenan por cantidad de calificaciones y se cortan en lotes
+# consecutivos. Un lote se cierra cuando la fila más larga duplica a la más
+# corta (así el relleno queda por debajo de la mitad del tensor), al llegar
+# a tam_lote filas o al superar ~max_elementos valores (filas x largo x k).
+def _lotes_por_longitud(indptr, k, tam_lote, max_elementos):
+    conteos = np.diff(indptr)
+    orden = np.argsort(conteos, kind="stable")
+    ordenados = conteos[orden]
+    lotes = []
+    ini = 0
+    while ini < len(orden):
+        tope = max(2 * int(ordenados[ini]), 8)
+        fin = min(int(np.searchsorted(ordenados, tope, side="right")), ini + tam_lote)
+        largo = max(int(ordenados[fin - 1]), 1)
+        fin = min(fin, ini + max(max_elementos // (largo * k), 1))
+        lotes.append(orden[ini:fin])
+        ini = fin
+    return lotes
+
+
+# -------------------------
+# _resolver_lote
+# -------------------------
+# Para las filas de un lote de R (CSR) con factores fijos Y:
+#   A_u = base + Σ_i w_ui y_i y_i^T ,   b_u = Σ_i v_ui y_i
+# explícito: w = 1, v = r, base = λI
+# implícito: w = α r, v = 1 + α r, base = Y^T Y + λI
+# Las filas del lote se rellenan hasta la misma longitud L (con peso 0) y
+# todas las A_u salen de un único producto por lotes (b, k, L) @ (b, L, k).
+def _resolver_lote(R, Y, filas, base, implicito, alfa, destino):
+    conteos = R.indptr[filas + 1] - R.indptr[filas]
+    largo = max(int(conteos.max()), 1)
+    posiciones = np.arange(largo)
+    validos = posiciones[None, :] < conteos[:, None]                 # (b, L)
+    planos = np.where(validos, R.indptr[filas][:, None] + posiciones[None, :], 0)
+
+    vals = np.where(validos, R.data[planos], 0.0)
+    Yp = Y[R.indices[planos]] * validos[:, :, None]                   # (b, L, k)
+
+    if implicito:
+        pesos, objetivo = alfa * vals, np.where(validos, 1.0 + alfa * vals, 0.0)
+    else:
+        pesos, objetivo = validos.astype(float), vals
+
+    A = np.matmul((Yp * pesos[:, :, None]).transpose(0, 2, 1), Yp) + base
+    rhs = np.einsum("blk,bl->bk", Yp, objetivo)
+    destino[filas] = np.linalg.solve(A, rhs[:, :, None])[:, :, 0]
+
+
+# -------------------------
+# _pasada
+# -------------------------
+def _pasada(R, Y, X, regularizacion, implicito, alfa, lotes, grupo):
+    k = Y.shape[1]
+    base = regularizacion * np.eye(k)
+    if implicito:
+        base = base + Y.T @ Y
+    tareas = [grupo.submit(_resolver_lote, R, Y, filas, base, implicito, alfa, X) for filas in lotes]
+    for tarea in tareas:
+        tarea.result()
+
+
+# -------------------------
+# rmse_observado
+# -------------------------
+def rmse_observado(calificaciones, U_k, S_k, Vt_k, tam_bloque=1_000_000):
+    """Raíz del error cuadrático medio sobre las entradas observadas."""
+    R = como_csr(calificaciones).tocoo()
+    US = U_k @ S_k
+    error = 0.0
+    for ini in range(0, R.nnz, tam_bloque):
+        f, c, v = R.row[ini:ini + tam_bloque], R.col[ini:ini + tam_bloque], R.data[ini:ini + tam_bloque]
+        pred = np.einsum("ij,ji->i", US[f], Vt_k[:, c])
+        error += float(np.sum((v - pred) ** 2))
+    return float(np.sqrt(error / R.nnz)) if R.nnz else 0.0
+
+
+# -------------------------
+# entrenar_als
+# -------------------------
+def entrenar_als(calificaciones, k=10, regularizacion=0.1, iteraciones=10, implicito=False, alfa=40.0,
+                 hilos=None, tam_lote=2048, max_elementos=1 << 22, semilla=0):
+    """
+    Entrena factores por ALS sobre las entradas observadas.
+    - calificaciones: lista de listas (0 = no vista), np.ndarray, scipy.sparse
+      o MatrizCalificaciones (soporte = observado)
+    - implicito=True: ALS ponderado con confianza 1 + alfa * r
+    - hilos: hilos para resolver lotes en paralelo (por defecto, núcleos)
+    - Devuelve (U_k, S_k, Vt_k, historial): S_k = I (k x k) y historial con el
+      RMSE observado tras cada iteración (vacío en modo implícito, donde el
+      objetivo no es reproducir las calificaciones).
+    """
+    R = como_csr(calificaciones)
+    R.sort_indices()
+    Rt = R.T.tocsr()
+    m, n = R.shape
+
+    rng = np.random.default_rng(semilla)
+    X = rng.standard_normal((m, k)) * 0.01
+    Y = rng.standard_normal((n, k)) * 0.01
+
+    lotes_u = _lotes_por_longitud(R.indptr, k, tam_lote, max_elementos)
+    lotes_i = _lotes_por_longitud(Rt.indptr, k, tam_lote, max_elementos)
+    S_k = np.eye(k)
+
+    historial = []
+    with ThreadPoolExecutor(max_workers=hilos or os.cpu_count() or 1) as grupo:
+        for _ in range(iteraciones):
+            with medir("als.iteracion"):
+                _pasada(R, Y, X, regularizacion, implicito, alfa, lotes_u, grupo)
+                _pasada(Rt, X, Y, regularizacion, implicito, alfa, lotes_i, grupo)
+            if not implicito:
+                historial.append(rmse_observado(R, X, S_k, Y.T))
+
+    return X, S_k, Y.T.copy(), historial
@@ -0,0 +1,258 @@
+# artefactos.py
+# ===============================================================
+# ARTEFACTOS DE MODELO EN DISCO (VERSIONADOS, MAPEADOS EN MEMORIA)
+# ===============================================================
+# El entrenamiento escribe una sola vez un directorio con:
+#   - un archivo .npy por arreglo (U_k, s, Vt_k, normas, vecinos, ...)
+#     y, para matrices dispersas, sus tres arreglos CSR
+#   - ids.json con los mapas de identificadores (usuarios, películas)
+#   - manifiesto.json: versión de formato, formas, tipos, sha256 y metadatos
+# Los procesos de servicio lo abren con np.load(mmap_mode="r"): no se lee
+# el contenido al arrancar y todos los procesos comparten las mismas
+# páginas del caché del sistema operativo en lugar de una copia cada uno.
+# ===============================================================
+
+import hashlib
+import json
+import os
+import re
+import shutil
+import tempfile
+import time
+
+import numpy as np
+import scipy.sparse as sp
+
+from matriz_calificaciones import MatrizCalificaciones, como_csr
+
+VERSION_FORMATO = 1
+MANIFIESTO = "manifiesto.json"
+IDS = "ids.json"
+
+
+# -------------------------
+# _sha256
+# -------------------------
+def _sha256(ruta, tam_bloque=1 << 20):
+    h = hashlib.sha256()
+    with open(ruta, "rb") as f:
+        for trozo in iter(lambda: f.read(tam_bloque), b""):
+            h.update(trozo)
+    return h.hexdigest()
+
+
+# -------------------------
+# Modelo
+# -------------------------
+class Modelo:
+    """
+    Artefacto cargado.
+    - arreglos: dict nombre -> np.memmap (o csr_matrix sobre memmaps)
+    - ids: dict nombre -> lista de identificadores
+    - metadatos: dict libre escrito por el entrenamiento
+    - version: versión de formato del directorio
+    """
+
+    def __init__(self, arreglos, ids, metadatos, version):
+        self.arreglos = arreglos
+        self.ids = ids
+        self.metadatos = metadatos
+        self.version = version
+
+    def __getitem__(self, nombre):
+        return self.arreglos[nombre]
+
+    def __contains__(self, nombre):
+        return nombre in self.arreglos
+
+
+# -------------------------
+# guardar_modelo
+# -------------------------
+# Cada escritura crea una versión nueva en un directorio oculto junto al
+# destino (".<nombre>.v<marca>-...") y el destino es un enlace simbólico
+# que se reapunta con os.replace (atómico en POSIX): un lector ve la
+# versión anterior completa o la nueva completa, nunca un artefacto a
+# medio escribir ni la ausencia del artefacto. Se conservan las últimas
+# `conservar` versiones para que un lector que ya abrió la anterior
+# termine de cargarla.
+def guardar_modelo(directorio, arreglos, ids=None, metadatos=None, conservar=2):
+    """
+    Escribe un artefacto versionado.
+    - arreglos: dict nombre -> np.ndarray o matriz scipy.sparse
+    - ids: dict nombre -> secuencia de identificadores (serializables en JSON)
+    - metadatos: dict serializable en JSON (k, energía, fecha de datos, ...)
+    - conservar: versiones que quedan en disco, incluida la nueva (>= 1)
+    - Si el destino ya existe y no es un artefacto (sin manifiesto), se
+      lanza ValueError en lugar de borrarlo.
+    """
+    if conservar < 1:
+        raise ValueError("conservar debe ser >= 1")
+    directorio = os.path.abspath(directorio)
+    padre, base = os.path.split(directorio)
+    os.makedirs(padre, exist_ok=True)
+    anterior = _version_publicada(directorio)
+
+    temporal = tempfile.mkdtemp(prefix=f".{base}.v{time.time_ns():020d}-", dir=padre)
+    try:
+        entradas = {}
+        for nombre, valor in arreglos.items():
+            if sp.issparse(valor):
+                csr = sp.csr_matrix(valor)
+                partes = {"data": csr.data, "indices": csr.indices, "indptr": csr.indptr}
+                entradas[nombre] = {"tipo": "csr", "forma": list(csr.shape),
+                                    "partes": {p: _escribir(temporal, f"{nombre}.{p}", a) for p, a in partes.items()}}
+            else:
+                entradas[nombre] = {"tipo": "denso", **_escribir(temporal, nombre, np.asarray(valor))}
+
+        if ids:
+            with open(os.path.join(temporal, IDS), "w", encoding="utf-8") as f:
+                json.dump({n: np.asarray(v).tolist() for n, v in ids.items()}, f)
+
+        manifiesto = {
+            "version": VERSION_FORMATO,
+            "creado": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "arreglos": entradas,
+            "ids_sha256": _sha256(os.path.join(temporal, IDS)) if ids else None,
+            "metadatos": metadatos or {},
+        }
+        with open(os.path.join(temporal, MANIFIESTO), "w", encoding="utf-8") as f:
+            json.dump(manifiesto, f, indent=2)
+
+        # mkdtemp crea el directorio con 0700: los procesos de servicio de
+        # otro usuario no podrían abrir los arreglos
+        os.chmod(temporal, 0o755 & ~_umask())
+        _publicar(directorio, os.path.basename(temporal), anterior)
+    except BaseException:
+        shutil.rmtree(temporal, ignore_errors=True)
+        raise
+
+    _podar_versiones(padre, base, conservar, os.path.basename(temporal))
+
+
+def _umask():
+    actual = os.umask(0)
+    os.umask(actual)
+    return actual
+
+
+# Qué hay hoy en el destino: None (nada), "enlace" (versión publicada por
+# guardar_modelo) o "directorio" (artefacto escrito en el lugar, formato
+# anterior). Cualquier otra cosa no se toca.
+def _version_publicada(directorio):
+    if os.path.islink(directorio):
+        if not os.path.exists(os.path.join(directorio, MANIFIESTO)):
+            raise ValueError(f"{directorio} apunta a algo que no es un artefacto (falta {MANIFIESTO})")
+        return "enlace"
+    if not os.path.exists(directorio):
+        return None
+    if not os.path.isdir(directorio) or not os.path.exists(os.path.join(directorio, MANIFIESTO)):
+        raise ValueError(f"{directorio} existe y no es un artefacto (falta {MANIFIESTO}); no se reemplaza")
+    return "directorio"
+
+
+def _publicar(directorio, version, anterior):
+    padre, base = os.path.split(directorio)
+    enlace = os.path.join(padre, f".{base}.enlace-{os.getpid()}-{time.time_ns()}")
+    os.symlink(version, enlace)   # relativo: el artefacto sigue valiendo si se mueve el padre
+    try:
+        if anterior == "directorio":
+            # un directorio no se puede reemplazar por un enlace de una vez:
+            # se aparta primero (no se borra nada hasta que la nueva versión
+            # está publicada)
+            apartado = tempfile.mkdtemp(prefix=f".{base}.anterior-", dir=padre)
+            os.replace(directorio, os.path.join(apartado, base))
+            os.replace(enlace, directorio)
+            shutil.rmtree(apartado, ignore_errors=True)
+        else:
+            os.replace(enlace, directorio)
+    except BaseException:
+        if os.path.lexists(enlace):
+            os.unlink(enlace)
+        raise
+
+
+# Solo las versiones de este artefacto: ".m.v<20 dígitos>-..." y no las de
+# otro cuyo nombre empiece igual (".m.v2.v<20 dígitos>-..." es de "m.v2").
+def _podar_versiones(padre, base, conservar, actual):
+    patron = re.compile(rf"\.{re.escape(base)}\.v\d{{20}}-")
+    versiones = sorted(n for n in os.listdir(padre) if patron.match(n) and n != actual)
+    for nombre in versiones[:max(len(versiones) - (conservar - 1), 0)]:
+        shutil.rmtree(os.path.join(padre, nombre), ignore_errors=True)
+
+
+def _escribir(directorio, nombre, arreglo):
+    archivo = f"{nombre}.npy"
+    ruta = os.path.join(directorio, archivo)
+    np.save(ruta, np.ascontiguousarray(arreglo), allow_pickle=False)
+    return {"archivo": archivo, "forma": list(arreglo.shape), "dtype": arreglo.dtype.str, "sha256": _sha256(ruta)}
+
+
+# -------------------------
+# cargar_modelo
+# -------------------------
+def cargar_modelo(directorio, verificar=False):
+    """
+    Abre un artefacto sin copiar sus arreglos a memoria (np.memmap de solo lectura).
+    - verificar=True recalcula los sha256 (lee todo: solo para auditoría,
+      no en el arranque normal del servicio)
+    """
+    # se resuelve el enlace una sola vez: si guardar_modelo publica otra
+    # versión mientras se carga, manifiesto y arreglos siguen siendo de la misma
+    directorio = os.path.realpath(directorio)
+    with open(os.path.join(directorio, MANIFIESTO), encoding="utf-8") as f:
+        manifiesto = json.load(f)
+    if manifiesto.get("version") != VERSION_FORMATO:
+        raise ValueError(f"Versión de artefacto no soportada: {manifiesto.get('version')!r}")
+
+    def abrir(entrada):
+        ruta = os.path.join(directorio, entrada["archivo"])
+        if verificar and _sha256(ruta) != entrada["sha256"]:
+            raise ValueError(f"Suma de verificación incorrecta: {entrada['archivo']}")
+        return np.load(ruta, mmap_mode="r", allow_pickle=False)
+
+    arreglos = {}
+    for nombre, entrada in manifiesto["arreglos"].items():
+        if entrada["tipo"] == "csr":
+            p = {parte: abrir(e) for parte, e in entrada["partes"].items()}
+            arreglos[nombre] = sp.csr_matrix((p["data"], p["indices"], p["indptr"]),
+                                             shape=tuple(entrada["forma"]), copy=False)
+        else:
+            arreglos[nombre] = abrir(entrada)
+
+    ids = {}
+    ruta_ids = os.path.join(directorio, IDS)
+    if os.path.exists(ruta_ids):
+        if verificar and _sha256(ruta_ids) != manifiesto["ids_sha256"]:
+            raise ValueError(f"Suma de verificación incorrecta: {IDS}")
+        with open(ruta_ids, encoding="utf-8") as f:
+            ids = json.load(f)
+
+    return Modelo(arreglos, ids, manifiesto["metadatos"], manifiesto["version"])
+
+
+# -------------------------
+# guardar_svd / cargar_svd
+# -------------------------
+# Atajos para el modelo SVD: factores, calificaciones observadas (para
+# excluir películas vistas al recomendar) e ids si la matriz los tiene.
+def guardar_svd(directorio, U_k, S_k, Vt_k, calificaciones=None, metadatos=None, **extras):
+    """
+    Guarda U_k, s (diagonal de S_k), Vt_k y opcionalmente la matriz observada
+    y arreglos adicionales (normas, vecinos_idx, vecinos_sim, ...).
+    """
+    arreglos = {"U_k": U_k, "s": np.diag(S_k), "Vt_k": Vt_k, **extras}
+    ids = None
+    if calificaciones is not None:
+        arreglos["calificaciones"] = como_csr(calificaciones)
+        if isinstance(calificaciones, MatrizCalificaciones):
+            ids = {"usuarios": calificaciones.usuarios, "items": calificaciones.items}
+    guardar_modelo(directorio, arreglos, ids, {"modelo": "svd", "k": int(S_k.shape[0]), **(metadatos or {})})
+
+
+def cargar_svd(directorio, verificar=False):
+    """
+    Devuelve (U_k, S_k, Vt_k, modelo): U_k y Vt_k mapeados, S_k diagonal (k x k).
+    """
+    modelo = cargar_modelo(directorio, verificar)
+    return modelo["U_k"], np.diag(modelo["s"]), modelo["Vt_k"], modelo
@@ -0,0 +1,354 @@
+# benchmark.py
+# ===============================================================
+# BANCO DE PRUEBAS DE RENDIMIENTO (DATOS SINTÉTICOS A ESCALA)
+# ===============================================================
+# main.py usa una matriz 5x5 que sirve para explicar, no para medir.
+# Aquí se generan datos sintéticos con la forma de un catálogo real:
+#  - popularidad de películas y actividad de usuarios con ley de potencias
+#    (pocas películas concentran la mayoría de las calificaciones)
+#  - densidad y dimensión de características configurables
+# y se cronometran las rutas silenciosas de los tres recomendadores:
+#   colaborativo: vecinos (similitud), predicción por lote, top-N
+#   contenido:    similitud contra todas, top-N con IndicePeliculas
+#                 ("exacto", "lsh" e "ivf", con su recall@N frente al exacto)
+#   SVD:          factorización (aleatoria y ALS), predicción, top-N
+# y, para un usuario o una película, cada función *_detalle (con Traza,
+# sin imprimir) junto a su ruta silenciosa: la diferencia es el costo de
+# construir la explicación, que la ruta de producción no paga.
+# Los índices aproximados no siempre ganan: con pocas características
+# binarias (como las sintéticas) muchas películas comparten vector, los
+# cubos LSH se llenan y re-puntuar sus candidatos cuesta más que el
+# producto exacto; el recall se reporta junto a la latencia para ver el
+# compromiso en cada escala.
+# Por operación se reporta latencia p50/p99, rendimiento (unidades por
+# segundo) y memoria pico (tracemalloc, en una ejecución aparte para no
+# distorsionar los tiempos). El resultado se escribe en JSON junto con las
+# versiones y el commit, para comparar corridas con --comparar.
+#
+# Uso:
+#   python benchmark.py --usuarios 1000 10000 --items 2000 --densidad 0.01
+#   python benchmark.py --comparar antes.json despues.json
+# ===============================================================
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import scipy
+import scipy.sparse as sp
+
+from als import entrenar_als
+from colaborativo import (detalle_similitudes_usuario, predecir_colaborativo, predecir_colaborativo_detalle,
+                          predecir_colaborativo_lote, similitudes_usuario, vecinos_coseno, vecinos_usuario)
+from contenido import IndicePeliculas, detalle_similitud_peliculas, medir_recall_latencia, similitud_peliculas
+from matriz_calificaciones import MatrizCalificaciones, normas_filas
+from svd_system import iterar_top_n_svd, predicciones_svd, predicciones_svd_detalle, reconstruir_svd, svd_truncada
+from topk import top_k_filas
+from traza import Traza
+
+
+# -------------------------
+# _muestra_potencia
+# -------------------------
+# Posiciones en [0, n) con P(i) ∝ (i + 1)^(-exponente); exponente = 0 es
+# uniforme. Las posiciones se barajan para que la popularidad no quede
+# correlacionada con el índice.
+def _muestra_potencia(n, tamano, exponente, rng):
+    pesos = np.arange(1, n + 1, dtype=float) ** (-exponente)
+    acumulada = np.cumsum(pesos)
+    posiciones = np.searchsorted(acumulada, rng.random(tamano) * acumulada[-1])
+    return rng.permutation(n)[np.minimum(posiciones, n - 1)]
+
+
+# -------------------------
+# generar_calificaciones
+# -------------------------
+def generar_calificaciones(n_usuarios, n_items, densidad=0.01, exponente=1.0, semilla=0):
+    """
+    MatrizCalificaciones sintética (valores enteros 1..5).
+    - densidad: fracción objetivo de celdas observadas; con ley de potencias
+      los pares repetidos se descartan, así que la densidad real es algo menor
+      (se informa en MatrizCalificaciones.densidad)
+    - exponente: sesgo de popularidad de películas y de actividad de usuarios
+    """
+    rng = np.random.default_rng(semilla)
+    nnz = int(densidad * n_usuarios * n_items)
+    filas = _muestra_potencia(n_usuarios, nnz, exponente, rng)
+    cols = _muestra_potencia(n_items, nnz, exponente, rng)
+
+    claves = np.unique(filas.astype(np.int64) * n_items + cols)
+    filas, cols = claves // n_items, claves % n_items
+    valores = rng.integers(1, 6, len(claves)).astype(float)
+    csr = sp.csr_matrix((valores, (filas, cols)), shape=(n_usuarios, n_items))
+    return MatrizCalificaciones(csr, list(range(n_usuarios)), list(range(n_items)))
+
+
+# -------------------------
+# generar_caracteristicas
+# -------------------------
+def generar_caracteristicas(n_items, dim=32, proporcion=0.1, semilla=0):
+    """
+    Matriz (n_items x dim) de rasgos presentes/ausentes, como en main.py;
+    cada rasgo está presente con probabilidad proporcion.
+    """
+    rng = np.random.default_rng(semilla)
+    return (rng.random((n_items, dim)) < proporcion).astype(float)
+
+
+# -------------------------
+# _medir
+# -------------------------
+def _percentil_ms(tiempos, q):
+    return 1e3 * float(np.percentile(tiempos, q))
+
+
+def _medir(funcion, argumentos, unidades, repeticiones, calentamiento=1):
+    """
+    Ejecuta funcion(*args) para cada args de argumentos (cíclicamente) y
+    devuelve latencias, rendimiento y memoria pico.
+    - unidades: trabajo hecho por llamada (usuarios, consultas, ...)
+    """
+    argumentos = list(argumentos)
+    for i in range(calentamiento):
+        funcion(*argumentos[i % len(argumentos)])
+
+    tiempos = []
+    for i in range(repeticiones):
+        t0 = time.perf_counter()
+        funcion(*argumentos[i % len(argumentos)])
+        tiempos.append(time.perf_counter() - t0)
+
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        funcion(*argumentos[0])
+        pico = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    tiempos = np.asarray(tiempos)
+    return {
+        "repeticiones": repeticiones,
+        "unidades_por_llamada": unidades,
+        "latencia_p50_ms": _percentil_ms(tiempos, 50),
+        "latencia_p99_ms": _percentil_ms(tiempos, 99),
+        "latencia_media_ms": 1e3 * float(tiempos.mean()),
+        "rendimiento_por_s": unidades / float(tiempos.mean()) if tiempos.mean() > 0 else float("inf"),
+        "memoria_pico_mb": pico / 2 ** 20,
+    }
+
+
+def _agotar(generador):
+    for _ in generador:
+        pass
+
+
+def _top_n_colaborativo(R, usuarios, vecinos_idx, vecinos_sim, n):
+    preds, predecible = predecir_colaborativo_lote(R, usuarios, vecinos_idx, vecinos_sim)
+    preds[~predecible] = -np.inf
+    return top_k_filas(preds, n)
+
+
+# -------------------------
+# _casos_detalle
+# -------------------------
+# Pares (detalle, silenciosa) sobre los mismos argumentos, para un usuario
+# o una película por llamada. Las rutas detalladas recorren todos los
+# usuarios o películas en Python: se miden pocas llamadas.
+def _casos_detalle(matriz, caracteristicas, U_k, S_k, Vt_k, usuarios, peliculas, k, llamadas):
+    R = matriz.csr
+    nombres_u, nombres_p = [str(u) for u in matriz.usuarios], [str(i) for i in matriz.items]
+    vecinos = {u: vecinos_usuario(R, u, k).tolist() for (u,) in usuarios}
+    normas = normas_filas(caracteristicas)
+    return [
+        ("colaborativo", "similitud_detalle",
+         lambda u: detalle_similitudes_usuario(R, nombres_u, u, traza=Traza()), usuarios, 1, llamadas),
+        ("colaborativo", "similitud_silenciosa", lambda u: similitudes_usuario(R, u), usuarios, 1, llamadas),
+        ("colaborativo", "prediccion_detalle",
+         lambda u: predecir_colaborativo_detalle(R, nombres_u, nombres_p, u, vecinos[u], traza=Traza()),
+         usuarios, 1, llamadas),
+        ("colaborativo", "prediccion_silenciosa", lambda u: predecir_colaborativo(R, u, vecinos[u]),
+         usuarios, 1, llamadas),
+        ("contenido", "similitud_detalle",
+         lambda i: detalle_similitud_peliculas(caracteristicas, i, nombres_p, traza=Traza()), peliculas, 1, llamadas),
+        ("contenido", "similitud_silenciosa", lambda i: similitud_peliculas(caracteristicas, i, normas=normas),
+         peliculas, 1, llamadas),
+        ("svd", "prediccion_detalle", lambda u: predicciones_svd_detalle(U_k, S_k, Vt_k, R, u, traza=Traza()),
+         usuarios, 1, llamadas),
+        ("svd", "prediccion_silenciosa", lambda u: predicciones_svd(U_k, S_k, Vt_k, R, u), usuarios, 1, llamadas),
+    ]
+
+
+# -------------------------
+# medir_escala
+# -------------------------
+def medir_escala(n_usuarios, n_items, densidad=0.01, dim=32, exponente=1.0, k=20, factores=16,
+                 n=10, lote=256, consultas=50, repeticiones=5, semilla=0, detalle=True):
+    """
+    Mide todas las operaciones para una escala y devuelve una lista de
+    registros {sistema, operacion, ...métricas}.
+    - detalle: también las funciones *_detalle frente a sus rutas silenciosas
+    """
+    rng = np.random.default_rng(semilla)
+    matriz = generar_calificaciones(n_usuarios, n_items, densidad, exponente, semilla)
+    caracteristicas = generar_caracteristicas(n_items, dim, semilla=semilla)
+    R = matriz.csr
+    lote = min(lote, n_usuarios)
+    lotes = [(rng.choice(n_usuarios, lote, replace=False),) for _ in range(repeticiones)]
+    peliculas = [(int(i),) for i in rng.choice(n_items, min(consultas, n_items), replace=False)]
+
+    vecinos_idx, vecinos_sim = vecinos_coseno(R, k, lotes[0][0])
+    U_k, S_k, Vt_k, _ = svd_truncada(R, factores, semilla=semilla)
+    normas = normas_filas(caracteristicas)
+    indices = {metodo: IndicePeliculas(caracteristicas, metodo, semilla=semilla) for metodo in IndicePeliculas.METODOS}
+
+    # (sistema, operación, función, argumentos por llamada, unidades, llamadas)
+    pesadas = max(1, repeticiones // 2)
+    casos = [
+        ("colaborativo", "similitud", lambda u: vecinos_coseno(R, k, u), lotes, lote, repeticiones),
+        ("colaborativo", "prediccion", lambda u: predecir_colaborativo_lote(R, u, vecinos_idx, vecinos_sim),
+         lotes[:1], lote, repeticiones),
+        ("colaborativo", "top_n", lambda u: _top_n_colaborativo(R, u, vecinos_idx, vecinos_sim, n),
+         lotes[:1], lote, repeticiones),
+        ("contenido", "similitud", lambda i: similitud_peliculas(caracteristicas, i, normas=normas),
+         peliculas, 1, len(peliculas)),
+        ("contenido", "top_n", lambda i: indices["exacto"].consultar(i, n), peliculas, 1, len(peliculas)),
+        ("contenido", "top_n_lsh", lambda i: indices["lsh"].consultar(i, n), peliculas, 1, len(peliculas)),
+        ("contenido", "top_n_ivf", lambda i: indices["ivf"].consultar(i, n), peliculas, 1, len(peliculas)),
+        ("svd", "factorizacion", lambda: svd_truncada(R, factores, semilla=semilla), [()], n_usuarios, pesadas),
+        ("svd", "factorizacion_als", lambda: entrenar_als(R, factores, iteraciones=3, semilla=semilla),
+         [()], n_usuarios, pesadas),
+        ("svd", "prediccion", lambda u: reconstruir_svd(U_k, S_k, Vt_k, u), lotes, lote, repeticiones),
+        ("svd", "top_n", lambda u: _agotar(iterar_top_n_svd(U_k, S_k, Vt_k, R, u, n)), lotes, lote, repeticiones),
+    ]
+    if detalle:
+        usuarios = [(int(u),) for u in lotes[0][0][:pesadas]]
+        casos += _casos_detalle(matriz, caracteristicas, U_k, S_k, Vt_k, usuarios, peliculas[:pesadas], k, pesadas)
+
+    escala = {"usuarios": n_usuarios, "items": n_items, "densidad": densidad,
+              "densidad_real": matriz.densidad, "nnz": matriz.nnz, "dim": dim, "exponente": exponente}
+    # recall@n de cada índice frente a similitud_peliculas
+    recall = {f"top_n_{m}" if m != "exacto" else "top_n":
+              medir_recall_latencia(indice, caracteristicas, [i for (i,) in peliculas], n)["recall"]
+              for m, indice in indices.items()}
+
+    resultados = []
+    for sistema, operacion, funcion, argumentos, unidades, llamadas in casos:
+        metricas = _medir(funcion, argumentos, unidades, llamadas)
+        if sistema == "contenido" and operacion in recall:
+            metricas["recall"] = recall[operacion]
+        resultados.append({"sistema": sistema, "operacion": operacion, **escala, **metricas})
+    return resultados
+
+
+# -------------------------
+# entorno
+# -------------------------
+def entorno():
+    """Versiones y commit actuales, para comparar corridas entre versiones."""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                check=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "fecha": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "scipy": scipy.__version__,
+        "plataforma": platform.platform(),
+        "procesador": platform.processor() or platform.machine(),
+    }
+
+
+# -------------------------
+# comparar
+# -------------------------
+# Empareja registros por (sistema, operación, usuarios, items) y reporta la
+# razón de latencia p50 (despues / antes): < 1 es una mejora.
+def comparar(antes, despues):
+    def clave(r):
+        return r["sistema"], r["operacion"], r["usuarios"], r["items"]
+
+    base = {clave(r): r for r in antes["resultados"]}
+    filas = []
+    for r in despues["resultados"]:
+        previo = base.get(clave(r))
+        if previo and previo["latencia_p50_ms"] > 0:
+            filas.append((*clave(r), previo["latencia_p50_ms"], r["latencia_p50_ms"],
+                          r["latencia_p50_ms"] / previo["latencia_p50_ms"]))
+    return filas
+
+
+def _imprimir_resultados(resultados):
+    print(f"{'sistema':<13}{'operacion':<23}{'usuarios':>9}{'items':>8}{'p50 ms':>11}{'p99 ms':>11}"
+          f"{'unid/s':>13}{'pico MB':>10}{'recall':>8}")
+    for r in resultados:
+        recall = f"{r['recall']:>8.3f}" if "recall" in r else ""
+        print(f"{r['sistema']:<13}{r['operacion']:<23}{r['usuarios']:>9}{r['items']:>8}"
+              f"{r['latencia_p50_ms']:>11.3f}{r['latencia_p99_ms']:>11.3f}"
+              f"{r['rendimiento_por_s']:>13.1f}{r['memoria_pico_mb']:>10.1f}{recall}")
+
+
+def _imprimir_comparacion(filas):
+    print(f"{'sistema':<13}{'operacion':<23}{'usuarios':>9}{'items':>8}{'antes ms':>11}{'despues ms':>11}{'razon':>8}")
+    for sistema, operacion, usuarios, items, antes, despues, razon in filas:
+        print(f"{sistema:<13}{operacion:<23}{usuarios:>9}{items:>8}{antes:>11.3f}{despues:>11.3f}{razon:>8.2f}")
+
+
+# -------------------------
+# Línea de comandos
+# -------------------------
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Banco de pruebas de los recomendadores")
+    parser.add_argument("--usuarios", type=int, nargs="+", default=[1_000, 10_000])
+    parser.add_argument("--items", type=int, nargs="+", default=[2_000])
+    parser.add_argument("--densidad", type=float, default=0.01)
+    parser.add_argument("--dim", type=int, default=32, help="dimensión de características")
+    parser.add_argument("--exponente", type=float, default=1.0, help="sesgo de popularidad (0 = uniforme)")
+    parser.add_argument("--k", type=int, default=20, help="vecinos colaborativos")
+    parser.add_argument("--factores", type=int, default=16, help="factores latentes SVD / ALS")
+    parser.add_argument("--n", type=int, default=10, help="tamaño del top-N")
+    parser.add_argument("--lote", type=int, default=256, help="usuarios por llamada en lote")
+    parser.add_argument("--consultas", type=int, default=50, help="consultas de contenido")
+    parser.add_argument("--repeticiones", type=int, default=5)
+    parser.add_argument("--semilla", type=int, default=0)
+    parser.add_argument("--sin-detalle", action="store_true",
+                        help="no medir las funciones *_detalle frente a las silenciosas")
+    parser.add_argument("--salida", default="benchmark.json", help="archivo JSON de resultados")
+    parser.add_argument("--comparar", nargs=2, metavar=("ANTES", "DESPUES"),
+                        help="compara dos archivos de resultados y termina")
+    args = parser.parse_args(argv)
+
+    if args.comparar:
+        with open(args.comparar[0], encoding="utf-8") as f:
+            antes = json.load(f)
+        with open(args.comparar[1], encoding="utf-8") as f:
+            despues = json.load(f)
+        _imprimir_comparacion(comparar(antes, despues))
+        return 0
+
+    resultados = []
+    for n_items in args.items:
+        for n_usuarios in args.usuarios:
+            resultados.extend(medir_escala(n_usuarios, n_items, args.densidad, args.dim, args.exponente,
+                                           args.k, args.factores, args.n, args.lote, args.consultas,
+                                           args.repeticiones, args.semilla, not args.sin_detalle))
+
+    informe = {"entorno": entorno(), "parametros": vars(args), "resultados": resultados}
+    with open(args.salida, "w", encoding="utf-8") as f:
+        json.dump(informe, f, indent=2)
+    _imprimir_resultados(resultados)
+    print(f"\nResultados escritos en {args.salida}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -9,6 +9,14 @@
 
 import math
 
+import numpy as np
+import scipy.sparse as sp
+
+from instrumentacion import instrumentar, medir
+from matriz_calificaciones import como_matriz, filas_por_bloque, forma_matriz, observadas_fila
+from topk import top_k, top_k_filas
+from traza import salida_para
+
 # -------------------------
 # Producto punto (a · b)
 # -------------------------
@@ -76,28 +84,34 @@ def similitud_coseno(a, b):
 # Razonamiento algebraico:
 # - Restringir a índices comunes es equivalente a proyectar los vectores
 #   originales sobre la subbase formada por las coordenadas compartidas.
-def detalle_similitudes_usuario(calificaciones, usuarios, usuario_index):
-    usuario_actual = calificaciones[usuario_index]
+def detalle_similitudes_usuario(calificaciones, usuarios, usuario_index, traza=None):
+    # Sin traza se imprime cada paso; con traza se registra en ella.
+    salida = salida_para(traza, "detalle_similitudes_usuario")
+
+    # Solo lo observado: {película: calificación}. Acepta listas, np.ndarray,
+    # scipy.sparse o MatrizCalificaciones sin densificar la matriz.
+    usuario_actual = observadas_fila(calificaciones, usuario_index)
     nombre_actual = usuarios[usuario_index]
 
-    print(f"Calculando similitudes completas para: {nombre_actual}\n")
+    salida(f"Calculando similitudes completas para: {nombre_actual}\n")
     resultados = []
 
     # Recorremos todos los usuarios (filas de la matriz de calificaciones)
-    for i, otro in enumerate(calificaciones):
+    for i in range(forma_matriz(calificaciones)[0]):
         if i == usuario_index:
             continue
 
+        otro = observadas_fila(calificaciones, i)
         nombre_otro = usuarios[i]
 
         # 1) Índices comunes: solo consideramos coordenadas donde ambos tienen datos.
         #    Matemáticamente: intersección de soportes (support) de los vectores.
-        indices_comunes = [j for j in range(len(usuario_actual)) if usuario_actual[j] != 0 and otro[j] != 0]
+        indices_comunes = sorted(usuario_actual.keys() & otro.keys())
 
-        print(f"--- {nombre_actual} vs {nombre_otro} ---")
+        salida(f"--- {nombre_actual} vs {nombre_otro} ---")
         if not indices_comunes:
             # Si no hay intersección, el coseno no es aplicable: similitud 0.
-            print("  No hay películas en común.\n")
+            salida("  No hay películas en común.\n")
             resultados.append((i, 0.0, None, None))
             continue
 
@@ -106,29 +120,29 @@ def detalle_similitudes_usuario(calificaciones, usuarios, usuario_index):
         vec_a = [usuario_actual[j] for j in indices_comunes]
         vec_b = [otro[j] for j in indices_comunes]
 
-        print(f"  Índices comunes: {indices_comunes}")
-        print(f"  Vector {nombre_actual}: {vec_a}")
-        print(f"  Vector {nombre_otro}: {vec_b}")
+        salida(f"  Índices comunes: {indices_comunes}")
+        salida(f"  Vector {nombre_actual}: {vec_a}")
+        salida(f"  Vector {nombre_otro}: {vec_b}")
 
         # 3) Producto punto entre los sub-vectores.
         #    Matématicamente: Σ vec_a[k]*vec_b[k]. Aquí mostramos sumandos para transparencia.
         dot = producto_punto(vec_a, vec_b)
         sumandos = " + ".join(f"{x}*{y}" for x, y in zip(vec_a, vec_b))
-        print(f"  Producto punto = {sumandos} = {dot}")
+        salida(f"  Producto punto = {sumandos} = {dot}")
 
         # 4) Magnitudes (normas) de los sub-vectores.
         #    Interpretación: factor de escala para convertir producto punto en cos(θ).
         mag_a = magnitud_vector(vec_a)
         mag_b = magnitud_vector(vec_b)
-        print(f"  Magnitud {nombre_actual} = sqrt(" + " + ".join(f"{x}^2" for x in vec_a) + f") = {mag_a:.12f}")
-        print(f"  Magnitud {nombre_otro} = sqrt(" + " + ".join(f"{x}^2" for x in vec_b) + f") = {mag_b:.12f}")
+        salida(f"  Magnitud {nombre_actual} = sqrt(" + " + ".join(f"{x}^2" for x in vec_a) + f") = {mag_a:.12f}")
+        salida(f"  Magnitud {nombre_otro} = sqrt(" + " + ".join(f"{x}^2" for x in vec_b) + f") = {mag_b:.12f}")
 
         denom = mag_a * mag_b
-        print(f"  Denominador (||a|| * ||b||) = {mag_a:.12f} * {mag_b:.12f} = {denom:.12f}")
+        salida(f"  Denominador (||a|| * ||b||) = {mag_a:.12f} * {mag_b:.12f} = {denom:.12f}")
 
         # 5) Similitud coseno y guardado del resultado.
         sim = dot / denom if denom != 0 else 0.0
-        print(f"  Similitud coseno = {dot} / {denom:.12f} = {sim:.12f}\n")
+        salida(f"  Similitud coseno = {dot} / {denom:.12f} = {sim:.12f}\n")
 
         # Guardamos: índice del usuario, similitud y los sub-vectores (útil para depuración)
         resultados.append((i, sim, vec_a, vec_b))
@@ -145,49 +159,310 @@ def detalle_similitudes_usuario(calificaciones, usuarios, usuario_index):
 # Interpretación lineal: la predicción es un estimador lineal que combina
 # las calificaciones observadas por vecinos ponderadas por su "proyección"
 # (similitud) sobre el usuario objetivo.
-def predecir_colaborativo_detalle(calificaciones, usuarios, peliculas, usuario_index, usuarios_similares):
-    usuario_actual = calificaciones[usuario_index]
-    print(f"Predicciones detalladas para {usuarios[usuario_index]}:\n")
+def predecir_colaborativo_detalle(calificaciones, usuarios, peliculas, usuario_index, usuarios_similares, traza=None):
+    salida = salida_para(traza, "predecir_colaborativo_detalle")
+    usuario_actual = observadas_fila(calificaciones, usuario_index)
+    salida(f"Predicciones detalladas para {usuarios[usuario_index]}:\n")
 
     predicciones = [None] * len(peliculas)
 
+    # Filas observadas de los vecinos (se extraen una sola vez)
+    vistas_vecinos = {otro_idx: observadas_fila(calificaciones, otro_idx) for otro_idx, _ in usuarios_similares}
+
     # Recorremos todas las películas (coordenadas)
     for pelicula_idx in range(len(peliculas)):
         # Si el usuario ya la vio, no predecimos: conservamos la observación.
-        if usuario_actual[pelicula_idx] != 0:
-            print(f" - {peliculas[pelicula_idx]}: ya vista (calif={usuario_actual[pelicula_idx]})")
+        if pelicula_idx in usuario_actual:
+            salida(f" - {peliculas[pelicula_idx]}: ya vista (calif={usuario_actual[pelicula_idx]})")
             continue
 
-        print(f"\nCalculando predicción para: {peliculas[pelicula_idx]}")
+        salida(f"\nCalculando predicción para: {peliculas[pelicula_idx]}")
 
         suma_ponderada = 0.0  # Σ sim(u,v) * rating_v(item)
         suma_sim = 0.0        # Σ sim(u,v)
 
         # Iteramos sobre vecinos proporcionados (índice, similitud)
         for otro_idx, sim in usuarios_similares:
-            cal_otro = calificaciones[otro_idx][pelicula_idx]
+            cal_otro = vistas_vecinos[otro_idx].get(pelicula_idx, 0)
 
             # Mostramos la contribución de cada vecino
-            print(f"  Revisando usuario {usuarios[otro_idx]}: similitud={sim:.6f}, calificación en '{peliculas[pelicula_idx]}' = {cal_otro}")
+            salida(f"  Revisando usuario {usuarios[otro_idx]}: similitud={sim:.6f}, calificación en '{peliculas[pelicula_idx]}' = {cal_otro}")
 
-            if cal_otro != 0:
+            if pelicula_idx in vistas_vecinos[otro_idx]:
                 contrib = sim * cal_otro
                 suma_ponderada += contrib
                 suma_sim += sim
-                print(f"    Aporta: {sim:.6f} * {cal_otro} = {contrib:.12f}")
+                salida(f"    Aporta: {sim:.6f} * {cal_otro} = {contrib:.12f}")
             else:
-                print("    No aportó (no la vio).")
+                salida("    No aportó (no la vio).")
 
         # Si hay información acumulada, calculamos promedio ponderado
         if suma_sim > 0:
             pred = suma_ponderada / suma_sim
             predicciones[pelicula_idx] = pred
-            print(f"  Suma ponderada = {suma_ponderada:.12f}")
-            print(f"  Suma de similitudes = {suma_sim:.12f}")
-            print(f"  Predicción = {suma_ponderada:.12f} / {suma_sim:.12f} = {pred:.12f}")
+            salida(f"  Suma ponderada = {suma_ponderada:.12f}")
+            salida(f"  Suma de similitudes = {suma_sim:.12f}")
+            salida(f"  Predicción = {suma_ponderada:.12f} / {suma_sim:.12f} = {pred:.12f}")
         else:
             # No hay vecinos que hayan visto el item => no podemos estimar.
-            print("  Ningún usuario similar vio esta película => no se puede predecir (quedará None).")
+            salida("  Ningún usuario similar vio esta película => no se puede predecir (quedará None).")
             predicciones[pelicula_idx] = None
 
     return predicciones
+
+
+# -------------------------
+# operandos_similitud / similitudes_bloque
+# -------------------------
+# R, su máscara M y sus cuadrados R∘R, con sus transpuestas. En la forma
+# dispersa las tres matrices comparten la estructura (indices, indptr) de R
+# y las transpuestas son vistas CSC: no se copia la estructura.
+def operandos_similitud(R):
+    if sp.issparse(R):
+        M = sp.csr_matrix((np.ones_like(R.data), R.indices, R.indptr), shape=R.shape)
+        R2 = sp.csr_matrix((R.data * R.data, R.indices, R.indptr), shape=R.shape)
+    else:
+        M = (R != 0).astype(float)
+        R2 = R * R
+    return R, M, R2, R.T, M.T, R2.T
+
+
+def similitudes_bloque(operandos, bloque):
+    R, M, R2, RT, MT, R2T = operandos
+
+    dot = R[bloque] @ RT
+    norma_a2 = R2[bloque] @ MT
+    norma_b2 = M[bloque] @ R2T
+    if sp.issparse(R):
+        dot, norma_a2, norma_b2 = dot.toarray(), norma_a2.toarray(), norma_b2.toarray()
+
+    # Denominador ||a_común|| * ||b_común||; 0 cuando no hay intersección.
+    denom = np.sqrt(norma_a2 * norma_b2)
+    sims = np.zeros_like(denom)
+    np.divide(dot, denom, out=sims, where=denom != 0)
+
+    # Excluir la comparación de cada usuario consigo mismo.
+    sims[np.arange(len(bloque)), bloque] = 0.0
+    return sims
+
+
+# -------------------------
+# iterar_similitudes_coseno
+# -------------------------
+# Versión matricial de detalle_similitudes_usuario para muchos usuarios.
+#
+# Razonamiento algebraico: sea R la matriz de calificaciones y M su máscara
+# (M_uj = 1 si el usuario u vio la película j). Para dos usuarios a y b,
+# restringidos a sus películas comunes:
+#   a · b       = Σ_j R_aj R_bj          = (R R^T)_ab      (los ceros anulan lo no común)
+#   ||a_común||² = Σ_j R_aj² M_bj        = (R∘R M^T)_ab
+#   ||b_común||² = Σ_j M_aj R_bj²        = (M (R∘R)^T)_ab
+# Tres productos de matrices reemplazan los bucles por pares. Se procesan
+# bloques de filas para que la memoria quede acotada a tam_bloque x usuarios.
+# Cada bloque crea unos TEMPORALES_BLOQUE arreglos (tam_bloque x usuarios):
+# dot, las dos normas, el denominador, las similitudes y, al elegir vecinos,
+# la copia filtrada de topk.top_k_filas y su partición. Sin tam_bloque, se elige para que
+# todos ellos quepan en matriz_calificaciones.MEMORIA_BLOQUE.
+TEMPORALES_BLOQUE = 7
+
+
+def iterar_similitudes_coseno(calificaciones, usuarios_idx=None, tam_bloque=None):
+    """
+    Genera (indices_bloque, similitudes_bloque) por bloques de usuarios.
+    - calificaciones: lista de listas, np.ndarray, scipy.sparse o MatrizCalificaciones.
+    - usuarios_idx: usuarios objetivo (None = todos).
+    - similitudes_bloque: array (len(indices_bloque), n_usuarios) con el coseno
+      restringido a películas comunes; 0.0 si no hay películas en común.
+    - La similitud de un usuario consigo mismo se deja en 0.0 (igual que el
+      cálculo detallado, que lo excluye de la lista de vecinos).
+    - tam_bloque: usuarios por bloque (None = según el presupuesto de memoria).
+    """
+    R = como_matriz(calificaciones)
+    n_usuarios = R.shape[0]
+    if tam_bloque is None:
+        tam_bloque = filas_por_bloque(TEMPORALES_BLOQUE * n_usuarios)
+
+    if usuarios_idx is None:
+        usuarios_idx = np.arange(n_usuarios)
+    else:
+        usuarios_idx = np.atleast_1d(np.asarray(usuarios_idx, dtype=np.intp))
+
+    # Máscara y cuadrados se precalculan una sola vez para todos los bloques.
+    operandos = operandos_similitud(R)
+
+    for inicio in range(0, len(usuarios_idx), tam_bloque):
+        bloque = usuarios_idx[inicio:inicio + tam_bloque]
+        with medir("colaborativo.similitud"):
+            sims = similitudes_bloque(operandos, bloque)
+        yield bloque, sims
+
+
+# -------------------------
+# top_k_bloque / vecinos_coseno
+# -------------------------
+# Los k vecinos de cada fila con topk.top_k_filas (selección parcial, a
+# igual similitud el usuario de índice menor); el propio usuario nunca es
+# candidato. Siempre min(k, usuarios - 1) vecinos, incluidos los de similitud 0.
+def top_k_bloque(sims, bloque, k):
+    top = top_k_filas(sims, min(k, sims.shape[1] - 1), excluir=bloque)
+    return top["indice"], top["puntaje"]
+
+
+def vecinos_coseno(calificaciones, k=20, usuarios_idx=None, tam_bloque=None, cache=None):
+    """
+    k vecinos más similares de cada usuario (coseno sobre películas comunes).
+    - Devuelve (indices, similitudes), ambos (n_objetivo, k), de mayor a menor.
+    - cache: precomputo.CacheSimilitudes (similitud "comunes") sobre la misma
+      matriz; los usuarios con lista en caché se leen en O(k) y el resto se
+      calcula y queda guardado.
+    """
+    if cache is not None:
+        if usuarios_idx is None:
+            usuarios_idx = np.arange(forma_matriz(calificaciones)[0])
+        with medir("colaborativo.seleccion_vecinos"):
+            return cache.vecinos_lote(usuarios_idx, k)
+
+    indices, similitudes = [], []
+    for bloque, sims in iterar_similitudes_coseno(calificaciones, usuarios_idx, tam_bloque):
+        with medir("colaborativo.seleccion_vecinos"):
+            idx, vals = top_k_bloque(sims, bloque, k)
+        indices.append(idx)
+        similitudes.append(vals)
+    return np.vstack(indices), np.vstack(similitudes)
+
+
+# -------------------------
+# similitudes_coseno_lote
+# -------------------------
+# Atajo que reúne todos los bloques en una sola matriz de resultados.
+# Útil para uno o pocos usuarios; para todos los usuarios de una matriz
+# grande conviene consumir iterar_similitudes_coseno bloque a bloque.
+def similitudes_coseno_lote(calificaciones, usuarios_idx=None, tam_bloque=None):
+    """
+    Similitudes coseno (solo películas comunes) de usuarios_idx contra todos.
+    - Devuelve array (len(usuarios_idx), n_usuarios); si usuarios_idx es un
+      entero, devuelve el vector (n_usuarios,).
+    - Coincide con la similitud de detalle_similitudes_usuario hasta
+      tolerancia de punto flotante.
+    """
+    escalar = usuarios_idx is not None and np.ndim(usuarios_idx) == 0
+    bloques = [sims for _, sims in iterar_similitudes_coseno(calificaciones, usuarios_idx, tam_bloque)]
+    resultado = np.vstack(bloques) if bloques else np.zeros((0, forma_matriz(calificaciones)[0]))
+    return resultado[0] if escalar else resultado
+
+
+# ===============================================================
+# RUTA SILENCIOSA (PRODUCCIÓN)
+# ===============================================================
+# Mismos números que las funciones *_detalle, sin construir texto ni
+# imprimir. Para la explicación paso a paso, usar las funciones *_detalle
+# (opcionalmente con una Traza para capturarla en lugar de imprimirla).
+
+# -------------------------
+# similitudes_usuario
+# -------------------------
+def similitudes_usuario(calificaciones, usuario_index):
+    """
+    Similitud coseno (películas comunes) del usuario contra todos los demás.
+    - Devuelve np.ndarray (n_usuarios,); la posición del propio usuario vale 0.0.
+    """
+    return similitudes_coseno_lote(calificaciones, usuario_index)
+
+
+# -------------------------
+# vecinos_usuario
+# -------------------------
+# Vecinos de un usuario con umbrales. El solapamiento (películas calificadas
+# en común) sale de la misma máscara M: comunes = M[u] M^T.
+def vecinos_usuario(calificaciones, usuario_index, k=20, min_comunes=1, min_similitud=None):
+    """
+    k vecinos más similares como arreglo estructurado (indice, puntaje), de
+    mayor a menor (topk.VECINO); .tolist() da la lista [(índice, similitud)]
+    que espera predecir_colaborativo.
+    - min_comunes: mínimo de películas calificadas en común
+    - min_similitud: similitud mínima para ser vecino
+    """
+    operandos = operandos_similitud(como_matriz(calificaciones))
+    bloque = np.array([usuario_index], dtype=np.intp)
+    sims = similitudes_bloque(operandos, bloque)[0]
+
+    M, MT = operandos[1], operandos[4]
+    comunes = M[bloque] @ MT
+    comunes = comunes.toarray().ravel() if sp.issparse(comunes) else np.asarray(comunes).ravel()
+
+    with medir("colaborativo.seleccion_vecinos"):
+        return top_k(sims, k, minimo=min_similitud, soporte=comunes, min_soporte=min_comunes,
+                     excluir=usuario_index)
+
+
+# -------------------------
+# predecir_colaborativo
+# -------------------------
+# Promedio ponderado por similitud para todas las películas a la vez:
+#   suma_ponderada = Σ_v sim_v * R_v      (vector en R^n)
+#   suma_sim       = Σ_v sim_v * M_v      (solo vecinos que vieron cada película)
+def predecir_colaborativo(calificaciones, usuario_index, usuarios_similares):
+    """
+    Predicciones sin salida por consola.
+    - usuarios_similares: lista de (índice, similitud), como en la versión detallada,
+      o el arreglo de vecinos_usuario
+    - Devuelve lista con None en películas vistas o sin vecinos que las vieran.
+    """
+    vecinos = np.array([[i for i, _ in usuarios_similares]], dtype=np.intp).reshape(1, -1)
+    sims = np.array([[s for _, s in usuarios_similares]], dtype=float).reshape(1, -1)
+    preds, predecible = predecir_colaborativo_lote(calificaciones, [usuario_index], vecinos, sims)
+    preds, predecible = preds[0], predecible[0]
+    return [float(p) if ok else None for p, ok in zip(preds, predecible)]
+
+
+# -------------------------
+# predecir_colaborativo_lote
+# -------------------------
+# Versión para un lote de b usuarios objetivo. Con W (b x u) la matriz
+# dispersa de pesos (W[r, v] = similitud del vecino v del usuario r):
+#   suma_ponderada = W R        suma_sim = W M
+# dos productos para todas las películas y todos los usuarios del lote.
+# Solo se leen las filas de R de los vecinos efectivamente usados.
+@instrumentar("colaborativo.prediccion")
+def predecir_colaborativo_lote(calificaciones, usuarios_idx, vecinos_idx=None, vecinos_sim=None, cache=None):
+    """
+    Predicciones ponderadas por similitud para un lote de usuarios.
+    - usuarios_idx: (b,) usuarios objetivo
+    - vecinos_idx / vecinos_sim: (b, k) índices y similitudes de sus vecinos
+      (p. ej. la salida de vecinos_coseno o vecinos_paralelo); sin ellos se
+      toman de cache (precomputo.CacheSimilitudes, similitud "comunes")
+    - Devuelve (predicciones, predecible), ambos (b, n_peliculas).
+      predecible es False en películas ya vistas o que ningún vecino vio
+      (el None de la versión detallada); ahí la predicción vale 0.0.
+    """
+    R = como_matriz(calificaciones)
+    usuarios_idx = np.atleast_1d(np.asarray(usuarios_idx, dtype=np.intp))
+    if vecinos_idx is None:
+        if cache is None:
+            raise ValueError("Faltan los vecinos: pasar vecinos_idx y vecinos_sim, o cache")
+        vecinos_idx, vecinos_sim = cache.vecinos_lote(usuarios_idx)
+    vecinos_idx = np.asarray(vecinos_idx, dtype=np.intp).reshape(len(usuarios_idx), -1)
+    vecinos_sim = np.asarray(vecinos_sim, dtype=float).reshape(vecinos_idx.shape)
+
+    # Filas de R de los vecinos distintos y pesos W sobre esas filas
+    unicos, columnas = np.unique(vecinos_idx, return_inverse=True)
+    filas_w = np.repeat(np.arange(len(usuarios_idx)), vecinos_idx.shape[1])
+    W = sp.csr_matrix((vecinos_sim.ravel(), (filas_w, columnas.ravel())), shape=(len(usuarios_idx), len(unicos)))
+
+    sub = R[unicos]
+    if sp.issparse(R):
+        mascara = sp.csr_matrix((np.ones_like(sub.data), sub.indices, sub.indptr), shape=sub.shape)
+        suma_ponderada = (W @ sub).toarray()
+        suma_sim = (W @ mascara).toarray()
+        vistas = R[usuarios_idx].tocoo()
+        vistas = (vistas.row, vistas.col)
+    else:
+        suma_ponderada = np.asarray(W @ sub)
+        suma_sim = np.asarray(W @ (sub != 0).astype(float))
+        vistas = R[usuarios_idx] != 0
+
+    predecible = suma_sim > 0
+    predecible[vistas] = False
+    preds = np.zeros_like(suma_ponderada)
+    np.divide(suma_ponderada, suma_sim, out=preds, where=predecible)
+    return preds, predecible
@@ -0,0 +1,172 @@
+# colaborativo_paralelo.py
+# ===============================================================
+# BÚSQUEDA DE VECINOS COLABORATIVOS EN PARALELO (VARIOS NÚCLEOS)
+# ===============================================================
+# Las similitudes de cada usuario contra todos, y sus predicciones, son
+# independientes entre usuarios: se reparten rangos de usuarios
+# (fragmentos) entre procesos.
+#
+# La matriz de calificaciones NO se envía a cada proceso: sus arreglos CSR
+# (indptr, indices, data) y los derivados (data² y unos para la máscara)
+# se copian una sola vez a memoria compartida y cada proceso arma vistas
+# de solo lectura sobre esas páginas. Cada tarea devuelve únicamente los
+# k vecinos de su fragmento (y, con predecir_paralelo, las predicciones
+# calculadas con ellos), que se ubican en el resultado final.
+# ===============================================================
+
+import os
+from multiprocessing import get_all_start_methods, get_context, shared_memory
+
+import numpy as np
+import scipy.sparse as sp
+
+from colaborativo import predecir_colaborativo_lote, similitudes_bloque, top_k_bloque
+from matriz_calificaciones import como_csr
+
+# Estado de cada proceso trabajador (se arma en _inicializar_trabajador)
+_OPERANDOS = None
+_SEGMENTOS = []
+
+
+# -------------------------
+# _publicar / _adjuntar
+# -------------------------
+# _publicar copia un arreglo a un segmento de memoria compartida y devuelve
+# su descriptor (nombre, forma, tipo); _adjuntar crea una vista sin copia.
+def _publicar(arreglo, segmentos):
+    shm = shared_memory.SharedMemory(create=True, size=max(arreglo.nbytes, 1))
+    vista = np.ndarray(arreglo.shape, dtype=arreglo.dtype, buffer=shm.buf)
+    vista[...] = arreglo
+    segmentos.append(shm)
+    return shm.name, arreglo.shape, arreglo.dtype.str
+
+
+def _adjuntar(descriptor):
+    nombre, forma, tipo = descriptor
+    shm = shared_memory.SharedMemory(name=nombre)
+    _SEGMENTOS.append(shm)
+    return np.ndarray(forma, dtype=np.dtype(tipo), buffer=shm.buf)
+
+
+# -------------------------
+# _inicializar_trabajador
+# -------------------------
+# Reconstruye R, M y R∘R (y sus transpuestas CSC, que son vistas) sobre
+# la memoria compartida, con la misma forma que operandos_similitud.
+def _inicializar_trabajador(descriptores, forma):
+    global _OPERANDOS
+    indptr, indices, data, data2, unos = (_adjuntar(d) for d in descriptores)
+    R = sp.csr_matrix((data, indices, indptr), shape=forma, copy=False)
+    M = sp.csr_matrix((unos, indices, indptr), shape=forma, copy=False)
+    R2 = sp.csr_matrix((data2, indices, indptr), shape=forma, copy=False)
+    _OPERANDOS = (R, M, R2, R.T, M.T, R2.T)
+
+
+# -------------------------
+# _procesar_fragmento
+# -------------------------
+# Vecinos de cada bloque del fragmento y, si se piden, sus predicciones
+# (predecir_colaborativo_lote sobre la misma R compartida). Las
+# predicciones vuelven como tripletas (fila, película, valor) de las
+# entradas predecibles: un bloque denso por usuario no cabría para todos.
+def _procesar_fragmento(tarea):
+    inicio, fin, k, tam_bloque, predecir = tarea
+    indices, similitudes, predicciones = [], [], []
+    for b in range(inicio, fin, tam_bloque):
+        bloque = np.arange(b, min(b + tam_bloque, fin))
+        idx, vals = top_k_bloque(similitudes_bloque(_OPERANDOS, bloque), bloque, k)
+        indices.append(idx)
+        similitudes.append(vals)
+        if predecir:
+            preds, predecible = predecir_colaborativo_lote(_OPERANDOS[0], bloque, idx, vals)
+            filas, cols = np.nonzero(predecible)
+            predicciones.append((bloque[filas], cols, preds[filas, cols]))
+    return inicio, np.vstack(indices), np.vstack(similitudes), predicciones
+
+
+# -------------------------
+# _contexto
+# -------------------------
+# "fork" copia el proceso con sus hilos a medio usar (BLAS, el ejecutor del
+# servidor): el hijo puede quedar bloqueado y Python 3.12+ lo advierte. Por
+# defecto se usa "forkserver" (hijos de un proceso limpio, sin hilos) y
+# "spawn" donde no existe; la memoria compartida funciona con cualquiera.
+def _contexto(metodo_inicio):
+    if metodo_inicio is None:
+        metodo_inicio = "forkserver" if "forkserver" in get_all_start_methods() else "spawn"
+    return get_context(metodo_inicio)
+
+
+# -------------------------
+# _ejecutar_fragmentos
+# -------------------------
+def _ejecutar_fragmentos(calificaciones, k, procesos, tam_fragmento, tam_bloque, predecir, metodo_inicio):
+    R = como_csr(calificaciones)
+    R.sort_indices()
+    n_usuarios = R.shape[0]
+    k = min(k, n_usuarios - 1)
+    procesos = procesos or os.cpu_count() or 1
+
+    indices = np.empty((n_usuarios, k), dtype=np.intp)
+    similitudes = np.empty((n_usuarios, k), dtype=float)
+    partes = []
+    tareas = [(i, min(i + tam_fragmento, n_usuarios), k, tam_bloque, predecir)
+              for i in range(0, n_usuarios, tam_fragmento)]
+
+    segmentos = []
+    try:
+        descriptores = [_publicar(a, segmentos) for a in
+                        (R.indptr, R.indices, R.data, R.data * R.data, np.ones_like(R.data))]
+        contexto = _contexto(metodo_inicio)
+        with contexto.Pool(procesos, initializer=_inicializar_trabajador, initargs=(descriptores, R.shape)) as pool:
+            # Fusión: cada fragmento cubre un rango disjunto de usuarios
+            for inicio, idx, vals, predicciones in pool.imap_unordered(_procesar_fragmento, tareas):
+                indices[inicio:inicio + len(idx)] = idx
+                similitudes[inicio:inicio + len(vals)] = vals
+                partes.extend(predicciones)
+    finally:
+        for shm in segmentos:
+            shm.close()
+            shm.unlink()
+
+    if not predecir:
+        return indices, similitudes, None
+    if partes:
+        filas, cols, valores = (np.concatenate(c) for c in zip(*partes))
+    else:
+        filas, cols, valores = np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp), np.empty(0)
+    return indices, similitudes, sp.csr_matrix((valores, (filas, cols)), shape=R.shape)
+
+
+# -------------------------
+# vecinos_paralelo
+# -------------------------
+def vecinos_paralelo(calificaciones, k=20, procesos=None, tam_fragmento=4096, tam_bloque=512, metodo_inicio=None):
+    """
+    k vecinos (coseno sobre películas comunes) de todos los usuarios.
+    - procesos: número de procesos (por defecto, núcleos disponibles)
+    - tam_fragmento: usuarios por tarea; tam_bloque: usuarios por producto
+      de matrices dentro de cada tarea (memoria ~ tam_bloque x usuarios)
+    - metodo_inicio: "forkserver", "spawn" o "fork" (ver _contexto);
+      None = "forkserver" donde exista
+    - Devuelve (indices, similitudes) de forma (n_usuarios, k), igual que
+      colaborativo.vecinos_coseno.
+    """
+    indices, similitudes, _ = _ejecutar_fragmentos(calificaciones, k, procesos, tam_fragmento, tam_bloque,
+                                                   False, metodo_inicio)
+    return indices, similitudes
+
+
+# -------------------------
+# predecir_paralelo
+# -------------------------
+def predecir_paralelo(calificaciones, k=20, procesos=None, tam_fragmento=4096, tam_bloque=512, metodo_inicio=None):
+    """
+    Vecinos y predicciones colaborativas de todos los usuarios, por fragmentos.
+    - Mismos parámetros que vecinos_paralelo
+    - Devuelve (indices, similitudes, predicciones): predicciones es una CSR
+      (n_usuarios x n_peliculas) con las entradas predecibles de
+      predecir_colaborativo_lote (las None de predecir_colaborativo_detalle
+      quedan fuera del soporte).
+    """
+    return _ejecutar_fragmentos(calificaciones, k, procesos, tam_fragmento, tam_bloque, True, metodo_inicio)
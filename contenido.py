@@ -7,6 +7,18 @@
 # ===============================================================
 
 import math
+import os
+import time
+import zlib
+
+import numpy as np
+import scipy.sparse as sp
+
+from instrumentacion import instrumentar
+from matriz_calificaciones import MatrizCalificaciones, como_matriz, es_dispersa, inversas_normas, \
+    normalizar_filas, normas_filas
+from topk import top_k, top_k_pares
+from traza import salida_para
 
 # -------------------------
 # Producto punto entre vectores de características
@@ -33,6 +45,19 @@ def magnitud_vector(v):
     return math.sqrt(sum(x * x for x in v))
 
 
+# -------------------------
+# _vector_caracteristicas
+# -------------------------
+# Devuelve la fila i como lista. Si las características vienen en una
+# matriz dispersa (scipy.sparse o MatrizCalificaciones) solo se expande
+# esa fila, nunca la matriz completa.
+def _vector_caracteristicas(caracteristicas, i):
+    if es_dispersa(caracteristicas):
+        X = caracteristicas.csr if isinstance(caracteristicas, MatrizCalificaciones) else caracteristicas.tocsr()
+        return X[i].toarray().ravel().tolist()
+    return caracteristicas[i]
+
+
 # -------------------------
 # detalle_similitud_peliculas
 # -------------------------
@@ -42,35 +67,39 @@ def magnitud_vector(v):
 #    - calcular producto punto (coincidencia atributo a atributo)
 #    - calcular magnitudes
 #    - calcular coseno (direccionalidad entre vectores)
-def detalle_similitud_peliculas(caracteristicas, pelicula_index, peliculas):
-    target = caracteristicas[pelicula_index]
+def detalle_similitud_peliculas(caracteristicas, pelicula_index, peliculas, traza=None, k=None):
+    salida = salida_para(traza, "detalle_similitud_peliculas")
+    target = _vector_caracteristicas(caracteristicas, pelicula_index)
     nombre_target = peliculas[pelicula_index]
 
     # Explicación: estamos proyectando la información de la película objetivo
     # sobre el conjunto de características y comparándola con otras proyecciones.
-    print(f"Comparando todas las películas con: {nombre_target}\n")
+    salida(f"Comparando todas las películas con: {nombre_target}\n")
 
     resultados = []
 
-    for i, vec in enumerate(caracteristicas):
+    # La norma del objetivo no cambia entre comparaciones: se calcula una vez.
+    mag_t = magnitud_vector(target)
+
+    for i in range(len(peliculas)):
         if i == pelicula_index:
             continue
+        vec = _vector_caracteristicas(caracteristicas, i)
 
-        print(f"--- {nombre_target} vs {peliculas[i]} ---")
-        print(f"  Vector {nombre_target}: {target}")
-        print(f"  Vector {peliculas[i]}: {vec}")
+        salida(f"--- {nombre_target} vs {peliculas[i]} ---")
+        salida(f"  Vector {nombre_target}: {target}")
+        salida(f"  Vector {peliculas[i]}: {vec}")
 
         # Producto punto = Σ target_j * vec_j
         # Interpretación: cuánto comparten en términos de características.
         dot = producto_punto(target, vec)
         sumandos = " + ".join(f"{a}*{b}" for a, b in zip(target, vec))
-        print(f"  Producto punto = {sumandos} = {dot}")
+        salida(f"  Producto punto = {sumandos} = {dot}")
 
         # Magnitudes: escalas de cada vector (para normalizar)
-        mag_t = magnitud_vector(target)
         mag_o = magnitud_vector(vec)
-        print(f"  Magnitud {nombre_target} = sqrt(" + " + ".join(f"{x}^2" for x in target) + f") = {mag_t:.12f}")
-        print(f"  Magnitud {peliculas[i]} = sqrt(" + " + ".join(f"{x}^2" for x in vec) + f") = {mag_o:.12f}")
+        salida(f"  Magnitud {nombre_target} = sqrt(" + " + ".join(f"{x}^2" for x in target) + f") = {mag_t:.12f}")
+        salida(f"  Magnitud {peliculas[i]} = sqrt(" + " + ".join(f"{x}^2" for x in vec) + f") = {mag_o:.12f}")
 
         # Denominador = ||target|| * ||vec||
         denom = mag_t * mag_o
@@ -78,10 +107,472 @@ def detalle_similitud_peliculas(caracteristicas, pelicula_index, peliculas):
         # Similitud coseno = (producto punto) / (denominador)
         # Significado práctica: similaridad en términos de orientación de características.
         sim = dot / denom if denom != 0 else 0.0
-        print(f"  Similitud coseno = {dot} / {denom:.12f} = {sim:.12f}\n")
+        salida(f"  Similitud coseno = {dot} / {denom:.12f} = {sim:.12f}\n")
 
         resultados.append((i, sim))
 
-    # Ordenamos por similitud descendente para obtener recomendaciones por contenido
-    resultados.sort(key=lambda x: x[1], reverse=True)
-    return resultados
+    # Ordenamos por similitud descendente para obtener recomendaciones por
+    # contenido (con k, solo las k mejores por selección parcial)
+    return top_k_pares(resultados, len(resultados) if k is None else k).tolist()
+
+
+# ===============================================================
+# RUTA SILENCIOSA (PRODUCCIÓN)
+# ===============================================================
+# Mismo resultado que detalle_similitud_peliculas, sin texto ni impresión:
+# un producto matriz-vector para todos los productos punto y las normas
+# de todas las películas calculadas una sola vez.
+
+# -------------------------
+# similitud_peliculas
+# -------------------------
+@instrumentar("contenido.similitud")
+def similitud_peliculas(caracteristicas, pelicula_index, k=None, normas=None):
+    """
+    Lista [(índice, similitud)] de las demás películas, ordenada de mayor a
+    menor similitud coseno (empates en el orden original, como en la versión detallada).
+    - k: solo las k más similares, por selección parcial (topk.top_k)
+    - normas: ||x_i|| de todas las películas ya calculadas (normas_filas o
+      precomputo.CacheSimilitudes(...).normas); sin ellas se recalculan en
+      cada consulta, un recorrido completo de las características
+    """
+    X = como_matriz(caracteristicas)
+    if normas is None:
+        normas = normas_filas(X)
+    if sp.issparse(X):
+        dots = (X @ X[pelicula_index].T).toarray().ravel()
+    else:
+        dots = X @ X[pelicula_index]
+
+    denom = normas * normas[pelicula_index]
+    sims = np.divide(dots, denom, out=np.zeros_like(dots), where=denom != 0)
+
+    if k is not None:
+        return top_k(sims, k, excluir=pelicula_index).tolist()
+    orden = np.argsort(-sims, kind="stable")
+    return [(int(i), float(sims[i])) for i in orden if i != pelicula_index]
+
+
+# ===============================================================
+# CARACTERÍSTICAS DISPERSAS: ETIQUETAS, TF-IDF Y HASHING
+# ===============================================================
+# Un catálogo real describe cada película con unas pocas etiquetas de un
+# vocabulario de decenas de miles (géneros, tags, reparto). Como lista densa
+# de indicadores casi todo serían ceros; como CSR la memoria y el costo de
+# X X^T crecen con las etiquetas presentes, no con el vocabulario.
+#  - matriz_etiquetas: etiqueta -> columna con un vocabulario explícito
+#  - caracteristicas_hash: columna = crc32(etiqueta) mod dimension, sin
+#    vocabulario (dimensión fija; las colisiones son raras si dimension >>
+#    etiquetas por película). crc32 es estable entre procesos, hash() no.
+#  - ponderar_tfidf: peso_ij = tf_ij * idf_j, idf_j = ln((1+n)/(1+df_j)) + 1;
+#    las etiquetas comunes ("Drama") pesan menos que las distintivas.
+# Las matrices resultantes sirven directamente en similitud_peliculas,
+# IndicePeliculas (los tres métodos) y precomputo.matriz_similitud_top_k,
+# que calculan el coseno con productos dispersos.
+
+# -------------------------
+# _pares_etiquetas
+# -------------------------
+# Cada película es un iterable de etiquetas (peso 1) o un dict etiqueta -> peso.
+def _pares_etiquetas(item):
+    return item.items() if isinstance(item, dict) else ((e, 1.0) for e in item)
+
+
+# -------------------------
+# matriz_etiquetas
+# -------------------------
+def matriz_etiquetas(etiquetas, vocabulario=None, min_frecuencia=1):
+    """
+    CSR (n_peliculas x n_etiquetas) de pesos (conteos si se repiten etiquetas).
+    - etiquetas: secuencia, una entrada por película: iterable de etiquetas
+      o dict etiqueta -> peso
+    - vocabulario: dict etiqueta -> columna ya fijado (p. ej. el de
+      entrenamiento); las etiquetas fuera de él se ignoran
+    - min_frecuencia: sin vocabulario, descarta etiquetas presentes en menos
+      películas que este mínimo
+    - Devuelve (X, vocabulario)
+    """
+    fijo = vocabulario is not None
+    vocabulario = dict(vocabulario) if fijo else {}
+    filas, cols, vals = [], [], []
+    n = 0
+    for i, item in enumerate(etiquetas):
+        n = i + 1
+        for etiqueta, peso in _pares_etiquetas(item):
+            columna = vocabulario.get(etiqueta)
+            if columna is None:
+                if fijo:
+                    continue
+                columna = vocabulario[etiqueta] = len(vocabulario)
+            filas.append(i)
+            cols.append(columna)
+            vals.append(peso)
+
+    X = sp.csr_matrix((np.asarray(vals, dtype=float), (filas, cols)), shape=(n, len(vocabulario)))
+    X.sum_duplicates()
+
+    if not fijo and min_frecuencia > 1:
+        df = np.bincount(X.indices, minlength=X.shape[1])
+        conservar = np.flatnonzero(df >= min_frecuencia)
+        nombres = list(vocabulario)
+        X = X[:, conservar].tocsr()
+        vocabulario = {nombres[c]: j for j, c in enumerate(conservar)}
+    return X, vocabulario
+
+
+# -------------------------
+# caracteristicas_hash
+# -------------------------
+# El bit 31 del crc32 da el signo (con_signo=True): las colisiones tienden a
+# cancelarse en los productos punto en lugar de sumarse siempre.
+def caracteristicas_hash(etiquetas, dimension=1 << 18, con_signo=True):
+    """
+    CSR (n_peliculas x dimension) por hashing de etiquetas, sin vocabulario.
+    - etiquetas: como en matriz_etiquetas
+    - dimension: columnas fijas (potencia de 2 recomendada, < 2^31)
+    """
+    cache = {}
+    filas, cols, vals = [], [], []
+    n = 0
+    for i, item in enumerate(etiquetas):
+        n = i + 1
+        for etiqueta, peso in _pares_etiquetas(item):
+            h = cache.get(etiqueta)
+            if h is None:
+                h = cache[etiqueta] = zlib.crc32(str(etiqueta).encode("utf-8"))
+            filas.append(i)
+            cols.append(h % dimension)
+            vals.append(-peso if con_signo and h >> 31 else peso)
+
+    X = sp.csr_matrix((np.asarray(vals, dtype=float), (filas, cols)), shape=(n, dimension))
+    X.sum_duplicates()
+    X.eliminate_zeros()
+    return X
+
+
+# -------------------------
+# ponderar_tfidf
+# -------------------------
+def ponderar_tfidf(X, idf=None, normalizar=True):
+    """
+    Pondera una matriz de características por TF-IDF.
+    - X: CSR (o denso) de pesos por película y característica
+    - idf: vector ya calculado (p. ej. en entrenamiento) para ponderar
+      películas nuevas de forma consistente; None = calcularlo de X
+    - normalizar: filas con norma 1 (el coseno pasa a ser un producto punto)
+    - Devuelve (X_ponderada, idf)
+    """
+    X = sp.csr_matrix(X, dtype=float)
+    if idf is None:
+        df = np.bincount(X.indices, minlength=X.shape[1])
+        idf = np.log((1.0 + X.shape[0]) / (1.0 + df)) + 1.0
+
+    X = X @ sp.diags(idf)
+    X = X.tocsr()
+    if normalizar:
+        X = normalizar_filas(X)
+    return X, idf
+
+
+# ===============================================================
+# ÍNDICE DE PELÍCULAS PARA CONSULTAS "PARECIDAS A X"
+# ===============================================================
+# similitud_peliculas compara contra todas las películas y ordena todo:
+# O(I·F) + O(I log I) por consulta. El índice guarda los vectores ya
+# normalizados (coseno = producto punto) y ofrece tres métodos:
+#  - "exacto": producto matriz-vector + selección parcial (topk.top_k)
+#  - "lsh":    hiperplanos aleatorios; vectores con el mismo patrón de signos
+#              (mismo "cubo") tienden a tener ángulo pequeño. Solo se
+#              re-puntúan los candidatos que comparten cubo en alguna tabla.
+#  - "ivf":    k-medias esféricas; cada película va a la lista de su centroide
+#              más cercano y la consulta solo revisa las n_sondeos listas
+#              cuyos centroides son más parecidos.
+# Los candidatos siempre se re-puntúan con el coseno exacto.
+# Con características dispersas (p. ej. caracteristicas_hash, F = 2^18) la
+# memoria crece con los no ceros, no con F:
+#  - LSH: los hiperplanos solo tienen las columnas presentes en alguna
+#    película; una columna que ninguna película usa no cambia el coseno con
+#    ellas, así que la consulta la ignora.
+#  - IVF: los centroides son CSR; la suma de las películas de una lista
+#    tiene a lo sumo sus no ceros, así que en total nnz(centroides) <= nnz(X).
+
+# -------------------------
+# _listas_invertidas
+# -------------------------
+# Agrupa posiciones por clave (cubo LSH o centroide) en formato CSR:
+# orden[inicio[c]:inicio[c+1]] son las películas con clave claves[c].
+def _listas_invertidas(claves_por_item):
+    orden = np.argsort(claves_por_item, kind="stable")
+    claves, inicio = np.unique(claves_por_item[orden], return_index=True)
+    return claves, np.r_[inicio, len(orden)], orden
+
+
+# -------------------------
+# _codigos_lsh
+# -------------------------
+# Código entero de b bits: bit r = signo de la proyección sobre el hiperplano r.
+def _codigos_lsh(X, planos):
+    return _codigos_proyeccion(X @ planos)
+
+
+def _codigos_proyeccion(proy):
+    bits = (np.asarray(proy) > 0).astype(np.int64)
+    return bits @ (1 << np.arange(bits.shape[-1], dtype=np.int64))
+
+
+# -------------------------
+# _csr_a_datos / _csr_de_datos
+# -------------------------
+# Una matriz CSR en el .npz como cuatro arreglos con prefijo común.
+def _csr_a_datos(prefijo, M):
+    return {f"{prefijo}_data": M.data, f"{prefijo}_indices": M.indices, f"{prefijo}_indptr": M.indptr,
+            f"{prefijo}_forma": np.array(M.shape)}
+
+
+def _csr_de_datos(datos, prefijo):
+    return sp.csr_matrix((datos[f"{prefijo}_data"], datos[f"{prefijo}_indices"], datos[f"{prefijo}_indptr"]),
+                         shape=tuple(datos[f"{prefijo}_forma"]))
+
+
+# -------------------------
+# IndicePeliculas
+# -------------------------
+class IndicePeliculas:
+    """
+    Índice persistente para consultas top-k de películas similares.
+    - caracteristicas: lista de listas, np.ndarray, scipy.sparse o MatrizCalificaciones
+    - metodo: "exacto", "lsh" (n_tablas x n_bits) o "ivf" (n_listas, n_sondeos);
+      los tres aceptan características dispersas sin densificarlas
+    - consultar(i, k) devuelve [(índice, similitud)] como similitud_peliculas,
+      limitado a k resultados.
+    """
+
+    METODOS = ("exacto", "lsh", "ivf")
+
+    def __init__(self, caracteristicas, metodo="exacto", n_tablas=16, n_bits=10,
+                 n_listas=None, n_sondeos=8, iteraciones=10, semilla=0):
+        if metodo not in self.METODOS:
+            raise ValueError(f"Método de índice desconocido: {metodo!r}")
+        self.metodo = metodo
+        self.n_sondeos = n_sondeos
+
+        # Vectores normalizados: coseno(a, b) = a_norm · b_norm
+        X = como_matriz(caracteristicas)
+        self.X = normalizar_filas(X)
+
+        rng = np.random.default_rng(semilla)
+        if metodo == "lsh":
+            if sp.issparse(self.X):
+                # hiperplanos solo sobre las columnas usadas: (n_tablas, C, n_bits), C <= nnz
+                self.columnas = np.unique(self.X.indices)
+                X_planos = self.X[:, self.columnas]
+            else:
+                self.columnas = None
+                X_planos = self.X
+            self.planos = rng.standard_normal((n_tablas, X_planos.shape[1], n_bits))
+            self.tablas = [_listas_invertidas(_codigos_lsh(X_planos, planos)) for planos in self.planos]
+        elif metodo == "ivf":
+            n_listas = n_listas or max(1, int(np.sqrt(X.shape[0])))
+            self.centroides = self._kmedias(n_listas, iteraciones, rng)
+            self.listas = _listas_invertidas(self._asignar(self.X))
+
+    # -------------------------
+    # Construcción IVF: k-medias esféricas
+    # -------------------------
+    def _asignar(self, X, tam_bloque=65536):
+        asignacion = np.empty(X.shape[0], dtype=np.int64)
+        for inicio in range(0, X.shape[0], tam_bloque):
+            sims = X[inicio:inicio + tam_bloque] @ self.centroides.T
+            sims = sims.toarray() if sp.issparse(sims) else np.asarray(sims)
+            asignacion[inicio:inicio + tam_bloque] = sims.argmax(axis=1)
+        return asignacion
+
+    def _kmedias(self, n_listas, iteraciones, rng):
+        n_items = self.X.shape[0]
+        n_listas = min(n_listas, n_items)
+        semillas = rng.choice(n_items, n_listas, replace=False)
+        C = self.X[semillas]
+        self.centroides = C.tocsr() if sp.issparse(C) else np.array(C)
+
+        for _ in range(iteraciones):
+            asignacion = self._asignar(self.X)
+            # Suma de vectores por lista: matriz indicadora (listas x items) @ X
+            indicadora = sp.csr_matrix((np.ones(n_items), (asignacion, np.arange(n_items))), shape=(n_listas, n_items))
+            sumas = indicadora @ self.X
+            normas = normas_filas(sumas)
+            # Listas vacías conservan su centroide anterior
+            no_vacias = normas > 0
+            if sp.issparse(sumas):
+                self.centroides = (sp.diags(inversas_normas(normas)) @ sumas + sp.diags((~no_vacias).astype(float)) @ self.centroides).tocsr()
+            else:
+                self.centroides[no_vacias] = sumas[no_vacias] / normas[no_vacias, None]
+        return self.centroides
+
+    # -------------------------
+    # Consultas
+    # -------------------------
+    # q: vector denso normalizado o, con índice disperso, fila CSR (1 x F) normalizada
+    def _candidatos(self, q):
+        if self.metodo == "exacto":
+            return None
+        if self.metodo == "lsh":
+            if sp.issparse(q):
+                # solo las columnas de q que tienen hiperplano
+                pos = np.minimum(np.searchsorted(self.columnas, q.indices), len(self.columnas) - 1)
+                validas = self.columnas[pos] == q.indices
+                pos, valores = pos[validas], q.data[validas]
+            partes = []
+            for planos, (claves, inicio, orden) in zip(self.planos, self.tablas):
+                proy = valores @ planos[pos] if sp.issparse(q) else q @ planos
+                codigo = _codigos_proyeccion(proy)
+                c = np.searchsorted(claves, codigo)
+                if c < len(claves) and claves[c] == codigo:
+                    partes.append(orden[inicio[c]:inicio[c + 1]])
+        else:
+            claves, inicio, orden = self.listas
+            sims_c = (self.centroides @ q.T).toarray().ravel() if sp.issparse(q) else np.asarray(self.centroides @ q)
+            mejores = top_k(sims_c, self.n_sondeos)["indice"]
+            posiciones = np.searchsorted(claves, mejores)
+            partes = [orden[inicio[c]:inicio[c + 1]]
+                      for c, lista in zip(posiciones, mejores) if c < len(claves) and claves[c] == lista]
+        return np.unique(np.concatenate(partes)) if partes else np.empty(0, dtype=np.int64)
+
+    @instrumentar("contenido.consulta_indice")
+    def consultar_vector(self, q, k=10, excluir=None):
+        """
+        Top-k películas más parecidas a un vector q (ya normalizado o no).
+        - q puede ser una fila dispersa (1 x F): con el método "exacto" solo
+          se recorren las columnas (características) presentes en q
+        """
+        if sp.issparse(self.X):
+            # índice disperso: q se mantiene como fila CSR y solo se recorren
+            # las características presentes en q
+            q = sp.csr_matrix(q if sp.issparse(q) else np.asarray(q, dtype=float).reshape(1, -1), dtype=float)
+            q.sum_duplicates()
+            norma = float(np.sqrt(q.data @ q.data))
+            if norma > 0:
+                q = q / norma
+            candidatos = self._candidatos(q)
+            if candidatos is None:
+                candidatos = np.arange(self.X.shape[0])
+                sims = self._por_columnas()[:, q.indices] @ q.data
+            else:
+                sims = (self.X[candidatos] @ q.T).toarray()
+            return self._mejores(candidatos, np.asarray(sims).ravel(), k, excluir)
+
+        q = q.toarray() if sp.issparse(q) else q
+        q = np.asarray(q, dtype=float).ravel()
+        norma = np.linalg.norm(q)
+        if norma > 0:
+            q = q / norma
+
+        candidatos = self._candidatos(q)
+        if candidatos is None:
+            candidatos = np.arange(self.X.shape[0])
+            sims = np.asarray(self.X @ q).ravel()
+        else:
+            sims = np.asarray(self.X[candidatos] @ q).ravel()
+        return self._mejores(candidatos, sims, k, excluir)
+
+    def _por_columnas(self):
+        # Listas invertidas característica -> películas (CSC): una consulta
+        # dispersa solo lee las columnas de sus características. Se crean en
+        # la primera consulta que las necesita.
+        if getattr(self, "_Xc", None) is None:
+            self._Xc = self.X.tocsc()
+        return self._Xc
+
+    def _mejores(self, candidatos, sims, k, excluir):
+        # excluir es un índice de película, no una posición entre los candidatos
+        if excluir is not None:
+            sims = np.where(candidatos == excluir, -np.inf, sims)
+        return top_k(sims, k, indices=candidatos).tolist()
+
+    def consultar(self, pelicula_index, k=10):
+        """Top-k películas más parecidas a la película pelicula_index (excluida)."""
+        return self.consultar_vector(self.X[pelicula_index], k, excluir=pelicula_index)
+
+    # -------------------------
+    # Persistencia (.npz)
+    # -------------------------
+    # np.savez agrega ".npz" si falta y np.load no: se normaliza la ruta en
+    # ambos lados para que guardar("indice") y cargar("indice") coincidan.
+    @staticmethod
+    def _ruta_npz(ruta):
+        ruta = os.fspath(ruta)
+        return ruta if ruta.endswith(".npz") else ruta + ".npz"
+
+    def guardar(self, ruta):
+        datos = {"metodo": np.array(self.metodo), "n_sondeos": np.array(self.n_sondeos)}
+        if sp.issparse(self.X):
+            datos.update(_csr_a_datos("X", self.X))
+        else:
+            datos["X"] = self.X
+        if self.metodo == "lsh":
+            datos["planos"] = self.planos
+            if self.columnas is not None:
+                datos["columnas"] = self.columnas
+            for t, (claves, inicio, orden) in enumerate(self.tablas):
+                datos.update({f"claves_{t}": claves, f"inicio_{t}": inicio, f"orden_{t}": orden})
+        elif self.metodo == "ivf":
+            if sp.issparse(self.centroides):
+                datos.update(_csr_a_datos("centroides", self.centroides))
+            else:
+                datos["centroides"] = self.centroides
+            datos.update(zip(("claves_0", "inicio_0", "orden_0"), self.listas))
+        np.savez(self._ruta_npz(ruta), **datos)
+
+    @classmethod
+    def cargar(cls, ruta):
+        datos = np.load(cls._ruta_npz(ruta))
+        indice = cls.__new__(cls)
+        indice.metodo = str(datos["metodo"])
+        indice.n_sondeos = int(datos["n_sondeos"])
+        indice.X = datos["X"] if "X" in datos else _csr_de_datos(datos, "X")
+        if indice.metodo == "lsh":
+            indice.planos = datos["planos"]
+            indice.columnas = datos["columnas"] if "columnas" in datos else None
+            indice.tablas = [(datos[f"claves_{t}"], datos[f"inicio_{t}"], datos[f"orden_{t}"])
+                             for t in range(len(indice.planos))]
+        elif indice.metodo == "ivf":
+            indice.centroides = datos["centroides"] if "centroides" in datos else _csr_de_datos(datos, "centroides")
+            indice.listas = (datos["claves_0"], datos["inicio_0"], datos["orden_0"])
+        return indice
+
+
+# -------------------------
+# medir_recall_latencia
+# -------------------------
+# Compara un índice contra similitud_peliculas (referencia exacta):
+# recall@k = fracción de los k resultados exactos recuperados (con empates
+# contados como aciertos) y latencia media por consulta de ambos.
+def medir_recall_latencia(indice, caracteristicas, consultas, k=10):
+    """
+    Devuelve dict con recall, latencia_indice_ms y latencia_exacta_ms.
+    """
+    aciertos = 0
+    total = 0
+    t_indice = 0.0
+    t_exacto = 0.0
+    X = como_matriz(caracteristicas)
+    normas = normas_filas(X)            # una vez: la referencia no paga su recálculo por consulta
+    for q in consultas:
+        t0 = time.perf_counter()
+        exacto = similitud_peliculas(X, q, k, normas)
+        t1 = time.perf_counter()
+        aproximado = indice.consultar(q, k)
+        t2 = time.perf_counter()
+        t_exacto += t1 - t0
+        t_indice += t2 - t1
+
+        if exacto:
+            umbral = exacto[-1][1] - 1e-9
+            aciertos += min(len(exacto), sum(1 for _, sim in aproximado if sim >= umbral))
+            total += len(exacto)
+
+    n = max(len(consultas), 1)
+    return {
+        "recall": aciertos / total if total else 1.0,
+        "latencia_indice_ms": 1e3 * t_indice / n,
+        "latencia_exacta_ms": 1e3 * t_exacto / n,
+    }
@@ -0,0 +1,225 @@
+# hibrido.py
+# ===============================================================
+# RECOMENDADOR HÍBRIDO: SVD + COLABORATIVO + CONTENIDO EN UNA PASADA
+# ===============================================================
+# main.py ejecuta los tres sistemas por separado e imprime tres listas.
+# Aquí, para un lote de usuarios, las tres señales se calculan como
+# matrices alineadas (b x n_peliculas), cada una con un producto por lote:
+#   svd:          U_k[lote] (S_k Vt_k)
+#   colaborativo: similitudes del lote, k vecinos y predicción ponderada
+#   contenido:    perfil = R[lote] X   (suma de las características de las
+#                 películas vistas, ponderada por la calificación) y
+#                 afinidad = coseno(perfil, cada película) = perfil_n X_n^T
+# y se combinan con pesos:
+#   puntaje = Σ_s w_s v_s / Σ_s w_s      (solo señales disponibles)
+# Una señal no disponible (p. ej. ningún vecino vio la película, o un
+# usuario sin perfil de contenido) no cuenta en el promedio: el puntaje sale
+# de las demás. Las películas ya vistas quedan fuera (-inf).
+#
+# Escalas: el colaborativo y la SVD predicen calificaciones y el contenido
+# es un coseno. Por defecto (normalizacion="escala") SVD y colaborativo se
+# llevan a [0, 1] con el rango de calificaciones observado (lo que cae fuera
+# del rango se satura) y el coseno queda como está: un puntaje es absoluto,
+# y una película con predicción 2 de 5 puntúa bajo aunque sea la única
+# candidata. La SVD sobre la matriz con ceros predice valores cercanos a 0
+# en lo no visto, así que ahí su aporte es bajo para todas; con ALS predice
+# en la escala de calificaciones. normalizacion="fila" (min-max entre las
+# candidatas de cada usuario) solo ordena dentro del usuario: su peor
+# candidata vale 0 y la mejor 1, sean cuales sean sus valores.
+# ===============================================================
+
+import numpy as np
+import scipy.sparse as sp
+
+from colaborativo import (TEMPORALES_BLOQUE, operandos_similitud, predecir_colaborativo_lote, similitudes_bloque,
+                          top_k_bloque)
+from instrumentacion import medir
+from matriz_calificaciones import como_matriz, filas_por_bloque, normalizar_filas, normas_filas
+from topk import top_k_filas
+
+SENALES = ("svd", "colaborativo", "contenido")
+
+# Arreglos (b x n_peliculas) que crea un lote: las señales y sus máscaras,
+# la predicción colaborativa (sumas, cociente, predecible), la normalización
+# y la combinación (numerador, denominador, puntajes). Junto con los de la
+# similitud colaborativa (b x n_usuarios) fijan el tamaño de bloque por defecto.
+TEMPORALES_PELICULA = 14
+
+
+# -------------------------
+# _reescalar_filas
+# -------------------------
+# Min-max por fila entre las posiciones válidas; una fila con un solo valor
+# distinto (o ninguno) queda en 1.0 para sus válidas.
+def _reescalar_filas(valores, validos):
+    bajo = np.where(validos, valores, np.inf).min(axis=1, keepdims=True)
+    alto = np.where(validos, valores, -np.inf).max(axis=1, keepdims=True)
+    rango = alto - bajo
+    plano = ~(rango > 0)
+    return np.where(plano, 1.0, (valores - np.where(plano, 0.0, bajo)) / np.where(plano, 1.0, rango))
+
+
+# -------------------------
+# RecomendadorHibrido
+# -------------------------
+class RecomendadorHibrido:
+    """
+    Ranking único por usuario a partir de tres señales.
+    - calificaciones: matriz observada (lista de listas, np.ndarray,
+      scipy.sparse o MatrizCalificaciones)
+    - caracteristicas: matriz (n_peliculas x F) densa o dispersa; None
+      desactiva la señal de contenido
+    - U_k, S_k, Vt_k: factores de svd_y_reconstruccion, svd_truncada,
+      entrenar_als o cargar_svd; None desactiva la señal SVD
+    - pesos: dict señal -> peso (por defecto 1.0 para cada señal disponible;
+      peso 0 evita calcularla)
+    - k_vecinos: vecinos de la señal colaborativa
+    - normalizacion: "escala" (rango de calificaciones), "fila" (min-max por
+      usuario) o None (valores crudos)
+    """
+
+    def __init__(self, calificaciones, caracteristicas=None, U_k=None, S_k=None, Vt_k=None, pesos=None,
+                 k_vecinos=20, normalizacion="escala"):
+        if normalizacion not in ("fila", "escala", None):
+            raise ValueError(f"Normalización desconocida: {normalizacion!r}")
+        disponibles = {"svd": U_k is not None, "colaborativo": True, "contenido": caracteristicas is not None}
+        if pesos is None:
+            pesos = {s: 1.0 for s in SENALES if disponibles[s]}
+        for senal, peso in pesos.items():
+            if senal not in SENALES:
+                raise ValueError(f"Señal desconocida: {senal!r}")
+            if peso and not disponibles[senal]:
+                raise ValueError(f"La señal {senal!r} tiene peso pero faltan sus datos")
+        self.pesos = {s: float(pesos.get(s, 0.0)) for s in SENALES}
+        self.k_vecinos = k_vecinos
+        self.normalizacion = normalizacion
+
+        # Datos compartidos por todos los lotes: se preparan una sola vez
+        self.R = como_matriz(calificaciones)
+        self.n_usuarios, self.n_peliculas = self.R.shape
+        observadas = self.R.data if sp.issparse(self.R) else self.R[self.R != 0]
+        self.rango = (float(observadas.min()), float(observadas.max())) if observadas.size else (0.0, 1.0)
+
+        if self.pesos["svd"]:
+            self.U_k = U_k
+            self.SVt = S_k @ Vt_k
+        if self.pesos["colaborativo"]:
+            self._operandos = operandos_similitud(self.R)
+        if self.pesos["contenido"]:
+            X = como_matriz(caracteristicas)
+            self.normas_items = normas_filas(X)
+            self.X = X
+            Xn = normalizar_filas(X, self.normas_items)
+            self.XnT = Xn.T.tocsc() if sp.issparse(Xn) else Xn.T
+
+    # -------------------------
+    # senales
+    # -------------------------
+    def senales(self, usuarios_idx):
+        """
+        Señales alineadas para un lote de usuarios.
+        - Devuelve (vistas, valores, disponibles): vistas es (b x n) bool;
+          valores y disponibles son dicts señal -> (b x n), sin normalizar
+        """
+        usuarios = np.atleast_1d(np.asarray(usuarios_idx, dtype=np.intp))
+        Rb = self.R[usuarios]
+        if sp.issparse(Rb):
+            vistas = np.zeros(Rb.shape, dtype=bool)
+            coo = Rb.tocoo()
+            vistas[coo.row, coo.col] = True
+        else:
+            vistas = Rb != 0
+
+        valores, disponibles = {}, {}
+        if self.pesos["svd"]:
+            with medir("hibrido.svd"):
+                valores["svd"] = np.asarray(self.U_k[usuarios]) @ self.SVt
+                disponibles["svd"] = np.ones(vistas.shape, dtype=bool)
+
+        if self.pesos["colaborativo"]:
+            with medir("hibrido.colaborativo"):
+                sims = similitudes_bloque(self._operandos, usuarios)
+                vecinos_idx, vecinos_sim = top_k_bloque(sims, usuarios, self.k_vecinos)
+                valores["colaborativo"], disponibles["colaborativo"] = predecir_colaborativo_lote(
+                    self.R, usuarios, vecinos_idx, vecinos_sim)
+
+        if self.pesos["contenido"]:
+            with medir("hibrido.contenido"):
+                perfil = Rb @ self.X                         # Σ r_ui x_i por usuario
+                perfil = sp.csr_matrix(perfil) if sp.issparse(perfil) else np.asarray(perfil)
+                normas = normas_filas(perfil)
+                afinidad = normalizar_filas(perfil, normas) @ self.XnT
+                valores["contenido"] = afinidad.toarray() if sp.issparse(afinidad) else np.asarray(afinidad)
+                disponibles["contenido"] = (normas > 0)[:, None] & (self.normas_items > 0)[None, :]
+
+        return vistas, valores, disponibles
+
+    # -------------------------
+    # puntajes
+    # -------------------------
+    def _normalizar(self, senal, valores, validos):
+        if self.normalizacion == "fila":
+            return _reescalar_filas(valores, validos)
+        if self.normalizacion == "escala" and senal != "contenido":
+            bajo, alto = self.rango
+            escalados = (valores - bajo) / (alto - bajo) if alto > bajo else valores - bajo
+            return np.clip(escalados, 0.0, 1.0)
+        return valores
+
+    def puntajes(self, usuarios_idx):
+        """Matriz (b x n) de puntajes combinados; -inf = vista o sin señal."""
+        vistas, valores, disponibles = self.senales(usuarios_idx)
+        with medir("hibrido.combinacion"):
+            numerador = np.zeros(vistas.shape)
+            denominador = np.zeros(vistas.shape)
+            for senal, v in valores.items():
+                validos = disponibles[senal] & ~vistas
+                v = self._normalizar(senal, v, validos)
+                numerador += np.where(validos, self.pesos[senal] * v, 0.0)
+                denominador += self.pesos[senal] * validos
+            combinados = np.full(vistas.shape, -np.inf)
+            np.divide(numerador, denominador, out=combinados, where=denominador > 0)
+        return combinados
+
+    # -------------------------
+    # recomendar
+    # -------------------------
+    def iterar_recomendaciones(self, usuarios_idx=None, n=10, tam_bloque=None):
+        """
+        Generador de (bloque, top) por bloques de usuarios; top es un arreglo
+        topk.VECINO (b x N) ordenado de mayor a menor (indice = -1 y puntaje
+        -inf cuando no quedan más películas candidatas).
+        - tam_bloque: usuarios por lote (None = los que caben en
+          matriz_calificaciones.MEMORIA_BLOQUE)
+        """
+        usuarios_idx = np.arange(self.n_usuarios) if usuarios_idx is None \
+            else np.atleast_1d(np.asarray(usuarios_idx, dtype=np.intp))
+        if tam_bloque is None:
+            por_usuario = TEMPORALES_BLOQUE * self.n_usuarios if self.pesos["colaborativo"] else 0
+            tam_bloque = filas_por_bloque(por_usuario + TEMPORALES_PELICULA * self.n_peliculas)
+        for inicio in range(0, len(usuarios_idx), tam_bloque):
+            bloque = usuarios_idx[inicio:inicio + tam_bloque]
+            puntajes = self.puntajes(bloque)
+            with medir("hibrido.top_n"):
+                top = top_k_filas(puntajes, n)
+            yield bloque, top
+
+    def recomendar(self, usuarios_idx=None, n=10, tam_bloque=None):
+        """(usuarios, top): todos los bloques de iterar_recomendaciones reunidos."""
+        bloques, tops = [], []
+        for bloque, top in self.iterar_recomendaciones(usuarios_idx, n, tam_bloque):
+            bloques.append(bloque)
+            tops.append(top)
+        if not bloques:
+            return np.empty(0, dtype=np.intp), top_k_filas(np.empty((0, self.n_peliculas)), n)
+        return np.concatenate(bloques), np.vstack(tops)
+
+
+# -------------------------
+# recomendar_hibrido
+# -------------------------
+def recomendar_hibrido(calificaciones, caracteristicas=None, U_k=None, S_k=None, Vt_k=None, usuarios_idx=None,
+                       n=10, pesos=None, k_vecinos=20, normalizacion="escala"):
+    """Atajo: RecomendadorHibrido(...).recomendar(usuarios_idx, n)."""
+    hibrido = RecomendadorHibrido(calificaciones, caracteristicas, U_k, S_k, Vt_k, pesos, k_vecinos, normalizacion)
+    return hibrido.recomendar(usuarios_idx, n)
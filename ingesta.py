@@ -0,0 +1,226 @@
+# ingesta.py
+# ===============================================================
+# INGESTA POR BLOQUES DE REGISTROS DE CALIFICACIONES
+# ===============================================================
+# Los registros (usuario, película, calificación, marca de tiempo) llegan
+# en archivos de varios GB. Se leen por bloques y cada bloque se convierte
+# de una vez con NumPy (sin analizar fila por fila en Python):
+#   1) ids del bloque -> posiciones globales (diccionario que crece)
+#   2) se acumulan arreglos COO (fila, columna, valor, marca)
+#   3) cada cierto número de filas se compactan los duplicados, así la
+#      memoria queda acotada por los pares (usuario, película) distintos
+# Duplicados: "ultimo" (gana la marca de tiempo más reciente; a igual
+# marca, la fila leída después) o "promedio".
+# ===============================================================
+
+import numpy as np
+import scipy.sparse as sp
+
+from matriz_calificaciones import MatrizCalificaciones
+
+
+# -------------------------
+# _DiccionarioIds
+# -------------------------
+# id -> posición sin recorrer los registros en Python: se mantiene un
+# arreglo ordenado de ids conocidos y cada bloque se resuelve con
+# np.unique + np.searchsorted. Solo los ids nuevos pasan a la lista.
+class _DiccionarioIds:
+    def __init__(self):
+        self.ids = []
+        self._ordenados = None
+        self._posiciones = np.empty(0, dtype=np.int64)
+
+    def posiciones(self, ids):
+        unicos, inverso = np.unique(np.asarray(ids), return_inverse=True)
+        mapa = np.empty(len(unicos), dtype=np.int64)
+
+        if self._ordenados is None:
+            existe = np.zeros(len(unicos), dtype=bool)
+        else:
+            j = np.searchsorted(self._ordenados, unicos)
+            j_valido = np.minimum(j, len(self._ordenados) - 1)
+            existe = (j < len(self._ordenados)) & (self._ordenados[j_valido] == unicos)
+            mapa[existe] = self._posiciones[j_valido[existe]]
+
+        nuevos = unicos[~existe]
+        if len(nuevos):
+            mapa[~existe] = np.arange(len(self.ids), len(self.ids) + len(nuevos))
+            self.ids.extend(nuevos.tolist())
+            ordenados = nuevos if self._ordenados is None else np.concatenate([self._ordenados, nuevos])
+            posiciones = np.concatenate([self._posiciones, mapa[~existe]])
+            orden = np.argsort(ordenados, kind="stable")
+            self._ordenados, self._posiciones = ordenados[orden], posiciones[orden]
+
+        return mapa[inverso.ravel()]
+
+
+# -------------------------
+# ConstructorMatriz
+# -------------------------
+class ConstructorMatriz:
+    """
+    Construye una MatrizCalificaciones de forma incremental.
+    - agregar(usuarios, items, valores, marcas=None): un bloque de registros
+      (arreglos de igual longitud; sin marcas se usa el orden de llegada)
+    - matriz(): compacta y devuelve la MatrizCalificaciones
+    - compactar_cada: filas acumuladas que disparan una compactación
+    """
+
+    def __init__(self, duplicados="ultimo", compactar_cada=20_000_000):
+        if duplicados not in ("ultimo", "promedio"):
+            raise ValueError(f"Política de duplicados desconocida: {duplicados!r}")
+        self.duplicados = duplicados
+        self.compactar_cada = compactar_cada
+
+        self._usuarios = _DiccionarioIds()
+        self._items = _DiccionarioIds()
+
+        self._partes = []          # lista de (filas, cols, valores, conteos, marcas)
+        self._pendientes = 0
+        self._secuencia = 0        # marca implícita cuando no hay marcas de tiempo
+        self.filas_leidas = 0
+
+    @property
+    def usuarios(self):
+        return self._usuarios.ids
+
+    @property
+    def items(self):
+        return self._items.ids
+
+    def agregar(self, usuarios, items, valores, marcas=None):
+        valores = np.asarray(valores, dtype=float)
+        n = len(valores)
+        if n == 0:
+            return   # bloque vacío (p. ej. un trozo del CSV sin filas tras filtrar)
+        if marcas is None:
+            marcas = np.arange(self._secuencia, self._secuencia + n, dtype=float)
+            self._secuencia += n
+        filas = self._usuarios.posiciones(usuarios)
+        cols = self._items.posiciones(items)
+
+        self._partes.append((filas, cols, valores, np.ones(n), np.asarray(marcas, dtype=float)))
+        self._pendientes += n
+        self.filas_leidas += n
+        if self._pendientes >= self.compactar_cada:
+            self._compactar()
+
+    # -------------------------
+    # _compactar
+    # -------------------------
+    # Un solo ordenamiento por clave (fila, columna) empaquetada en int64 y
+    # reducción por grupos con reduceat:
+    #  - "ultimo": dentro de cada grupo, la mayor marca; a igual marca, la
+    #    posición de llegada más alta
+    #  - "promedio": se conservan suma y conteo para promediar al final
+    def _compactar(self):
+        if not self._partes:
+            return
+        filas, cols, valores, conteos, marcas = (np.concatenate(c) for c in zip(*self._partes))
+        if len(filas) == 0:
+            # reduceat no acepta arreglos vacíos: sin filas no hay nada que agrupar
+            self._partes = []
+            self._pendientes = 0
+            return
+
+        orden = np.argsort((filas << 32) | cols)
+        clave = (filas[orden] << 32) | cols[orden]
+        inicio = np.flatnonzero(np.r_[True, clave[1:] != clave[:-1]])
+        tam = np.diff(np.r_[inicio, len(clave)])
+
+        if self.duplicados == "ultimo":
+            marcas_ord = marcas[orden]
+            maxima = np.repeat(np.maximum.reduceat(marcas_ord, inicio), tam)
+            llegada = np.where(marcas_ord == maxima, orden, -1)
+            elegidos = np.maximum.reduceat(llegada, inicio)
+            valores, conteos, marcas = valores[elegidos], conteos[elegidos], marcas[elegidos]
+        else:
+            valores = np.add.reduceat(valores[orden], inicio)
+            conteos = np.add.reduceat(conteos[orden], inicio)
+            marcas = np.maximum.reduceat(marcas[orden], inicio)
+
+        primeros = orden[inicio]
+        self._partes = [(filas[primeros], cols[primeros], valores, conteos, marcas)]
+        self._pendientes = 0
+
+    def matriz(self):
+        """MatrizCalificaciones con los registros leídos hasta ahora."""
+        self._compactar()
+        forma = (len(self.usuarios), len(self.items))
+        if not self._partes:
+            return MatrizCalificaciones(sp.csr_matrix(forma), self.usuarios, self.items)
+        filas, cols, valores, conteos, _ = self._partes[0]
+        if self.duplicados == "promedio":
+            valores = valores / conteos
+        return MatrizCalificaciones(sp.csr_matrix((valores, (filas, cols)), shape=forma), self.usuarios, self.items)
+
+
+# -------------------------
+# iterar_bloques_csv
+# -------------------------
+# Lee ~tam_bloque_bytes de líneas completas por vez y las convierte con
+# np.loadtxt (analizador en C). Con ids numéricos todo se lee como float64
+# (exacto para enteros < 2^53); con ids de texto se leen como cadenas.
+def iterar_bloques_csv(ruta, separador=",", encabezado=True, columnas=(0, 1, 2, 3),
+                       ids_texto=False, tam_bloque_bytes=1 << 24):
+    """
+    Genera (usuarios, items, valores, marcas) por bloque de un CSV.
+    - columnas: posiciones de (usuario, película, calificación[, marca]);
+      con tres columnas, marcas es None
+    """
+    con_marca = len(columnas) == 4
+    with open(ruta, encoding="utf-8") as f:
+        if encabezado:
+            f.readline()
+        while True:
+            lineas = f.readlines(tam_bloque_bytes)
+            if not lineas:
+                break
+            tabla = np.loadtxt(lineas, delimiter=separador, usecols=columnas,
+                               dtype=str if ids_texto else float, ndmin=2)
+            usuarios, items = tabla[:, 0], tabla[:, 1]
+            if not ids_texto:
+                usuarios, items = usuarios.astype(np.int64), items.astype(np.int64)
+            valores = tabla[:, 2].astype(float)
+            marcas = tabla[:, 3].astype(float) if con_marca else None
+            yield usuarios, items, valores, marcas
+
+
+# -------------------------
+# leer_calificaciones_csv
+# -------------------------
+def leer_calificaciones_csv(ruta, separador=",", encabezado=True, columnas=(0, 1, 2, 3),
+                            ids_texto=False, duplicados="ultimo", tam_bloque_bytes=1 << 24,
+                            compactar_cada=20_000_000):
+    """
+    MatrizCalificaciones a partir de un CSV de registros, leído por bloques.
+    """
+    constructor = ConstructorMatriz(duplicados, compactar_cada)
+    for bloque in iterar_bloques_csv(ruta, separador, encabezado, columnas, ids_texto, tam_bloque_bytes):
+        constructor.agregar(*bloque)
+    return constructor.matriz()
+
+
+# -------------------------
+# leer_calificaciones_parquet
+# -------------------------
+# Requiere pyarrow (dependencia opcional): se recorren los lotes de filas
+# del archivo sin cargarlo completo.
+def leer_calificaciones_parquet(ruta, columnas=("usuario", "item", "calificacion", "marca"),
+                                duplicados="ultimo", filas_por_lote=1 << 20, compactar_cada=20_000_000):
+    """
+    MatrizCalificaciones a partir de un archivo Parquet, leído por lotes.
+    - columnas: nombres de (usuario, película, calificación[, marca])
+    """
+    try:
+        import pyarrow.parquet as pq
+    except ImportError as error:
+        raise ImportError("leer_calificaciones_parquet requiere pyarrow (pip install pyarrow)") from error
+
+    constructor = ConstructorMatriz(duplicados, compactar_cada)
+    archivo = pq.ParquetFile(ruta)
+    for lote in archivo.iter_batches(batch_size=filas_por_lote, columns=list(columnas)):
+        datos = [lote.column(i).to_numpy(zero_copy_only=False) for i in range(len(columnas))]
+        constructor.agregar(datos[0], datos[1], datos[2], datos[3] if len(columnas) == 4 else None)
+    return constructor.matriz()
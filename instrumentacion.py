@@ -0,0 +1,272 @@
+# instrumentacion.py
+# ===============================================================
+# INSTRUMENTACIÓN DE ETAPAS: TEMPORIZADORES, CONTADORES Y PERFILADO
+# ===============================================================
+# Cuando la latencia se dispara hay que saber en qué etapa se fue el tiempo
+# (similitud, selección de vecinos, predicción, SVD, ...). Este módulo da:
+#  - medir("etapa"): bloque with que acumula la duración de la etapa
+#  - instrumentar("etapa"): lo mismo como decorador de funciones
+#  - contar("nombre", valor): contadores de eventos
+#  - agregar_observador(f): f(etapa, segundos) al cerrar cada medición
+#    (gancho para registrar, alertar o disparar un perfilado)
+#  - PerfiladorMuestreo: muestrea la pila de un hilo cada pocos ms y
+#    acumula pilas colapsadas (formato de flamegraph.pl / speedscope)
+#  - exportar_prometheus / escribir_prometheus: instantánea en formato de
+#    texto de Prometheus (histogramas por etapa y contadores)
+#
+# Desactivado por defecto: medir() devuelve un objeto vacío compartido y
+# los decoradores solo comprueban una bandera, así el costo sin métricas es
+# una llamada extra. Se activa con activar() o RECOMENDACION_METRICAS=1.
+# ===============================================================
+
+from bisect import bisect_left
+from collections import Counter
+from functools import wraps
+import os
+import sys
+import threading
+import time
+
+# Límites superiores (segundos) de las cubetas del histograma de etapas
+LIMITES = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_ACTIVO = os.environ.get("RECOMENDACION_METRICAS", "") not in ("", "0")
+
+
+# -------------------------
+# Registro
+# -------------------------
+class Registro:
+    """
+    Métricas acumuladas (seguro entre hilos).
+    - etapas: dict etapa -> {"conteo", "suma", "maximo", "cubetas"}
+    - contadores: dict nombre -> valor
+    - observadores: funciones f(etapa, segundos) llamadas tras cada medición
+    """
+
+    def __init__(self, limites=LIMITES):
+        self.limites = tuple(limites)
+        self.etapas = {}
+        self.contadores = {}
+        self.observadores = []
+        self._cerrojo = threading.Lock()
+
+    def observar(self, etapa, segundos):
+        with self._cerrojo:
+            datos = self.etapas.get(etapa)
+            if datos is None:
+                datos = self.etapas[etapa] = {"conteo": 0, "suma": 0.0, "maximo": 0.0,
+                                              "cubetas": [0] * (len(self.limites) + 1)}
+            datos["conteo"] += 1
+            datos["suma"] += segundos
+            datos["maximo"] = max(datos["maximo"], segundos)
+            datos["cubetas"][bisect_left(self.limites, segundos)] += 1
+        for observador in self.observadores:
+            observador(etapa, segundos)
+
+    def contar(self, nombre, valor=1):
+        with self._cerrojo:
+            self.contadores[nombre] = self.contadores.get(nombre, 0) + valor
+
+    def limpiar(self):
+        with self._cerrojo:
+            self.etapas.clear()
+            self.contadores.clear()
+
+    def instantanea(self):
+        """Copia de las métricas: {"etapas": {...}, "contadores": {...}}."""
+        with self._cerrojo:
+            etapas = {e: {**d, "cubetas": list(d["cubetas"])} for e, d in self.etapas.items()}
+            return {"etapas": etapas, "contadores": dict(self.contadores)}
+
+    def prometheus(self, prefijo="recomendacion"):
+        """Texto en formato de exposición de Prometheus."""
+        datos = self.instantanea()
+        lineas = [f"# HELP {prefijo}_etapa_segundos Duración de cada etapa instrumentada.",
+                  f"# TYPE {prefijo}_etapa_segundos histogram"]
+        for etapa, d in sorted(datos["etapas"].items()):
+            acumulado = 0
+            for limite, cantidad in zip(self.limites + (float("inf"),), d["cubetas"]):
+                acumulado += cantidad
+                le = "+Inf" if limite == float("inf") else repr(limite)
+                lineas.append(f'{prefijo}_etapa_segundos_bucket{{etapa="{etapa}",le="{le}"}} {acumulado}')
+            lineas.append(f'{prefijo}_etapa_segundos_sum{{etapa="{etapa}"}} {d["suma"]!r}')
+            lineas.append(f'{prefijo}_etapa_segundos_count{{etapa="{etapa}"}} {d["conteo"]}')
+
+        lineas += [f"# HELP {prefijo}_eventos_total Contadores de eventos.",
+                   f"# TYPE {prefijo}_eventos_total counter"]
+        for nombre, valor in sorted(datos["contadores"].items()):
+            lineas.append(f'{prefijo}_eventos_total{{nombre="{nombre}"}} {valor}')
+        return "\n".join(lineas) + "\n"
+
+
+REGISTRO = Registro()
+
+
+# -------------------------
+# Activación
+# -------------------------
+def activar():
+    global _ACTIVO
+    _ACTIVO = True
+
+
+def desactivar():
+    global _ACTIVO
+    _ACTIVO = False
+
+
+def activo():
+    return _ACTIVO
+
+
+# -------------------------
+# medir / instrumentar / contar
+# -------------------------
+class _Medicion:
+    __slots__ = ("etapa", "inicio")
+
+    def __init__(self, etapa):
+        self.etapa = etapa
+
+    def __enter__(self):
+        self.inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, *_):
+        REGISTRO.observar(self.etapa, time.perf_counter() - self.inicio)
+        return False
+
+
+class _Nula:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        return False
+
+
+_NULA = _Nula()
+
+
+def medir(etapa):
+    """Bloque with que mide la etapa (no hace nada si está desactivado)."""
+    return _Medicion(etapa) if _ACTIVO else _NULA
+
+
+def instrumentar(etapa):
+    """Decorador: mide cada llamada a la función como la etapa indicada."""
+    def decorador(funcion):
+        @wraps(funcion)
+        def envoltura(*args, **kwargs):
+            if not _ACTIVO:
+                return funcion(*args, **kwargs)
+            inicio = time.perf_counter()
+            try:
+                return funcion(*args, **kwargs)
+            finally:
+                REGISTRO.observar(etapa, time.perf_counter() - inicio)
+        return envoltura
+    return decorador
+
+
+def contar(nombre, valor=1):
+    if _ACTIVO:
+        REGISTRO.contar(nombre, valor)
+
+
+def agregar_observador(funcion):
+    REGISTRO.observadores.append(funcion)
+
+
+def quitar_observador(funcion):
+    REGISTRO.observadores.remove(funcion)
+
+
+# -------------------------
+# Exportación
+# -------------------------
+def exportar_prometheus(prefijo="recomendacion"):
+    return REGISTRO.prometheus(prefijo)
+
+
+def escribir_prometheus(ruta, prefijo="recomendacion"):
+    """
+    Escribe la instantánea en un archivo (p. ej. para el textfile collector
+    de node_exporter). Se escribe a un temporal y se renombra: el lector
+    nunca ve un archivo a medias.
+    """
+    temporal = f"{ruta}.tmp"
+    with open(temporal, "w", encoding="utf-8") as f:
+        f.write(exportar_prometheus(prefijo))
+    os.replace(temporal, ruta)
+
+
+# -------------------------
+# PerfiladorMuestreo
+# -------------------------
+# Un hilo auxiliar lee la pila del hilo observado (sys._current_frames)
+# cada intervalo_ms y cuenta pilas iguales. El hilo observado no se toca:
+# el costo es proporcional a la frecuencia de muestreo, no al código medido.
+class PerfiladorMuestreo:
+    """
+    Perfilador estadístico de un hilo.
+    - hilo: identificador del hilo a muestrear (por defecto, el que llama a iniciar)
+    - pilas: Counter "modulo:funcion;modulo:funcion;..." -> muestras
+    - colapsado() / escribir(ruta): una línea "pila cantidad" por pila
+    - también se usa como bloque with
+    """
+
+    def __init__(self, intervalo_ms=5.0, hilo=None, profundidad=64):
+        self.intervalo = intervalo_ms / 1000.0
+        self.hilo = hilo
+        self.profundidad = profundidad
+        self.pilas = Counter()
+        self.muestras = 0
+        self._detener = threading.Event()
+        self._muestreador = None
+
+    def iniciar(self):
+        if self.hilo is None:
+            self.hilo = threading.get_ident()
+        self._detener.clear()
+        self._muestreador = threading.Thread(target=self._bucle, name="perfilador-muestreo", daemon=True)
+        self._muestreador.start()
+        return self
+
+    def detener(self):
+        self._detener.set()
+        if self._muestreador is not None:
+            self._muestreador.join()
+            self._muestreador = None
+        return self
+
+    def __enter__(self):
+        return self.iniciar()
+
+    def __exit__(self, *_):
+        self.detener()
+        return False
+
+    def _bucle(self):
+        while not self._detener.wait(self.intervalo):
+            marco = sys._current_frames().get(self.hilo)
+            if marco is None:
+                continue
+            pila = []
+            while marco is not None and len(pila) < self.profundidad:
+                codigo = marco.f_code
+                modulo = os.path.splitext(os.path.basename(codigo.co_filename))[0]
+                pila.append(f"{modulo}:{codigo.co_name}")
+                marco = marco.f_back
+            self.pilas[";".join(reversed(pila))] += 1
+            self.muestras += 1
+
+    def colapsado(self):
+        return "\n".join(f"{pila} {n}" for pila, n in self.pilas.most_common())
+
+    def escribir(self, ruta):
+        with open(ruta, "w", encoding="utf-8") as f:
+            f.write(self.colapsado() + "\n")
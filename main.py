@@ -7,6 +7,10 @@
 from colaborativo import detalle_similitudes_usuario, predecir_colaborativo_detalle
 from contenido import detalle_similitud_peliculas
 from svd_system import svd_y_reconstruccion_detalle, predicciones_svd_detalle
+from als import entrenar_als
+from hibrido import RecomendadorHibrido
+from instrumentacion import activo, exportar_prometheus, medir
+from topk import top_k_pares
 
 # -------------------------
 # Datos de ejemplo
@@ -44,7 +48,9 @@ similitudes = detalle_similitudes_usuario(calificaciones, usuarios, 0)
 
 # Paso B: escogemos los top2 vecinos por similitud (índice, similitud)
 # Nota algebraica: ordenar por coseno es ordenar por la proyección relativa.
-top2 = [(i, sim) for (i, sim, _, _) in sorted(similitudes, key=lambda x: x[1], reverse=True)[:2]]
+# Selección parcial (top_k_pares): no hace falta ordenar toda la lista.
+with medir("colaborativo.seleccion_vecinos"):
+    top2 = top_k_pares(similitudes, 2).tolist()
 
 # Paso C: predicción ponderada usando los vecinos seleccionados
 preds_colab = predecir_colaborativo_detalle(calificaciones, usuarios, peliculas, 0, top2)
@@ -66,8 +72,37 @@ print("\nPelículas más parecidas a Matrix (contenido):", recs_contenido)
 # -------------------------
 # Objetivo: factorizar la matriz y predecir en espacio latente (k=2)
 # Paso A: descomponer y truncar (obtener U_k, S_k, Vt_k)
-U_k, S_k, Vt_k, A_approx = svd_y_reconstruccion_detalle(calificaciones, k=2)
+# MOTOR_FACTORIZACION = "als" ajusta solo las calificaciones observadas
+# (los 0 no se tratan como calificaciones) y devuelve factores compatibles.
+MOTOR_FACTORIZACION = "svd"
+if MOTOR_FACTORIZACION == "als":
+    U_k, S_k, Vt_k, _ = entrenar_als(calificaciones, k=2, semilla=0)
+else:
+    U_k, S_k, Vt_k, A_approx = svd_y_reconstruccion_detalle(calificaciones, k=2)
 
 # Paso B: predecir usando vectores latentes para Ana (índice 0)
 preds_svd = predicciones_svd_detalle(U_k, S_k, Vt_k, calificaciones, 0, usuarios, peliculas)
 print("\nPredicciones SVD (Ana):", preds_svd)
+
+
+# -------------------------
+# 4) HÍBRIDO
+# -------------------------
+# Objetivo: un solo ranking por usuario combinando las tres señales (SVD,
+# colaborativo con 2 vecinos y afinidad del perfil de contenido), calculadas
+# para todos los usuarios a la vez con un producto matricial por señal.
+hibrido = RecomendadorHibrido(calificaciones, caracteristicas_peliculas, U_k, S_k, Vt_k, k_vecinos=2)
+usuarios_idx, ranking = hibrido.recomendar(n=3)
+print("\nRanking híbrido (películas no vistas):")
+for u, fila in zip(usuarios_idx, ranking):
+    print(f"  {usuarios[u]}:", [(peliculas[i], round(p, 3)) for i, p in fila.tolist() if i >= 0])
+
+
+# -------------------------
+# Métricas (opcional)
+# -------------------------
+# Con RECOMENDACION_METRICAS=1 se imprime el tiempo por etapa en formato
+# Prometheus (ver instrumentacion.py); sin la variable no hay salida extra.
+if activo():
+    print()
+    print(exportar_prometheus(), end="")
@@ -0,0 +1,252 @@
+# matriz_calificaciones.py
+# ===============================================================
+# MATRIZ DE CALIFICACIONES DISPERSA (CSR) CON MAPAS DE IDENTIFICADORES
+# ===============================================================
+# En los ejemplos pequeños la matriz de calificaciones es una lista de listas
+# donde 0 significa "no vista". Con densidades reales (<0.5%) esa forma no
+# cabe en memoria, así que aquí se guarda solo lo observado:
+#   - csr: scipy.sparse.csr_matrix (usuarios x películas)
+#   - el SOPORTE de la matriz (entradas almacenadas) es la máscara de
+#     observaciones; una entrada ausente es "no vista", no un cero.
+# Los módulos colaborativo, contenido y svd_system aceptan este contenedor
+# (o una matriz scipy.sparse) directamente, sin densificar.
+# ===============================================================
+
+import numpy as np
+import scipy.sparse as sp
+
+
+# -------------------------
+# MatrizCalificaciones
+# -------------------------
+# Contenedor: matriz CSR + listas de ids (posición -> id) + diccionarios
+# inversos (id -> posición). Las filas son usuarios y las columnas películas.
+class MatrizCalificaciones:
+    """
+    Matriz de calificaciones dispersa con identificadores.
+    - csr: scipy.sparse.csr_matrix de forma (n_usuarios, n_items)
+    - usuarios / items: ids originales en el orden de filas / columnas
+    - indice_usuario / indice_item: diccionarios id -> posición
+    """
+
+    def __init__(self, csr, usuarios=None, items=None):
+        csr = sp.csr_matrix(csr, dtype=float)
+        csr.sum_duplicates()
+        csr.sort_indices()
+        self.csr = csr
+
+        n_usuarios, n_items = csr.shape
+        self.usuarios = list(range(n_usuarios)) if usuarios is None else list(usuarios)
+        self.items = list(range(n_items)) if items is None else list(items)
+        if len(self.usuarios) != n_usuarios or len(self.items) != n_items:
+            raise ValueError("La cantidad de ids no coincide con la forma de la matriz")
+
+        self.indice_usuario = {u: i for i, u in enumerate(self.usuarios)}
+        self.indice_item = {it: j for j, it in enumerate(self.items)}
+
+    # -------------------------
+    # Constructores
+    # -------------------------
+    @classmethod
+    def desde_tripletas(cls, usuarios, items, valores, duplicados="ultimo"):
+        """
+        Construye la matriz a partir de tripletas (usuario, item, calificación).
+        - usuarios / items: secuencias de ids (cualquier tipo ordenable)
+        - duplicados: "ultimo" (gana la última aparición), "promedio" o "suma"
+        - Los ids se numeran en orden ascendente.
+        """
+        usuarios = np.asarray(usuarios)
+        items = np.asarray(items)
+        valores = np.asarray(valores, dtype=float)
+        if not (len(usuarios) == len(items) == len(valores)):
+            raise ValueError("usuarios, items y valores deben tener la misma longitud")
+
+        ids_u, filas = np.unique(usuarios, return_inverse=True)
+        ids_i, cols = np.unique(items, return_inverse=True)
+        csr = _agrupar_duplicados(filas, cols, valores, (len(ids_u), len(ids_i)), duplicados)
+        return cls(csr, ids_u.tolist(), ids_i.tolist())
+
+    @classmethod
+    def desde_densa(cls, matriz, usuarios=None, items=None):
+        """
+        Convierte una matriz densa con la convención "0 = no vista".
+        - Es el único punto donde un cero se interpreta como dato faltante.
+        """
+        return cls(sp.csr_matrix(np.asarray(matriz, dtype=float)), usuarios, items)
+
+    # -------------------------
+    # Propiedades y accesos
+    # -------------------------
+    @property
+    def shape(self):
+        return self.csr.shape
+
+    @property
+    def nnz(self):
+        return self.csr.nnz
+
+    @property
+    def densidad(self):
+        m, n = self.csr.shape
+        return self.csr.nnz / (m * n) if m and n else 0.0
+
+    def mascara(self):
+        """Máscara de observaciones (CSR con 1.0 en cada entrada almacenada)."""
+        M = self.csr.copy()
+        M.data[:] = 1.0
+        return M
+
+    def fila(self, usuario_index):
+        """(indices_items, calificaciones) observados del usuario."""
+        ini, fin = self.csr.indptr[usuario_index], self.csr.indptr[usuario_index + 1]
+        return self.csr.indices[ini:fin], self.csr.data[ini:fin]
+
+    def a_csc(self):
+        """Misma matriz en formato CSC (acceso eficiente por película)."""
+        return self.csr.tocsc()
+
+    def a_densa(self, faltante=0.0):
+        """Densificación explícita: solo para matrices pequeñas."""
+        A = np.full(self.csr.shape, faltante, dtype=float)
+        coo = self.csr.tocoo()
+        A[coo.row, coo.col] = coo.data
+        return A
+
+
+# -------------------------
+# _agrupar_duplicados
+# -------------------------
+# Resuelve pares (fila, columna) repetidos sin bucles de Python:
+# ordenamiento estable por clave lineal y reducción por grupos.
+def _agrupar_duplicados(filas, cols, valores, forma, duplicados):
+    filas = np.asarray(filas, dtype=np.int64)
+    cols = np.asarray(cols, dtype=np.int64)
+    clave = filas * forma[1] + cols
+    orden = np.argsort(clave, kind="stable")
+    clave, valores = clave[orden], valores[orden]
+
+    # inicio de cada grupo de claves iguales
+    inicio = np.flatnonzero(np.r_[True, clave[1:] != clave[:-1]])
+    claves_unicas = clave[inicio]
+
+    if duplicados == "ultimo":
+        fin = np.r_[inicio[1:], len(clave)] - 1
+        reducidos = valores[fin]
+    elif duplicados == "suma":
+        reducidos = np.add.reduceat(valores, inicio) if len(valores) else valores
+    elif duplicados == "promedio":
+        conteos = np.diff(np.r_[inicio, len(clave)])
+        reducidos = (np.add.reduceat(valores, inicio) / conteos) if len(valores) else valores
+    else:
+        raise ValueError(f"Política de duplicados desconocida: {duplicados!r}")
+
+    return sp.csr_matrix((reducidos, (claves_unicas // forma[1], claves_unicas % forma[1])), shape=forma)
+
+
+# -------------------------
+# como_csr
+# -------------------------
+# Punto de entrada común de los módulos: acepta el contenedor, una matriz
+# scipy.sparse (soporte = observado) o una matriz densa (0 = no vista).
+def como_csr(calificaciones):
+    if isinstance(calificaciones, MatrizCalificaciones):
+        return calificaciones.csr
+    if sp.issparse(calificaciones):
+        return sp.csr_matrix(calificaciones, dtype=float)
+    return sp.csr_matrix(np.asarray(calificaciones, dtype=float))
+
+
+# -------------------------
+# como_matriz
+# -------------------------
+# Como como_csr, pero una entrada densa queda densa (np.ndarray float):
+# representación numérica de los productos matriciales de los módulos
+# (colaborativo, contenido, svd_system, precomputo, ...), que no densifica
+# lo disperso ni dispersa lo denso.
+def como_matriz(matriz):
+    if isinstance(matriz, MatrizCalificaciones):
+        return matriz.csr
+    if sp.issparse(matriz):
+        return sp.csr_matrix(matriz, dtype=float)
+    return np.asarray(matriz, dtype=float)
+
+
+# -------------------------
+# normas_filas / inversas_normas / normalizar_filas
+# -------------------------
+# ||x_i|| de todas las filas en una pasada (O(nnz) en dispersa) y el paso a
+# filas de norma 1, con el que el coseno es un producto punto. Una fila
+# nula tiene inversa 0 y queda nula (coseno 0 con todo).
+def normas_filas(matriz):
+    X = como_matriz(matriz)
+    if sp.issparse(X):
+        return np.sqrt(np.asarray(X.multiply(X).sum(axis=1)).ravel())
+    return np.sqrt(np.einsum("ij,ij->i", X, X))
+
+
+def inversas_normas(normas):
+    return np.divide(1.0, normas, out=np.zeros_like(normas), where=normas != 0)
+
+
+def normalizar_filas(matriz, normas=None):
+    """Filas de norma 1 (CSR si la entrada es dispersa); normas: ya calculadas."""
+    X = como_matriz(matriz)
+    inversas = inversas_normas(normas_filas(X) if normas is None else normas)
+    return (sp.diags(inversas) @ X).tocsr() if sp.issparse(X) else X * inversas[:, None]
+
+
+# -------------------------
+# filas_por_bloque
+# -------------------------
+# Los cálculos por bloques de filas (similitudes, top-N, ...) crean
+# temporales densos float64 de (bloque x columnas). El tamaño de bloque por
+# defecto sale de un presupuesto de memoria: con valores_por_fila = suma de
+# las columnas de todos los temporales de una fila, el bloque ocupa a lo
+# sumo `memoria` bytes, sea cual sea el número de usuarios o películas.
+MEMORIA_BLOQUE = 1 << 28      # 256 MB
+
+
+def filas_por_bloque(valores_por_fila, memoria=MEMORIA_BLOQUE):
+    return max(1, int(memoria) // (8 * max(int(valores_por_fila), 1)))
+
+
+# -------------------------
+# es_dispersa
+# -------------------------
+def es_dispersa(calificaciones):
+    return isinstance(calificaciones, MatrizCalificaciones) or sp.issparse(calificaciones)
+
+
+# -------------------------
+# observadas_fila
+# -------------------------
+# Diccionario {columna: calificación} con lo observado en una fila.
+# Permite a las funciones explicativas trabajar sobre cualquier entrada
+# sin densificar la matriz completa.
+def observadas_fila(calificaciones, fila_index):
+    if es_dispersa(calificaciones):
+        R = calificaciones.csr if isinstance(calificaciones, MatrizCalificaciones) else calificaciones.tocsr()
+        ini, fin = R.indptr[fila_index], R.indptr[fila_index + 1]
+        return dict(zip(R.indices[ini:fin].tolist(), R.data[ini:fin].tolist()))
+    return {j: v for j, v in enumerate(calificaciones[fila_index]) if v != 0}
+
+
+# -------------------------
+# indices_observados
+# -------------------------
+# Versión vectorizada de observadas_fila: solo las columnas observadas
+# como np.ndarray, para las rutas silenciosas que no necesitan los valores.
+def indices_observados(calificaciones, fila_index):
+    if es_dispersa(calificaciones):
+        R = calificaciones.csr if isinstance(calificaciones, MatrizCalificaciones) else calificaciones.tocsr()
+        return R.indices[R.indptr[fila_index]:R.indptr[fila_index + 1]].copy()
+    return np.flatnonzero(np.asarray(calificaciones[fila_index]))
+
+
+# -------------------------
+# forma_matriz
+# -------------------------
+def forma_matriz(calificaciones):
+    if es_dispersa(calificaciones):
+        return calificaciones.shape
+    return (len(calificaciones), len(calificaciones[0]) if len(calificaciones) else 0)
@@ -0,0 +1,364 @@
+# precomputo.py
+# ===============================================================
+# PRECÓMPUTO Y CACHÉ: NORMAS Y VECINOS MÁS SIMILARES (TOP-K)
+# ===============================================================
+# La similitud coseno necesita ||a|| y ||b||. En los cálculos por pares la
+# norma del objetivo se recalcula en cada comparación; aquí se calculan una
+# sola vez para todas las filas (usuarios o películas) y se reutilizan.
+#
+# Dos similitudes, según las filas:
+#  - "coseno": filas completas (películas por características, o R^T);
+#    se guardan las normas ||x_i||.
+#  - "comunes": solo columnas observadas por ambas filas, la de
+#    colaborativo (usuarios de una matriz de calificaciones). Ahí la norma
+#    depende de cada par (||a_común||), así que se guardan una sola vez R,
+#    su máscara y R∘R (colaborativo.operandos_similitud).
+#
+# Además se guardan, por entidad, sus k vecinos más similares:
+#  - matriz_similitud_top_k: matriz dispersa (n x n) con k entradas por fila
+#  - CacheSimilitudes: consulta por id con caché LRU acotada; una consulta
+#    repetida es una lectura O(k). Al cambiar la fila de una entidad se
+#    invalidan su norma y todas las listas de vecinos afectadas. Con
+#    "comunes" sus vecinos son los de colaborativo.vecinos_coseno y se le
+#    pasan a vecinos_coseno / predecir_colaborativo_lote (cache=...).
+# ===============================================================
+
+from collections import OrderedDict
+
+import numpy as np
+import scipy.sparse as sp
+
+from colaborativo import TEMPORALES_BLOQUE, operandos_similitud, similitudes_bloque, top_k_bloque, vecinos_coseno
+from matriz_calificaciones import MatrizCalificaciones, como_matriz, filas_por_bloque, normalizar_filas, normas_filas
+from topk import top_k_filas
+
+SIMILITUDES = ("coseno", "comunes")
+
+
+# -------------------------
+# CacheLRU
+# -------------------------
+# Diccionario con capacidad máxima: al llenarse descarta la clave usada
+# hace más tiempo (OrderedDict mantiene el orden de uso).
+class CacheLRU:
+    """
+    Caché LRU simple.
+    - obtener(clave) -> valor o None (y la marca como usada recientemente)
+    - guardar(clave, valor), invalidar(clave), limpiar()
+    - aciertos / fallos: contadores para medir la efectividad de la caché
+    """
+
+    def __init__(self, capacidad=10_000):
+        self.capacidad = capacidad
+        self._datos = OrderedDict()
+        self.aciertos = 0
+        self.fallos = 0
+
+    def obtener(self, clave):
+        if clave in self._datos:
+            self._datos.move_to_end(clave)
+            self.aciertos += 1
+            return self._datos[clave]
+        self.fallos += 1
+        return None
+
+    def guardar(self, clave, valor):
+        self._datos[clave] = valor
+        self._datos.move_to_end(clave)
+        while len(self._datos) > self.capacidad:
+            self._datos.popitem(last=False)
+
+    def invalidar(self, clave):
+        self._datos.pop(clave, None)
+
+    def limpiar(self):
+        self._datos.clear()
+
+    def items(self):
+        return list(self._datos.items())
+
+    def __contains__(self, clave):
+        return clave in self._datos
+
+    def __len__(self):
+        return len(self._datos)
+
+
+# -------------------------
+# matriz_similitud_top_k
+# -------------------------
+# Similitud entre filas, conservando solo las k mayores por fila (sin la
+# propia fila). Se procesa por bloques: memoria ~ tam_bloque x n (por
+# defecto, el tamaño que cabe en matriz_calificaciones.MEMORIA_BLOQUE).
+def matriz_similitud_top_k(matriz, k=20, tam_bloque=None, similitud="coseno"):
+    """
+    Matriz dispersa (n x n) de vecinos: fila i = k filas más similares a i.
+    - similitud="coseno": sobre las filas completas (dispersas o densas);
+      las similitudes exactamente 0 no se almacenan.
+    - similitud="comunes": sobre las columnas observadas por ambas filas,
+      como colaborativo.vecinos_coseno; cada fila guarda, en orden, sus
+      min(k, n-1) vecinos, incluidos los de similitud 0.
+    """
+    if similitud not in SIMILITUDES:
+        raise ValueError(f"Similitud desconocida: {similitud!r}")
+    X = como_matriz(matriz)
+    n = X.shape[0]
+    if similitud == "comunes":
+        if n < 2:
+            return sp.csr_matrix((n, n))
+        idx, vals = vecinos_coseno(X, k, tam_bloque=tam_bloque)
+        # (data, indices, indptr): conserva el orden y los ceros explícitos
+        return sp.csr_matrix((vals.ravel(), idx.ravel(), np.arange(0, idx.size + 1, idx.shape[1])), shape=(n, n))
+
+    if tam_bloque is None:
+        tam_bloque = filas_por_bloque(3 * n)      # sims, la copia de top_k_filas y su partición
+    Xn = normalizar_filas(X)
+    XnT = Xn.T.tocsc() if sp.issparse(Xn) else Xn.T
+
+    filas, cols, vals = [], [], []
+    for inicio in range(0, n, tam_bloque):
+        bloque = np.arange(inicio, min(inicio + tam_bloque, n))
+        sims = Xn[bloque] @ XnT
+        sims = sims.toarray() if sp.issparse(sims) else np.asarray(sims)
+
+        top = top_k_filas(sims, k, excluir=bloque)          # sin la propia fila
+        validos = (top["indice"] >= 0) & (top["puntaje"] != 0)
+        filas.append(np.broadcast_to(bloque[:, None], top.shape)[validos])
+        cols.append(top["indice"][validos])
+        vals.append(top["puntaje"][validos])
+
+    if not filas:
+        return sp.csr_matrix((n, n))
+    return sp.csr_matrix((np.concatenate(vals), (np.concatenate(filas), np.concatenate(cols))), shape=(n, n))
+
+
+# -------------------------
+# _reemplazar_filas
+# -------------------------
+# CSR con las filas `posiciones` (ordenadas, sin repetir) de X reemplazadas
+# por las de `nuevas` (CSR, una fila por posición), en una sola pasada
+# vectorizada: cada entrada conservada se copia a su nuevo desplazamiento.
+def _reemplazar_filas(X, posiciones, nuevas):
+    largos = np.diff(X.indptr)
+    largos_nuevos = np.diff(nuevas.indptr)
+    largos_final = largos.copy()
+    largos_final[posiciones] = largos_nuevos
+    indptr = np.r_[0, np.cumsum(largos_final)]
+    data = np.empty(indptr[-1], dtype=X.data.dtype)
+    indices = np.empty(indptr[-1], dtype=X.indices.dtype)
+
+    conservar = np.ones(X.shape[0], dtype=bool)
+    conservar[posiciones] = False
+    fila = np.repeat(np.arange(X.shape[0]), largos)
+    sel = conservar[fila]
+    destino = (np.arange(X.nnz) - X.indptr[fila] + indptr[fila])[sel]
+    data[destino], indices[destino] = X.data[sel], X.indices[sel]
+
+    fila = np.repeat(posiciones, largos_nuevos)
+    destino = np.arange(nuevas.nnz) - np.repeat(nuevas.indptr[:-1], largos_nuevos) + indptr[fila]
+    data[destino], indices[destino] = nuevas.data, nuevas.indices
+    return sp.csr_matrix((data, indices, indptr), shape=X.shape)
+
+
+# -------------------------
+# CacheSimilitudes
+# -------------------------
+class CacheSimilitudes:
+    """
+    Normas y vecinos top-k por entidad (filas de la matriz), con invalidación.
+    - matriz: filas = entidades (usuarios de R, películas de características,
+      o R.T para películas según calificaciones)
+    - ids: identificadores de las filas (por defecto la posición; si es
+      MatrizCalificaciones, sus ids de usuario)
+    - similitud: "coseno" (filas completas) o "comunes" (columnas en común,
+      la de colaborativo); por defecto "comunes" para un MatrizCalificaciones
+      y "coseno" para lo demás
+    - capacidad: máximo de listas de vecinos en la caché LRU
+    - precalcular=True construye matriz_similitud_top_k para todas las filas
+    - normas: ||x_i|| por fila con "coseno" (None con "comunes"), al día tras
+      cada actualización; p. ej. contenido.similitud_peliculas(X, i, normas=cache.normas)
+    """
+
+    def __init__(self, matriz, ids=None, k=20, capacidad=10_000, precalcular=False, similitud=None):
+        if similitud is None:
+            similitud = "comunes" if isinstance(matriz, MatrizCalificaciones) else "coseno"
+        if similitud not in SIMILITUDES:
+            raise ValueError(f"Similitud desconocida: {similitud!r}")
+        if ids is None and isinstance(matriz, MatrizCalificaciones):
+            ids = matriz.usuarios
+        # copia propia: actualizar escribe filas en el lugar
+        self.X = como_matriz(matriz).copy()
+        if sp.issparse(self.X):
+            self.X.sort_indices()
+        self.ids = list(range(self.X.shape[0])) if ids is None else list(ids)
+        self.posicion = {e: i for i, e in enumerate(self.ids)}
+        self.similitud = similitud
+        self.k = k
+        # con "comunes" cada lista tiene siempre min(k, n-1) vecinos (como vecinos_coseno)
+        self.k_efectivo = min(k, self.X.shape[0] - 1)
+
+        self.normas = normas_filas(self.X) if similitud == "coseno" else None
+        self._operandos = operandos_similitud(self.X) if similitud == "comunes" else None
+        self.cache = CacheLRU(capacidad)
+        self.top_k = matriz_similitud_top_k(self.X, k, similitud=similitud) if precalcular else None
+        self._filas_obsoletas = set()      # filas de top_k que deben recalcularse
+
+    # -------------------------
+    # Consultas
+    # -------------------------
+    def _similitudes_filas(self, posiciones):
+        """Similitud (b x n) de las filas `posiciones` contra todas, con lo precalculado."""
+        if self.similitud == "comunes":
+            return similitudes_bloque(self._operandos, posiciones)
+        dots = self.X[posiciones] @ self.X.T
+        dots = dots.toarray() if sp.issparse(dots) else np.asarray(dots)
+        denom = self.normas[posiciones][:, None] * self.normas[None, :]
+        return np.divide(dots, denom, out=np.zeros_like(dots), where=denom != 0)
+
+    def _calcular_vecinos(self, posiciones):
+        sims = self._similitudes_filas(posiciones)
+        if self.similitud == "comunes":
+            return list(zip(*top_k_bloque(sims, posiciones, self.k)))
+        top = top_k_filas(sims, self.k, excluir=posiciones)
+        validos = (top["indice"] >= 0) & (top["puntaje"] != 0)
+        return [(fila["indice"][v], fila["puntaje"][v]) for fila, v in zip(top, validos)]
+
+    def _leer(self, pos):
+        """(cols, vals) de la caché o de la fila precalculada vigente; None si no hay."""
+        res = self.cache.obtener(pos)
+        if res is None and self.top_k is not None and pos not in self._filas_obsoletas:
+            ini, fin = self.top_k.indptr[pos], self.top_k.indptr[pos + 1]
+            cols, vals = self.top_k.indices[ini:fin], self.top_k.data[ini:fin]
+            orden = np.argsort(-vals, kind="stable")
+            res = (cols[orden], vals[orden])
+            self.cache.guardar(pos, res)
+        return res
+
+    def _vecinos_posiciones(self, posiciones, tam_bloque=None):
+        """Dict pos -> (cols, vals); las que faltan se calculan juntas, por bloques."""
+        if tam_bloque is None:
+            tam_bloque = filas_por_bloque(TEMPORALES_BLOQUE * self.X.shape[0])
+        res, faltan = {}, []
+        for pos in np.unique(posiciones).tolist():
+            r = self._leer(pos)
+            if r is None:
+                faltan.append(pos)
+            else:
+                res[pos] = r
+        for inicio in range(0, len(faltan), tam_bloque):
+            bloque = np.array(faltan[inicio:inicio + tam_bloque], dtype=np.intp)
+            for pos, r in zip(bloque.tolist(), self._calcular_vecinos(bloque)):
+                self.cache.guardar(pos, r)
+                res[pos] = r
+        return res
+
+    def vecinos(self, entidad):
+        """
+        Lista [(id, similitud)] de los k vecinos más similares, de mayor a menor.
+        - Acierto en caché o fila precalculada vigente: O(k).
+        """
+        cols, vals = self._vecinos_posiciones([self.posicion[entidad]])[self.posicion[entidad]]
+        return [(self.ids[c], float(v)) for c, v in zip(cols, vals)]
+
+    def vecinos_lote(self, posiciones, k=None):
+        """
+        (indices, similitudes), ambos (b, k), de mayor a menor, para las filas
+        `posiciones` (posiciones, no ids): el formato de colaborativo.vecinos_coseno.
+        - Solo con similitud="comunes"; k <= k_efectivo (por defecto, k_efectivo)
+        - Las filas que no están en caché se calculan juntas, por bloques.
+        """
+        if self.similitud != "comunes":
+            raise ValueError("vecinos_lote requiere similitud='comunes' (la de colaborativo)")
+        k = self.k_efectivo if k is None else min(k, self.X.shape[0] - 1)
+        if k > self.k_efectivo:
+            raise ValueError(f"La caché guarda {self.k_efectivo} vecinos por fila; se pidieron {k}")
+        posiciones = np.atleast_1d(np.asarray(posiciones, dtype=np.intp))
+        res = self._vecinos_posiciones(posiciones)
+        indices = np.empty((len(posiciones), k), dtype=np.intp)
+        similitudes = np.empty((len(posiciones), k), dtype=float)
+        for fila, pos in enumerate(posiciones.tolist()):
+            indices[fila], similitudes[fila] = res[pos][0][:k], res[pos][1][:k]
+        return indices, similitudes
+
+    # -------------------------
+    # Invalidación
+    # -------------------------
+    def actualizar(self, entidad, vector):
+        """Reemplaza la fila de una entidad; ver actualizar_varias."""
+        self.actualizar_varias({entidad: vector})
+
+    def actualizar_varias(self, cambios):
+        """
+        Reemplaza las filas de varias entidades ({id: vector}: calificaciones o
+        características nuevas) e invalida lo que dependa de ellas:
+        - sus normas (se recalculan) y sus propias listas de vecinos
+        - las listas que las contenían como vecinas
+        - las listas donde, con la nueva similitud, entrarían en el top-k
+        En dispersa, una fila que conserva sus columnas se escribe en el lugar
+        (O(nnz de la fila)); si cambian las columnas, la CSR se rearma una sola
+        vez por llamada. Conviene agrupar las actualizaciones.
+        """
+        if not cambios:
+            return
+        posiciones = np.array([self.posicion[e] for e in cambios], dtype=np.intp)
+        filas = np.array([np.asarray(v, dtype=float).ravel() for v in cambios.values()])
+        orden = np.argsort(posiciones)
+        posiciones, filas = posiciones[orden], filas[orden]
+
+        self._escribir_filas(posiciones, filas)
+        sims = self._similitudes_filas(posiciones)
+
+        # Caché LRU: revisar cada lista guardada
+        for pos in posiciones.tolist():
+            self.cache.invalidar(pos)
+        for clave, (cols, vals) in self.cache.items():
+            lleno = len(vals) >= self.k_efectivo
+            minimo = vals.min() if len(vals) else -np.inf
+            nuevas = sims[:, clave]
+            if np.isin(posiciones, cols).any() or (np.any(nuevas > minimo) if lleno else np.any(nuevas != 0)):
+                self.cache.invalidar(clave)
+
+        # Matriz precalculada: mismas reglas, vectorizadas sobre todas las filas
+        if self.top_k is not None:
+            conteo = np.diff(self.top_k.indptr)
+            minimos = np.full(len(conteo), -np.inf)
+            con_datos = conteo > 0
+            if con_datos.any():
+                minimos[con_datos] = np.minimum.reduceat(self.top_k.data, self.top_k.indptr[:-1][con_datos])
+            fila_de = np.repeat(np.arange(len(conteo)), conteo)
+            contienen = fila_de[np.isin(self.top_k.indices, posiciones)]
+            llenas = conteo >= self.k_efectivo
+            afectadas = np.flatnonzero(np.where(llenas, (sims > minimos).any(axis=0), (sims != 0).any(axis=0)))
+            self._filas_obsoletas.update(afectadas.tolist())
+            self._filas_obsoletas.update(contienen.tolist())
+            self._filas_obsoletas.update(posiciones.tolist())
+
+    def _escribir_filas(self, posiciones, filas):
+        if not sp.issparse(self.X):
+            self.X[posiciones] = filas
+            if self._operandos is not None:
+                _, M, R2 = self._operandos[:3]      # R es self.X; las transpuestas son vistas
+                M[posiciones] = filas != 0
+                R2[posiciones] = filas * filas
+        else:
+            nuevas = sp.csr_matrix(filas)
+            R2 = self._operandos[2] if self._operandos is not None else None
+            cambian = []
+            for r, pos in enumerate(posiciones.tolist()):
+                ini, fin = self.X.indptr[pos], self.X.indptr[pos + 1]
+                cols = nuevas.indices[nuevas.indptr[r]:nuevas.indptr[r + 1]]
+                if np.array_equal(self.X.indices[ini:fin], cols):
+                    # mismas columnas: se escribe en el lugar (R, R∘R y sus
+                    # transpuestas comparten estos arreglos)
+                    valores = nuevas.data[nuevas.indptr[r]:nuevas.indptr[r + 1]]
+                    self.X.data[ini:fin] = valores
+                    if R2 is not None:
+                        R2.data[ini:fin] = valores * valores
+                else:
+                    cambian.append(r)
+            if cambian:
+                self.X = _reemplazar_filas(self.X, posiciones[cambian], nuevas[cambian])
+                if self._operandos is not None:
+                    self._operandos = operandos_similitud(self.X)
+        if self.normas is not None:
+            self.normas[posiciones] = normas_filas(filas)
@@ -0,0 +1,366 @@
+# servidor.py
+# ===============================================================
+# SERVICIO EN LÍNEA CON MICRO-LOTES (asyncio)
+# ===============================================================
+# Atender "recomendar al usuario X" o "películas parecidas a Y" una por
+# una desperdicia la vectorización: cada solicitud haría su propio
+# producto matriz-vector. Aquí las solicitudes concurrentes se acumulan
+# durante una ventana corta (o hasta llenar un lote) y se puntúan juntas:
+#   SVD:          puntajes = U_k[lote] (S_k Vt_k)             (b x n)
+#   colaborativo: similitudes del lote contra todos, k vecinos y
+#                 predicción ponderada (predecir_colaborativo_lote)
+#   similares:    cosenos = X_norm[lote] X_norm^T             (b x n)
+# Cada solicitud recibe su propia fila del resultado. La latencia extra
+# está acotada por ventana_ms; con poca carga un lote tiene 1 solicitud.
+#
+# Se usa en proceso (await servicio.recomendar(...)) o por HTTP local:
+#   python servidor.py directorio_artefacto --puerto 8000
+#   GET /recomendar?usuario=ID&n=10&metodo=svd|colaborativo
+#   GET /similares?item=ID&n=10
+#   GET /estado
+#   GET /metricas   (formato de texto de Prometheus; ver instrumentacion.py)
+# ===============================================================
+
+import argparse
+import asyncio
+import json
+import sys
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+import scipy.sparse as sp
+
+from artefactos import cargar_svd
+from colaborativo import operandos_similitud, predecir_colaborativo_lote, similitudes_bloque, top_k_bloque
+from instrumentacion import contar, exportar_prometheus, medir
+from matriz_calificaciones import como_matriz, normalizar_filas
+from topk import top_k_filas
+
+
+# -------------------------
+# MicroLotes
+# -------------------------
+class MicroLotes:
+    """
+    Agrupa solicitudes concurrentes y las procesa de a lotes.
+    - procesar(solicitudes) -> lista de resultados en el mismo orden; recibe
+      como máximo max_lote solicitudes
+    - ventana_ms: espera máxima desde la primera solicitud pendiente
+    - en_hilo=True ejecuta procesar en un hilo: el bucle de eventos sigue
+      recibiendo solicitudes mientras se puntúa el lote (NumPy libera el GIL)
+    - lotes / solicitudes: contadores para medir el tamaño medio de lote
+    - nombre: etapa con la que se instrumenta cada lote ("servidor.<nombre>")
+    """
+
+    def __init__(self, procesar, max_lote=64, ventana_ms=2.0, en_hilo=False, nombre="lote"):
+        self.procesar = procesar
+        self.nombre = nombre
+        self.max_lote = max_lote
+        self.ventana = ventana_ms / 1000.0
+        self.en_hilo = en_hilo
+        self._pendientes = []          # lista de (solicitud, futuro)
+        self._temporizador = None
+        self._tareas = set()           # referencias fuertes: el bucle solo guarda débiles
+        self.lotes = 0
+        self.solicitudes = 0
+
+    @property
+    def tamano_medio(self):
+        return self.solicitudes / self.lotes if self.lotes else 0.0
+
+    async def enviar(self, solicitud):
+        bucle = asyncio.get_running_loop()
+        futuro = bucle.create_future()
+        self._pendientes.append((solicitud, futuro))
+        if len(self._pendientes) >= self.max_lote:
+            self._despachar()
+        elif self._temporizador is None:
+            self._temporizador = bucle.call_later(self.ventana, self._despachar)
+        return await futuro
+
+    def _despachar(self):
+        if self._temporizador is not None:
+            self._temporizador.cancel()
+            self._temporizador = None
+        while self._pendientes:
+            lote = self._pendientes[:self.max_lote]
+            self._pendientes = self._pendientes[self.max_lote:]
+            tarea = asyncio.ensure_future(self._ejecutar(lote))
+            self._tareas.add(tarea)
+            tarea.add_done_callback(self._tareas.discard)
+
+    async def _ejecutar(self, lote):
+        solicitudes = [s for s, _ in lote]
+        self.lotes += 1
+        self.solicitudes += len(lote)
+        contar(f"servidor.{self.nombre}.solicitudes", len(lote))
+        try:
+            with medir(f"servidor.{self.nombre}"):
+                if self.en_hilo:
+                    resultados = await asyncio.get_running_loop().run_in_executor(None, self.procesar, solicitudes)
+                else:
+                    resultados = self.procesar(solicitudes)
+        except Exception as error:
+            for _, futuro in lote:
+                if not futuro.done():
+                    futuro.set_exception(error)
+            return
+        for (_, futuro), resultado in zip(lote, resultados):
+            if not futuro.done():
+                futuro.set_result(resultado)
+
+
+# -------------------------
+# _repartir
+# -------------------------
+# Top-N del lote con el máximo N pedido y, por solicitud, sus primeros n.
+# -inf marca películas excluidas (vistas, la propia película).
+def _repartir(puntajes, solicitudes):
+    """Una lista [(posición, puntaje)] por solicitud (pos, n), sin excluidas."""
+    if any(n < 1 for _, n in solicitudes):
+        raise ValueError("n debe ser >= 1")
+    mejores = top_k_filas(puntajes, max(n for _, n in solicitudes))
+    resultados = []
+    for fila, (_, n) in enumerate(solicitudes):
+        elegidos = mejores[fila, :n]
+        resultados.append(elegidos[elegidos["puntaje"] > -np.inf].tolist())
+    return resultados
+
+
+# -------------------------
+# ServicioRecomendaciones
+# -------------------------
+class ServicioRecomendaciones:
+    """
+    Recomendaciones en línea sobre factores ya entrenados.
+    - U_k, S_k, Vt_k: de svd_truncada, entrenar_als o cargar_svd (mapeados)
+    - calificaciones: matriz observada; excluye películas vistas y es la
+      base del método colaborativo (None = sin exclusión ni colaborativo)
+    - caracteristicas: para "similares"; sin ellas se usan los factores
+      latentes de las películas (columnas de S_k Vt_k)
+    - usuarios / items: ids externos (por defecto, las posiciones)
+    - k_vecinos: vecinos del método colaborativo
+    - max_lote, ventana_ms, en_hilo: ver MicroLotes
+    """
+
+    def __init__(self, U_k, S_k, Vt_k, calificaciones=None, caracteristicas=None, usuarios=None, items=None,
+                 k_vecinos=20, max_lote=64, ventana_ms=2.0, en_hilo=False):
+        self.U_k = U_k
+        self.SVt = S_k @ Vt_k
+        self.k_vecinos = k_vecinos
+
+        self.R = como_matriz(calificaciones) if calificaciones is not None else None
+        self._operandos = operandos_similitud(self.R) if self.R is not None else None
+
+        X = como_matriz(caracteristicas) if caracteristicas is not None else self.SVt.T
+        self.X = normalizar_filas(X)
+        self.XT = self.X.T.tocsc() if sp.issparse(self.X) else self.X.T
+
+        self.usuarios = list(range(U_k.shape[0])) if usuarios is None else list(usuarios)
+        self.items = list(range(self.SVt.shape[1])) if items is None else list(items)
+        self._pos_usuario = {str(u): i for i, u in enumerate(self.usuarios)}
+        self._pos_item = {str(p): i for i, p in enumerate(self.items)}
+
+        opciones = {"max_lote": max_lote, "ventana_ms": ventana_ms, "en_hilo": en_hilo}
+        self.lotes = {
+            "svd": MicroLotes(self._lote_svd, nombre="svd", **opciones),
+            "colaborativo": MicroLotes(self._lote_colaborativo, nombre="colaborativo", **opciones),
+            "similares": MicroLotes(self._lote_similares, nombre="similares", **opciones),
+        }
+
+    @classmethod
+    def desde_artefacto(cls, directorio, caracteristicas=None, **opciones):
+        """Servicio sobre un artefacto de guardar_svd (abierto con mmap)."""
+        U_k, S_k, Vt_k, modelo = cargar_svd(directorio)
+        calificaciones = modelo["calificaciones"] if "calificaciones" in modelo else None
+        return cls(U_k, S_k, Vt_k, calificaciones, caracteristicas,
+                   modelo.ids.get("usuarios"), modelo.ids.get("items"), **opciones)
+
+    # -------------------------
+    # Puntuación por lote
+    # -------------------------
+    def _excluir_vistas(self, puntajes, usuarios):
+        if self.R is None:
+            return
+        if sp.issparse(self.R):
+            vistas = self.R[usuarios].tocoo()
+            puntajes[vistas.row, vistas.col] = -np.inf
+        else:
+            puntajes[self.R[usuarios] != 0] = -np.inf
+
+    def _lote_svd(self, solicitudes):
+        usuarios = np.array([u for u, _ in solicitudes], dtype=np.intp)
+        puntajes = np.asarray(self.U_k[usuarios]) @ self.SVt
+        self._excluir_vistas(puntajes, usuarios)
+        return _repartir(puntajes, solicitudes)
+
+    def _lote_colaborativo(self, solicitudes):
+        usuarios = np.array([u for u, _ in solicitudes], dtype=np.intp)
+        sims = similitudes_bloque(self._operandos, usuarios)
+        vecinos_idx, vecinos_sim = top_k_bloque(sims, usuarios, self.k_vecinos)
+        preds, predecible = predecir_colaborativo_lote(self.R, usuarios, vecinos_idx, vecinos_sim)
+        preds[~predecible] = -np.inf
+        return _repartir(preds, solicitudes)
+
+    def _lote_similares(self, solicitudes):
+        items = np.array([i for i, _ in solicitudes], dtype=np.intp)
+        sims = self.X[items] @ self.XT
+        sims = sims.toarray() if sp.issparse(sims) else np.asarray(sims)
+        sims[np.arange(len(items)), items] = -np.inf
+        return _repartir(sims, solicitudes)
+
+    # -------------------------
+    # API asíncrona
+    # -------------------------
+    @staticmethod
+    def _cantidad(n):
+        n = int(n)
+        if n < 1:
+            raise ValueError(f"n debe ser >= 1 (recibido {n})")
+        return n
+
+    def _posicion(self, mapa, clave, tipo):
+        try:
+            return mapa[str(clave)]
+        except KeyError:
+            raise KeyError(f"{tipo} desconocido: {clave!r}") from None
+
+    async def recomendar(self, usuario, n=10, metodo="svd"):
+        """
+        Lista [(id_película, puntaje)] con las n mejores películas no vistas.
+        - metodo: "svd" (factores latentes) o "colaborativo" (vecinos)
+        """
+        if metodo not in ("svd", "colaborativo"):
+            raise ValueError(f"Método de recomendación desconocido: {metodo!r}")
+        if metodo == "colaborativo" and self.R is None:
+            raise ValueError("El método colaborativo requiere la matriz de calificaciones")
+        n = self._cantidad(n)
+        pos = self._posicion(self._pos_usuario, usuario, "Usuario")
+        resultado = await self.lotes[metodo].enviar((pos, n))
+        return [(self.items[i], p) for i, p in resultado]
+
+    async def similares(self, item, n=10):
+        """Lista [(id_película, similitud)] de las n películas más parecidas."""
+        n = self._cantidad(n)
+        pos = self._posicion(self._pos_item, item, "Película")
+        resultado = await self.lotes["similares"].enviar((pos, n))
+        return [(self.items[i], s) for i, s in resultado]
+
+    def estado(self):
+        """Lotes y tamaño medio de lote por tipo de solicitud."""
+        return {nombre: {"lotes": m.lotes, "solicitudes": m.solicitudes, "tamano_medio": m.tamano_medio}
+                for nombre, m in self.lotes.items()}
+
+
+# -------------------------
+# HTTP mínimo
+# -------------------------
+# HTTP/1.1 con conexiones persistentes, solo GET y respuestas JSON (texto
+# plano en /metricas). Pensado para detrás de un proxy local, no para
+# exponerse directamente.
+def _requerido(params, nombre):
+    # un parámetro faltante es un error del cliente (400), no un id desconocido (404)
+    if nombre not in params:
+        raise ValueError(f"falta el parámetro {nombre!r}")
+    return params[nombre]
+
+
+async def _responder(servicio, metodo, destino):
+    if metodo != "GET":
+        return "405 Method Not Allowed", {"error": "solo GET"}
+    partes = urlsplit(destino)
+    params = {k: v[-1] for k, v in parse_qs(partes.query).items()}
+    try:
+        n = int(params.get("n", 10))
+        if partes.path == "/recomendar":
+            usuario = _requerido(params, "usuario")
+            res = await servicio.recomendar(usuario, n, params.get("metodo", "svd"))
+            return "200 OK", {"usuario": usuario, "recomendaciones": res}
+        if partes.path == "/similares":
+            item = _requerido(params, "item")
+            res = await servicio.similares(item, n)
+            return "200 OK", {"item": item, "similares": res}
+        if partes.path == "/estado":
+            return "200 OK", servicio.estado()
+        if partes.path == "/metricas":
+            return "200 OK", exportar_prometheus()
+        return "404 Not Found", {"error": f"ruta desconocida: {partes.path}"}
+    except KeyError as error:
+        return "404 Not Found", {"error": str(error.args[0]) if error.args else "no encontrado"}
+    except ValueError as error:
+        return "400 Bad Request", {"error": str(error)}
+    except Exception as error:
+        # cualquier otro fallo se responde; sin esto la conexión se cortaba sin respuesta
+        contar("servidor.errores")
+        return "500 Internal Server Error", {"error": f"{type(error).__name__}: {error}"}
+
+
+async def servir_http(servicio, host="127.0.0.1", puerto=8000):
+    """Inicia el servidor HTTP y devuelve el asyncio.Server (aún sin bloquear)."""
+
+    async def atender(lector, escritor):
+        try:
+            while True:
+                linea = await lector.readline()
+                if not linea.strip():
+                    break
+                metodo, destino, _ = linea.decode("latin-1").split(" ", 2)
+                cabeceras = {}
+                while True:
+                    cabecera = await lector.readline()
+                    if not cabecera.strip():
+                        break
+                    nombre, _, valor = cabecera.decode("latin-1").partition(":")
+                    cabeceras[nombre.strip().lower()] = valor.strip().lower()
+
+                estado, cuerpo = await _responder(servicio, metodo, destino)
+                if isinstance(cuerpo, str):
+                    datos, tipo = cuerpo.encode("utf-8"), "text/plain; version=0.0.4"
+                else:
+                    datos, tipo = json.dumps(cuerpo).encode("utf-8"), "application/json"
+                cerrar = cabeceras.get("connection") == "close"
+                encabezado = (f"HTTP/1.1 {estado}\r\nContent-Type: {tipo}\r\n"
+                              f"Content-Length: {len(datos)}\r\n" + ("Connection: close\r\n" if cerrar else "") + "\r\n")
+                escritor.write(encabezado.encode("latin-1") + datos)
+                await escritor.drain()
+                if cerrar:
+                    break
+        except (ConnectionError, ValueError):
+            pass
+        finally:
+            escritor.close()
+
+    return await asyncio.start_server(atender, host, puerto)
+
+
+# -------------------------
+# Línea de comandos
+# -------------------------
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Servicio de recomendaciones con micro-lotes")
+    parser.add_argument("artefacto", help="directorio escrito por guardar_svd")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--puerto", type=int, default=8000)
+    parser.add_argument("--max-lote", type=int, default=64)
+    parser.add_argument("--ventana-ms", type=float, default=2.0)
+    parser.add_argument("--k-vecinos", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    async def ejecutar():
+        servicio = ServicioRecomendaciones.desde_artefacto(args.artefacto, k_vecinos=args.k_vecinos,
+                                                           max_lote=args.max_lote, ventana_ms=args.ventana_ms,
+                                                           en_hilo=True)
+        servidor = await servir_http(servicio, args.host, args.puerto)
+        print(f"Sirviendo en http://{args.host}:{args.puerto}")
+        async with servidor:
+            await servidor.serve_forever()
+
+    try:
+        asyncio.run(ejecutar())
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
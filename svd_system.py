@@ -9,6 +9,33 @@
 # ===============================================================
 
 import numpy as np
+import scipy.sparse as sp
+from scipy.sparse.linalg import svds
+
+from instrumentacion import instrumentar, medir
+from matriz_calificaciones import MatrizCalificaciones, como_matriz, es_dispersa, filas_por_bloque, forma_matriz, \
+    indices_observados, observadas_fila
+from topk import top_k_filas
+from traza import salida_para
+
+# Tamaño máximo (m*n) que la SVD completa explicativa acepta densificar
+# a partir de una entrada dispersa. Por encima hay que usar una SVD truncada.
+LIMITE_DENSIFICACION = 10_000_000
+
+# -------------------------
+# _matriz_densa
+# -------------------------
+# La SVD completa es intrínsecamente densa: si la entrada es dispersa,
+# la densificación es explícita y limitada a matrices pequeñas.
+def _matriz_densa(matriz):
+    if es_dispersa(matriz):
+        m, n = matriz.shape
+        if m * n > LIMITE_DENSIFICACION:
+            raise ValueError(f"Matriz dispersa {m}x{n} demasiado grande para la SVD completa")
+        csr = matriz.csr if isinstance(matriz, MatrizCalificaciones) else matriz.tocsr()
+        return csr.toarray()
+    return np.array(matriz, dtype=float)
+
 
 # -------------------------
 # svd_y_reconstruccion_detalle
@@ -17,7 +44,7 @@ import numpy as np
 # 2) Aplicar np.linalg.svd para obtener U, s, Vt
 # 3) Truncar a k componentes: U_k, S_k, Vt_k
 # 4) Reconstruir A_k = U_k * S_k * Vt_k (aprox.)
-def svd_y_reconstruccion_detalle(matriz, k=2):
+def svd_y_reconstruccion_detalle(matriz, k=2, traza=None):
     """
     Descompone y reconstruye con explicación:
     - U: base ortonormal en el espacio de usuarios (columnas = factores)
@@ -26,10 +53,12 @@ def svd_y_reconstruccion_detalle(matriz, k=2):
     - Truncamiento: seleccionar las k dimensiones con mayor energía (s_i grandes)
     """
 
+    salida = salida_para(traza, "svd_y_reconstruccion_detalle")
+
     # 1) Matriz A: filas=usuarios, columnas=películas
-    A = np.array(matriz, dtype=float)
-    print("Matriz original A (usuarios x películas):")
-    print(A, "\n")
+    A = _matriz_densa(matriz)
+    salida("Matriz original A (usuarios x películas):")
+    salida(A, "\n")
 
     # 2) SVD completa
     # U shape: (m, m') donde m' = min(m,n)
@@ -38,10 +67,10 @@ def svd_y_reconstruccion_detalle(matriz, k=2):
     U, s, Vt = np.linalg.svd(A, full_matrices=False)
 
     # Mostrar resultados completos (útil para análisis manual)
-    print("Descomposición SVD completa (U, s, Vt):")
-    print("U (filas=usuarios, columnas=componentes):\n", np.round(U, 6))
-    print("s (vector de valores singulares):\n", np.round(s, 6))
-    print("Vt (filas=componentes, columnas=películas):\n", np.round(Vt, 6), "\n")
+    salida("Descomposición SVD completa (U, s, Vt):")
+    salida("U (filas=usuarios, columnas=componentes):\n", np.round(U, 6))
+    salida("s (vector de valores singulares):\n", np.round(s, 6))
+    salida("Vt (filas=componentes, columnas=películas):\n", np.round(Vt, 6), "\n")
 
     # 3) Truncamiento: quedarnos con las k componentes principales
     # Razonamiento: los primeros k valores singulares contienen la mayor parte
@@ -50,17 +79,17 @@ def svd_y_reconstruccion_detalle(matriz, k=2):
     S_k = np.diag(s[:k])       # (k, k)
     Vt_k = Vt[:k, :]           # (k, n)
 
-    print(f"Truncamiento a k = {k} componentes latentes:")
-    print("U_k (m x k):\n", np.round(U_k, 6))
-    print("S_k (k x k):\n", np.round(S_k, 6))
-    print("Vt_k (k x n):\n", np.round(Vt_k, 6), "\n")
+    salida(f"Truncamiento a k = {k} componentes latentes:")
+    salida("U_k (m x k):\n", np.round(U_k, 6))
+    salida("S_k (k x k):\n", np.round(S_k, 6))
+    salida("Vt_k (k x n):\n", np.round(Vt_k, 6), "\n")
 
     # 4) Reconstrucción aproximada A_k = U_k * S_k * Vt_k
     # Interpretación: reconstrucción en un subespacio de dimensión k que
     # aproxima las relaciones usuario-item.
     A_approx = U_k @ S_k @ Vt_k
-    print("Reconstrucción aproximada A_k = U_k * S_k * Vt_k:")
-    print(np.round(A_approx, 6), "\n")
+    salida("Reconstrucción aproximada A_k = U_k * S_k * Vt_k:")
+    salida(np.round(A_approx, 6), "\n")
 
     return U_k, S_k, Vt_k, A_approx
 
@@ -70,7 +99,7 @@ def svd_y_reconstruccion_detalle(matriz, k=2):
 # -------------------------
 # Idea: representar usuario y películas en espacio latente k y calcular
 # producto punto entre vectores latentes -> estimación de rating.
-def predicciones_svd_detalle(U_k, S_k, Vt_k, calificaciones, usuario_index, usuarios=None, peliculas=None):
+def predicciones_svd_detalle(U_k, S_k, Vt_k, calificaciones, usuario_index, usuarios=None, peliculas=None, traza=None):
     """
     Predicciones paso a paso:
     - user_latent = (U_k[usuario] * S_k)  -> vector en R^k
@@ -78,47 +107,435 @@ def predicciones_svd_detalle(U_k, S_k, Vt_k, calificaciones, usuario_index, usua
     - pred = user_latent · movie_latent
     Justificación: los factores latentes capturan características abstractas.
     """
-
+    salida = salida_para(traza, "predicciones_svd_detalle")
+    n_usuarios, n_peliculas = forma_matriz(calificaciones)
     if usuarios is None:
-        usuarios = [f"user{i}" for i in range(len(calificaciones))]
+        usuarios = [f"user{i}" for i in range(n_usuarios)]
     if peliculas is None:
-        peliculas = [f"item{j}" for j in range(len(calificaciones[0]))]
+        peliculas = [f"item{j}" for j in range(n_peliculas)]
 
-    print(f"Predicciones usando SVD truncada para el usuario {usuarios[usuario_index]} (índice {usuario_index}):\n")
+    salida(f"Predicciones usando SVD truncada para el usuario {usuarios[usuario_index]} (índice {usuario_index}):\n")
 
     # 1) Vector latente del usuario en R^k
     #    U_k[usuario_index] es la coordenada del usuario en la base de factores.
     #    Multiplicarlo por S_k reescala las coordenadas según la energía de cada factor.
     u_row = U_k[usuario_index]            # (k,)
     user_latent = u_row @ S_k             # (k,)  (fila por matriz diagonal)
-    print("Vector latente del usuario (U_k[row] * S_k):")
+    salida("Vector latente del usuario (U_k[row] * S_k):")
     for idx, val in enumerate(user_latent):
-        print(f"  componente {idx}: U_k[{usuario_index},{idx}] * S_k[{idx},{idx}] = {u_row[idx]:.12f} * {S_k[idx, idx]:.12f} = {val:.12f}")
-    print()
+        salida(f"  componente {idx}: U_k[{usuario_index},{idx}] * S_k[{idx},{idx}] = {u_row[idx]:.12f} * {S_k[idx, idx]:.12f} = {val:.12f}")
+    salida()
 
-    usuario_original = calificaciones[usuario_index]
+    # Solo las observaciones del usuario: {película: calificación}
+    usuario_original = observadas_fila(calificaciones, usuario_index)
     preds = [None] * len(peliculas)
 
     # 2) Para cada película no vista, calcular su vector latente y el producto punto
     for m_idx in range(len(peliculas)):
-        if usuario_original[m_idx] != 0:
+        if m_idx in usuario_original:
             # Conservamos rating observado: no predecimos sobre datos ya conocidos.
-            print(f" - {peliculas[m_idx]}: ya vista (calif={usuario_original[m_idx]})")
+            salida(f" - {peliculas[m_idx]}: ya vista (calif={usuario_original[m_idx]})")
             continue
 
         # movie_latent es la columna correspondiente en V (o fila en Vt transpuesta).
         movie_latent = Vt_k[:, m_idx]  # (k,)
 
-        print(f"\nCalculando predicción SVD para película '{peliculas[m_idx]}' (índice {m_idx}):")
+        salida(f"\nCalculando predicción SVD para película '{peliculas[m_idx]}' (índice {m_idx}):")
         # Desglose por componente latente:
         for r in range(len(movie_latent)):
             comp_user = user_latent[r]
             comp_movie = movie_latent[r]
-            print(f"  componente {r}: user_latent[{r}] * movie_latent[{r}] = {comp_user:.12f} * {comp_movie:.12f} = {comp_user * comp_movie:.12f}")
+            salida(f"  componente {r}: user_latent[{r}] * movie_latent[{r}] = {comp_user:.12f} * {comp_movie:.12f} = {comp_user * comp_movie:.12f}")
 
         # Predicción final: producto punto de vectores latentes.
         pred = float(np.dot(user_latent, movie_latent))
         preds[m_idx] = pred
-        print(f"  Predicción final (suma de componentes) = {pred:.12f}")
+        salida(f"  Predicción final (suma de componentes) = {pred:.12f}")
 
     return preds
+
+
+# ===============================================================
+# RUTA SILENCIOSA (PRODUCCIÓN)
+# ===============================================================
+# Mismos números que las funciones *_detalle, sin redondeos, texto ni
+# impresión de matrices.
+
+# -------------------------
+# svd_y_reconstruccion
+# -------------------------
+@instrumentar("svd.factorizacion")
+def svd_y_reconstruccion(matriz, k=2):
+    """
+    SVD completa truncada a k componentes, sin salida por consola.
+    - Devuelve (U_k, S_k, Vt_k, A_approx) igual que svd_y_reconstruccion_detalle.
+    """
+    A = _matriz_densa(matriz)
+    U, s, Vt = np.linalg.svd(A, full_matrices=False)
+    U_k, S_k, Vt_k = U[:, :k], np.diag(s[:k]), Vt[:k, :]
+    return U_k, S_k, Vt_k, U_k @ S_k @ Vt_k
+
+
+# -------------------------
+# predicciones_svd
+# -------------------------
+# Todas las películas en una sola operación: (U_k[u] * S_k) @ Vt_k.
+@instrumentar("svd.prediccion")
+def predicciones_svd(U_k, S_k, Vt_k, calificaciones, usuario_index):
+    """
+    Predicciones latentes del usuario, sin salida por consola.
+    - Devuelve lista con None en las películas ya vistas.
+    """
+    puntajes = (U_k[usuario_index] @ S_k) @ Vt_k
+    vistas = np.zeros(len(puntajes), dtype=bool)
+    vistas[indices_observados(calificaciones, usuario_index)] = True
+    return [None if v else float(p) for p, v in zip(puntajes, vistas)]
+
+
+# ===============================================================
+# SVD TRUNCADA PARA MATRICES GRANDES
+# ===============================================================
+# La SVD completa calcula los min(m,n) triples singulares y luego descarta
+# casi todos. Aquí solo se calculan los k primeros, directamente sobre la
+# matriz dispersa, y A_k no se construye salvo que se pida (reconstruir_svd).
+
+# -------------------------
+# _svd_aleatoria
+# -------------------------
+# Buscador de rango aleatorio (Halko, Martinsson y Tropp):
+#  1) Y = A Ω con Ω gaussiana (n x (k+p)): Y abarca el rango dominante de A.
+#  2) Iteraciones de potencia (A A^T)^q Y con re-ortogonalización QR, que
+#     separan mejor los valores singulares cuando decaen lentamente.
+#  3) Q = base ortonormal de Y; B = Q^T A es pequeña ((k+p) x n).
+#  4) SVD exacta de B: A ≈ Q B = (Q U_B) S V^T.
+# Con espectro de decaimiento rápido (rango bajo + ruido) el resultado es
+# exacto a precisión de máquina. Con espectro plano (p. ej. una matriz
+# dispersa aleatoria) los s_i salen por debajo de los exactos: con p=10 y
+# q=2 el error relativo ronda el 5-6% (≈23% sin iteraciones de potencia),
+# por eso las pruebas toleran un 8%. Más iteraciones o "lanczos" si hace falta.
+def _svd_aleatoria(A, k, sobremuestreo, iteraciones_potencia, semilla):
+    rng = np.random.default_rng(semilla)
+    m, n = A.shape
+    l = min(k + sobremuestreo, m, n)
+
+    Y = A @ rng.standard_normal((n, l))
+    for _ in range(iteraciones_potencia):
+        Q, _ = np.linalg.qr(Y)
+        Z, _ = np.linalg.qr(A.T @ Q)
+        Y = A @ Z
+    Q, _ = np.linalg.qr(Y)
+
+    B = (A.T @ Q).T                     # (l, n) = Q^T A
+    U_b, s, Vt = np.linalg.svd(B, full_matrices=False)
+    return (Q @ U_b)[:, :k], s[:k], Vt[:k, :]
+
+
+# -------------------------
+# _svd_lanczos
+# -------------------------
+# Bidiagonalización de Lanczos (ARPACK vía scipy.sparse.linalg.svds):
+# solo usa productos A @ x y A^T @ x. Devuelve los valores en orden
+# ascendente, así que se reordenan de mayor a menor.
+def _svd_lanczos(A, k, semilla):
+    rng = np.random.default_rng(semilla)
+    v0 = rng.standard_normal(min(A.shape))
+    U, s, Vt = svds(A, k=k, v0=v0)
+    orden = np.argsort(s)[::-1]
+    return U[:, orden], s[orden], Vt[orden, :]
+
+
+# -------------------------
+# svd_truncada
+# -------------------------
+@instrumentar("svd.factorizacion")
+def svd_truncada(matriz, k=2, metodo="aleatorio", sobremuestreo=10, iteraciones_potencia=2, semilla=None):
+    """
+    SVD truncada: solo los k factores principales.
+    - matriz: lista de listas, np.ndarray, scipy.sparse o MatrizCalificaciones
+    - metodo: "aleatorio" (buscador de rango aleatorio) o "lanczos" (ARPACK;
+      requiere k < min(m, n))
+    - Devuelve (U_k, S_k, Vt_k, energia) con S_k diagonal (k x k), igual que
+      svd_y_reconstruccion, y energia = Σ s_i² (i<k) / ||A||_F², la fracción
+      de la energía de la matriz capturada por los k factores.
+    """
+    A = como_matriz(matriz)
+
+    if metodo == "aleatorio":
+        U_k, s_k, Vt_k = _svd_aleatoria(A, k, sobremuestreo, iteraciones_potencia, semilla)
+    elif metodo == "lanczos":
+        U_k, s_k, Vt_k = _svd_lanczos(A, k, semilla)
+    else:
+        raise ValueError(f"Método de SVD truncada desconocido: {metodo!r}")
+
+    # ||A||_F² = Σ_ij A_ij² = Σ_i s_i² (todas las componentes)
+    energia_total = float(A.multiply(A).sum()) if sp.issparse(A) else float(np.einsum("ij,ij->", A, A))
+    energia = float(np.sum(s_k ** 2) / energia_total) if energia_total > 0 else 0.0
+
+    return U_k, np.diag(s_k), Vt_k, energia
+
+
+# -------------------------
+# reconstruir_svd
+# -------------------------
+# A_k = U_k S_k Vt_k es densa (m x n): solo se construye bajo pedido y,
+# si se indica, para un subconjunto de filas (usuarios).
+@instrumentar("svd.prediccion")
+def reconstruir_svd(U_k, S_k, Vt_k, filas=None):
+    """
+    Reconstrucción A_k (o A_k[filas]) a partir de los factores truncados.
+    """
+    U = U_k if filas is None else U_k[filas]
+    return (U @ S_k) @ Vt_k
+
+
+# ===============================================================
+# TOP-N POR LOTES DE USUARIOS
+# ===============================================================
+# predicciones_svd puntúa un usuario; para recomendar a todos se procesa
+# un bloque de usuarios por vez:
+#   puntajes_bloque = (U_k[bloque] S_k) Vt_k        (b x n, un solo producto)
+# se descartan las películas ya vistas y se seleccionan las N mejores con
+# topk.top_k_filas (selección parcial, O(n) por fila) en lugar de ordenar
+# todas las películas.
+
+# -------------------------
+# iterar_top_n_svd
+# -------------------------
+def iterar_top_n_svd(U_k, S_k, Vt_k, calificaciones, usuarios_idx=None, n=10, tam_bloque=None):
+    """
+    Generador de recomendaciones top-N por bloques de usuarios.
+    - calificaciones: matriz observada (para excluir películas ya vistas)
+    - usuarios_idx: usuarios a recomendar (None = todos)
+    - Produce (bloque, items, puntajes): items y puntajes de forma (b, N),
+      ordenados de mayor a menor (a igual puntaje, la película de índice
+      menor); item -1 con puntaje -inf indica que no quedan más películas
+      sin ver para ese usuario.
+    - tam_bloque: usuarios por bloque (None = según MEMORIA_BLOQUE); la
+      memoria máxima ~ tam_bloque x n_peliculas, independiente del total de usuarios.
+    """
+    R = como_matriz(calificaciones)
+    n_usuarios, n_peliculas = R.shape
+    n = min(n, n_peliculas)
+    if tam_bloque is None:
+        # puntajes (float) + índices de argpartition y copia en top_k_filas
+        tam_bloque = filas_por_bloque(3 * n_peliculas)
+
+    if usuarios_idx is None:
+        usuarios_idx = np.arange(n_usuarios)
+    else:
+        usuarios_idx = np.atleast_1d(np.asarray(usuarios_idx, dtype=np.intp))
+
+    # Vt_k escalado una sola vez: puntajes = U_k[bloque] @ (S_k Vt_k)
+    SVt = S_k @ Vt_k
+
+    for inicio in range(0, len(usuarios_idx), tam_bloque):
+        bloque = usuarios_idx[inicio:inicio + tam_bloque]
+        with medir("svd.top_n"):
+            puntajes = U_k[bloque] @ SVt                    # (b, n_peliculas)
+
+            # Películas ya vistas: fuera de la recomendación
+            if sp.issparse(R):
+                vistas = R[bloque].tocoo()
+                puntajes[vistas.row, vistas.col] = -np.inf
+            else:
+                puntajes[R[bloque] != 0] = -np.inf
+
+            # Selección parcial de las N mejores y orden solo dentro de ellas
+            top = top_k_filas(puntajes, n)
+
+        yield bloque, top["indice"], top["puntaje"]
+
+
+# ===============================================================
+# ACTUALIZACIÓN INCREMENTAL DE LOS FACTORES
+# ===============================================================
+# Recalcular la SVD con cada calificación nueva no escala. Dos herramientas:
+#  - Plegado ("fold-in"): un usuario nuevo con fila r se proyecta en la base
+#    de películas: u = r V_k S_k^{-1}. Análogo para una película nueva.
+#    Barato, pero no modifica la base: lo que r tiene fuera del subespacio
+#    se pierde (energía residual).
+#  - Actualización de rango bajo (Brand, 2006): A' = A + X Y^T. Se
+#    ortogonaliza X contra U_k e Y contra V_k, se arma una matriz pequeña
+#    K ((k+c) x (k+c)) y su SVD rota las bases; luego se trunca a k.
+#    X e Y pueden ser dispersas: las bases de sus componentes ortogonales
+#    no se forman (serían densas, m x c y n x c), solo se aplican al final.
+# La deriva acumula la energía que los factores ya no representan
+# (residuos del plegado y valores singulares descartados), relativa a la
+# energía capturada Σ s_i². Cuando supera un umbral conviene recalcular.
+
+# -------------------------
+# _inversas_singulares
+# -------------------------
+# S_k^{-1} sin propagar inf/NaN: un valor singular nulo (o por debajo del
+# ruido de redondeo, eps * s_max) de una actualización truncada o de rango
+# deficiente tiene inversa 0, como en una pseudoinversa, y esa componente
+# del plegado queda en 0.
+def _inversas_singulares(S_k):
+    s = np.diag(S_k).astype(float)
+    umbral = np.finfo(float).eps * (s.max() if s.size else 0.0)
+    return np.divide(1.0, s, out=np.zeros_like(s), where=s > umbral)
+
+
+# -------------------------
+# plegar_usuarios
+# -------------------------
+def plegar_usuarios(filas, S_k, Vt_k):
+    """
+    Filas de U_k para usuarios nuevos: U_nuevo = R_nuevo V_k S_k^{-1}.
+    - filas: calificaciones de los usuarios nuevos (b x n), densa o dispersa
+    - Devuelve (U_nuevo (b x k), energia_residual): Σ ||r||² - ||r V_k||²
+    """
+    filas = como_matriz(filas)
+    proy = np.asarray(filas @ Vt_k.T)                  # (b, k) = R V_k
+    total = float(filas.multiply(filas).sum()) if sp.issparse(filas) else float(np.sum(np.square(filas)))
+    residual = max(total - float(np.sum(proy ** 2)), 0.0)
+    return proy * _inversas_singulares(S_k), residual
+
+
+# -------------------------
+# plegar_items
+# -------------------------
+def plegar_items(columnas, U_k, S_k):
+    """
+    Columnas de Vt_k para películas nuevas: Vt_nuevo = S_k^{-1} U_k^T C_nueva.
+    - columnas: calificaciones de las películas nuevas (m x c)
+    - Devuelve (Vt_nuevo (k x c), energia_residual)
+    """
+    columnas = como_matriz(columnas)
+    proy = np.asarray((columnas.T @ U_k).T)            # (k, c) = U_k^T C
+    total = float(columnas.multiply(columnas).sum()) if sp.issparse(columnas) else float(np.sum(np.square(columnas)))
+    residual = max(total - float(np.sum(proy ** 2)), 0.0)
+    return proy * _inversas_singulares(S_k)[:, None], residual
+
+
+# -------------------------
+# _complemento
+# -------------------------
+# Para X (m x c) y su proyección BtX = B^T X sobre una base ortonormal B,
+# el componente ortogonal X⊥ = X - B BtX tiene Gram
+#   X⊥^T X⊥ = X^T X - BtX^T BtX = E Λ E^T        (c x c)
+# Con las direcciones de Λ no despreciables, P = X⊥ C (C = E Λ^{-1/2}) es
+# ortonormal y X⊥ = P R (R = Λ^{1/2} E^T), como un QR de X⊥ pero sin
+# formar X⊥: solo hacen falta X^T X (disperso si X lo es) y BtX. Las
+# direcciones con Λ <= sqrt(eps) Λ_max (X ya casi dentro de B) se descartan:
+# su inversa amplificaría el redondeo del Gram.
+def _complemento(X, BtX):
+    gram = X.T @ X
+    gram = (gram.toarray() if sp.issparse(gram) else np.asarray(gram)) - BtX.T @ BtX
+    lam, E = np.linalg.eigh((gram + gram.T) / 2)
+    validas = lam > np.sqrt(np.finfo(float).eps) * max(lam.max(initial=0.0), np.finfo(float).tiny)
+    lam, E = lam[validas], E[:, validas]
+    raiz = np.sqrt(lam)
+    return E / raiz, raiz[:, None] * E.T
+
+
+# -------------------------
+# actualizar_svd_rango
+# -------------------------
+def actualizar_svd_rango(U_k, S_k, Vt_k, X, Y):
+    """
+    Actualización de Brand para A + X Y^T manteniendo rango k.
+    - X: (m x c), Y: (n x c), con c pequeño; densas o dispersas (no se densifican)
+    - Devuelve (U_k, S_k, Vt_k, energia_descartada): energía de los valores
+      singulares que quedan fuera al volver a truncar a k.
+    """
+    k = S_k.shape[0]
+    X, Y = como_matriz(X), como_matriz(Y)
+    X, Y = (X.reshape(-1, 1) if X.ndim == 1 else X), (Y.reshape(-1, 1) if Y.ndim == 1 else Y)
+
+    # Proyecciones sobre los subespacios actuales y bases de lo que queda fuera:
+    # P = (X - U_k UtX) CX,  Q = (Y - V_k VtY) CY
+    UtX = np.asarray((X.T @ U_k).T)
+    CX, Ra = _complemento(X, UtX)
+    VtY = np.asarray((Y.T @ Vt_k.T).T)
+    CY, Rb = _complemento(Y, VtY)
+
+    # K = [S 0; 0 0] + [U^T X; Ra] [V^T Y; Rb]^T
+    K = np.zeros((k + Ra.shape[0], k + Rb.shape[0]))
+    K[:k, :k] = S_k
+    K += np.vstack([UtX, Ra]) @ np.vstack([VtY, Rb]).T
+
+    U_K, s, Vt_K = np.linalg.svd(K, full_matrices=False)
+    A, B = U_K[:k, :k], U_K[k:, :k]
+    C, D = Vt_K[:k, :k].T, Vt_K[:k, k:].T
+    # [U_k P] U_K[:, :k] = U_k (A - UtX CX B) + X (CX B); análogo para V
+    U_nuevo = U_k @ (A - UtX @ (CX @ B)) + np.asarray(X @ (CX @ B))
+    V_nuevo = Vt_k.T @ (C - VtY @ (CY @ D)) + np.asarray(Y @ (CY @ D))
+    return U_nuevo, np.diag(s[:k]), V_nuevo.T, float(np.sum(s[k:] ** 2))
+
+
+# -------------------------
+# actualizar_svd_calificaciones
+# -------------------------
+# Un lote de calificaciones nuevas es una matriz dispersa D. Agrupando por
+# usuario, D = E_R D_R con E_R la matriz indicadora (m x r) de las filas
+# tocadas y D_R (r x n) sus incrementos: X = E_R, Y = D_R^T, ambas
+# dispersas (U_k^T E_R son las filas U_k[tocadas]). Se procesa en
+# sub-lotes de tam_lote usuarios para que K sea pequeña.
+def actualizar_svd_calificaciones(U_k, S_k, Vt_k, usuarios, items, valores, tam_lote=64):
+    """
+    Incorpora calificaciones (usuario, item, incremento) a los factores.
+    - Para una calificación nueva el incremento es su valor; para una
+      modificación, nuevo - anterior.
+    - Devuelve (U_k, S_k, Vt_k, energia_descartada total).
+    """
+    m, n = U_k.shape[0], Vt_k.shape[1]
+    D = sp.csr_matrix((np.asarray(valores, dtype=float), (usuarios, items)), shape=(m, n))
+    tocados = np.flatnonzero(np.diff(D.indptr))
+
+    descartada = 0.0
+    for inicio in range(0, len(tocados), tam_lote):
+        filas = tocados[inicio:inicio + tam_lote]
+        X = sp.csr_matrix((np.ones(len(filas)), (filas, np.arange(len(filas)))), shape=(m, len(filas)))
+        Y = D[filas].T
+        U_k, S_k, Vt_k, perdida = actualizar_svd_rango(U_k, S_k, Vt_k, X, Y)
+        descartada += perdida
+    return U_k, S_k, Vt_k, descartada
+
+
+# -------------------------
+# SVDIncremental
+# -------------------------
+class SVDIncremental:
+    """
+    Factores (U_k, S_k, Vt_k) que se actualizan sin refactorizar, con deriva.
+    - agregar_usuarios / agregar_items: plegado de filas / columnas nuevas
+    - agregar_calificaciones: actualización de Brand por lotes
+    - deriva: energía no representada acumulada / Σ s_i² actual
+    - necesita_recalculo(): deriva > umbral
+    """
+
+    def __init__(self, U_k, S_k, Vt_k, umbral=0.05):
+        self.U_k, self.S_k, self.Vt_k = U_k, S_k, Vt_k
+        self.umbral = umbral
+        self.energia_perdida = 0.0
+
+    @classmethod
+    def desde_matriz(cls, matriz, k=2, umbral=0.05, **opciones):
+        U_k, S_k, Vt_k, _ = svd_truncada(matriz, k, **opciones)
+        return cls(U_k, S_k, Vt_k, umbral)
+
+    def agregar_usuarios(self, filas):
+        U_nuevo, residual = plegar_usuarios(filas, self.S_k, self.Vt_k)
+        self.U_k = np.vstack([self.U_k, U_nuevo])
+        self.energia_perdida += residual
+        return np.arange(self.U_k.shape[0] - len(U_nuevo), self.U_k.shape[0])
+
+    def agregar_items(self, columnas):
+        Vt_nuevo, residual = plegar_items(columnas, self.U_k, self.S_k)
+        self.Vt_k = np.hstack([self.Vt_k, Vt_nuevo])
+        self.energia_perdida += residual
+        return np.arange(self.Vt_k.shape[1] - Vt_nuevo.shape[1], self.Vt_k.shape[1])
+
+    def agregar_calificaciones(self, usuarios, items, valores, tam_lote=64):
+        self.U_k, self.S_k, self.Vt_k, descartada = actualizar_svd_calificaciones(
+            self.U_k, self.S_k, self.Vt_k, usuarios, items, valores, tam_lote)
+        self.energia_perdida += descartada
+
+    @property
+    def deriva(self):
+        capturada = float(np.sum(np.diag(self.S_k) ** 2))
+        return self.energia_perdida / capturada if capturada > 0 else np.inf
+
+    def necesita_recalculo(self):
+        return self.deriva > self.umbral
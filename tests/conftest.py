@@ -0,0 +1,15 @@
+import numpy as np
+import pytest
+
+
+def _calificaciones(n_usuarios=60, n_items=40, densidad=0.2, semilla=0):
+    rng = np.random.default_rng(semilla)
+    R = rng.integers(1, 6, (n_usuarios, n_items)).astype(float)
+    R[rng.random(R.shape) > densidad] = 0.0
+    return R
+
+
+@pytest.fixture
+def calificaciones():
+    """Fábrica de matrices densas de calificaciones 1..5 con ceros sin calificar."""
+    return _calificaciones
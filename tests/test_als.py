@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+
+from als import entrenar_als
+
+LAMBDA, ALFA, K = 0.5, 2.0, 3
+
+
+def _resolver_ingenuo(R, Y, implicito):
+    # una fila por vez, con np.linalg.solve y las fórmulas del encabezado de als.py
+    X = np.empty((R.shape[0], Y.shape[1]))
+    for u, r in enumerate(R):
+        if implicito:
+            c, p = 1.0 + ALFA * r, (r != 0).astype(float)
+            A, b = Y.T @ (c[:, None] * Y), Y.T @ (c * p)
+        else:
+            vistas = np.flatnonzero(r)
+            A, b = Y[vistas].T @ Y[vistas], Y[vistas].T @ r[vistas]
+        X[u] = np.linalg.solve(A + LAMBDA * np.eye(Y.shape[1]), b)
+    return X
+
+
+def _perdida(R, X, Y, implicito):
+    pred = X @ Y.T
+    if implicito:
+        error = np.sum((1.0 + ALFA * R) * ((R != 0) - pred) ** 2)
+    else:
+        error = np.sum(((R - pred) * (R != 0)) ** 2)
+    return error + LAMBDA * (np.sum(X * X) + np.sum(Y * Y))
+
+
+@pytest.mark.parametrize("implicito", [False, True])
+def test_un_paso_como_solve_por_fila(calificaciones, implicito):
+    R = calificaciones(25, 15, 0.3)
+    R[3] = 0.0                                   # usuario sin calificaciones
+    U_k, S_k, Vt_k, _ = entrenar_als(R, K, LAMBDA, iteraciones=1, implicito=implicito, alfa=ALFA,
+                                     tam_lote=4, hilos=2, semilla=7)
+
+    rng = np.random.default_rng(7)
+    X = rng.standard_normal((R.shape[0], K)) * 0.01
+    Y = rng.standard_normal((R.shape[1], K)) * 0.01
+    X = _resolver_ingenuo(R, Y, implicito)
+    Y = _resolver_ingenuo(R.T, X, implicito)
+    np.testing.assert_allclose(U_k, X, rtol=1e-8, atol=1e-12)
+    np.testing.assert_allclose(Vt_k, Y.T, rtol=1e-8, atol=1e-12)
+    np.testing.assert_array_equal(S_k, np.eye(K))
+
+
+@pytest.mark.parametrize("implicito", [False, True])
+def test_perdida_no_aumenta(calificaciones, implicito):
+    R = calificaciones(40, 20, 0.3, semilla=2)
+    perdidas = []
+    for iteraciones in range(1, 7):
+        U_k, _, Vt_k, historial = entrenar_als(R, K, LAMBDA, iteraciones, implicito, ALFA, semilla=3)
+        perdidas.append(_perdida(R, U_k, Vt_k.T, implicito))
+    assert np.all(np.diff(perdidas) <= 1e-9 * perdidas[0])
+    if implicito:
+        assert historial == []
+    else:
+        assert len(historial) == 6 and historial[-1] < historial[0]
@@ -0,0 +1,56 @@
+import os
+import stat
+
+import numpy as np
+import pytest
+
+from artefactos import _umask, cargar_modelo, guardar_modelo
+
+
+def test_reescritura_reapunta_enlace(tmp_path):
+    destino = tmp_path / "modelo"
+    guardar_modelo(destino, {"a": np.arange(3)})
+    guardar_modelo(destino, {"a": np.arange(5)})
+    assert os.path.islink(destino)
+    np.testing.assert_array_equal(cargar_modelo(destino)["a"], np.arange(5))
+    versiones = [n for n in os.listdir(tmp_path) if n.startswith(".modelo.v")]
+    assert len(versiones) == 2
+
+
+def test_podar_no_toca_artefactos_con_nombre_parecido(tmp_path):
+    guardar_modelo(tmp_path / "m.v2", {"a": np.arange(1)})
+    guardar_modelo(tmp_path / "m.v2", {"a": np.arange(2)})
+    guardar_modelo(tmp_path / "m", {"a": np.arange(3)})
+    guardar_modelo(tmp_path / "m", {"a": np.arange(4)})
+    guardar_modelo(tmp_path / "m", {"a": np.arange(5)})
+    ocultos = [n for n in os.listdir(tmp_path) if n.startswith(".")]
+    assert len([n for n in ocultos if n.startswith(".m.v2.v")]) == 2
+    assert len([n for n in ocultos if not n.startswith(".m.v2.")]) == 2
+    np.testing.assert_array_equal(cargar_modelo(tmp_path / "m.v2")["a"], np.arange(2))
+    np.testing.assert_array_equal(cargar_modelo(tmp_path / "m")["a"], np.arange(5))
+
+
+def test_permisos_legibles_por_otros(tmp_path):
+    destino = tmp_path / "modelo"
+    guardar_modelo(destino, {"a": np.arange(3)})
+    modo = stat.S_IMODE(os.stat(destino).st_mode)
+    assert modo == 0o755 & ~_umask()
+
+
+def test_no_borra_destino_sin_manifiesto(tmp_path):
+    destino = tmp_path / "datos"
+    destino.mkdir()
+    (destino / "importante.txt").write_text("x")
+    with pytest.raises(ValueError):
+        guardar_modelo(destino, {"a": np.arange(3)})
+    assert (destino / "importante.txt").exists()
+    assert not [n for n in os.listdir(tmp_path) if n.startswith(".datos.")]
+
+
+def test_migra_directorio_del_formato_anterior(tmp_path):
+    destino = tmp_path / "modelo"
+    destino.mkdir()
+    (destino / "manifiesto.json").write_text("{}")
+    guardar_modelo(destino, {"a": np.arange(2)})
+    assert os.path.islink(destino)
+    np.testing.assert_array_equal(cargar_modelo(destino)["a"], np.arange(2))
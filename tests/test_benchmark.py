@@ -0,0 +1,40 @@
+import json
+
+import pytest
+
+from benchmark import comparar, generar_calificaciones, main
+
+
+def test_generar_calificaciones_reproducible():
+    a = generar_calificaciones(200, 50, densidad=0.05, semilla=3)
+    b = generar_calificaciones(200, 50, densidad=0.05, semilla=3)
+    assert a.shape == (200, 50) and a.nnz > 0
+    assert (a.csr != b.csr).nnz == 0
+
+
+def test_banco_a_escala_minima(tmp_path, capsys):
+    salida = tmp_path / "resultados.json"
+    assert main(["--usuarios", "60", "--items", "40", "--dim", "8", "--k", "5", "--factores", "4", "--n", "5",
+                 "--lote", "16", "--consultas", "5", "--repeticiones", "2", "--densidad", "0.1",
+                 "--salida", str(salida)]) == 0
+
+    informe = json.loads(salida.read_text(encoding="utf-8"))
+    assert {"entorno", "parametros", "resultados"} <= informe.keys()
+    operaciones = {(r["sistema"], r["operacion"]) for r in informe["resultados"]}
+    assert {"colaborativo", "contenido", "svd"} == {s for s, _ in operaciones}
+    assert {("contenido", "top_n_lsh"), ("contenido", "top_n_ivf"), ("svd", "factorizacion_als")} <= operaciones
+    assert any(o.endswith("_detalle") for _, o in operaciones)
+    for r in informe["resultados"]:
+        assert r["usuarios"] == 60 and r["items"] == 40
+        assert r["latencia_p50_ms"] >= 0 and r["rendimiento_por_s"] > 0
+        if "recall" in r:
+            assert 0.0 <= r["recall"] <= 1.0
+    exacto = next(r for r in informe["resultados"] if (r["sistema"], r["operacion"]) == ("contenido", "top_n"))
+    assert exacto["recall"] == pytest.approx(1.0)
+
+    filas = comparar(informe, informe)
+    assert len(filas) == len(informe["resultados"])
+    assert all(razon == pytest.approx(1.0) for *_, razon in filas)
+    capsys.readouterr()
+    assert main(["--comparar", str(salida), str(salida)]) == 0
+    assert "razon" in capsys.readouterr().out
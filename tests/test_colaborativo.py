@@ -0,0 +1,107 @@
+import numpy as np
+import pytest
+import scipy.sparse as sp
+
+from colaborativo import (detalle_similitudes_usuario, iterar_similitudes_coseno, predecir_colaborativo,
+                          predecir_colaborativo_detalle, predecir_colaborativo_lote, similitudes_coseno_lote,
+                          similitudes_usuario, vecinos_usuario)
+from matriz_calificaciones import MatrizCalificaciones, filas_por_bloque
+from traza import Traza
+
+ENTRADAS = {
+    "densa": lambda R: R,
+    "csr": sp.csr_matrix,
+    "matriz": MatrizCalificaciones.desde_densa,
+}
+
+
+def _sin_comunes(calificaciones):
+    # usuario 0 solo vio la película 0 y usuario 1 solo la 1: no comparten
+    # nada entre sí ni (por la columna vaciada) con el resto
+    R = calificaciones(20, 12, 0.4, semilla=5)
+    R[:, :2] = 0.0
+    R[0], R[1] = 0.0, 0.0
+    R[0, 0], R[1, 1] = 4.0, 2.0
+    return R
+
+
+@pytest.mark.parametrize("entrada", ENTRADAS)
+def test_lote_igual_al_calculo_por_pares(calificaciones, entrada):
+    R = _sin_comunes(calificaciones)
+    X = ENTRADAS[entrada](R)
+    usuarios = [f"u{i}" for i in range(R.shape[0])]
+
+    lote = similitudes_coseno_lote(X)
+    for u in range(R.shape[0]):
+        esperado = np.zeros(R.shape[0])
+        for i, sim, _, _ in detalle_similitudes_usuario(X, usuarios, u, traza=Traza()):
+            esperado[i] = sim
+        np.testing.assert_allclose(lote[u], esperado, rtol=1e-12, atol=1e-15)
+    assert not lote[0].any() and not lote[1].any()
+    np.testing.assert_allclose(similitudes_coseno_lote(X, 3), lote[3])
+
+
+def test_bloques_chicos_dan_lo_mismo(calificaciones):
+    R = calificaciones(30, 15, 0.3)
+    completo = similitudes_coseno_lote(R)
+    for tam_bloque in (1, 7):
+        bloques = list(iterar_similitudes_coseno(sp.csr_matrix(R), tam_bloque=tam_bloque))
+        assert len(bloques[0][0]) == tam_bloque
+        np.testing.assert_allclose(np.vstack([s for _, s in bloques]), completo)
+
+
+def test_bloque_por_defecto_acotado_por_memoria():
+    assert filas_por_bloque(7 * 200_000) * 7 * 200_000 * 8 <= 1 << 28
+    assert filas_por_bloque(10**12) == 1
+
+
+@pytest.mark.parametrize("entrada", ENTRADAS)
+def test_ruta_silenciosa_igual_al_detalle(calificaciones, entrada, capsys):
+    R = _sin_comunes(calificaciones)
+    X = ENTRADAS[entrada](R)
+    usuarios = [f"u{i}" for i in range(R.shape[0])]
+    peliculas = [f"p{j}" for j in range(R.shape[1])]
+
+    for u in (0, 4):
+        detalle = detalle_similitudes_usuario(X, usuarios, u, traza=Traza())
+        sims = similitudes_usuario(X, u)
+        np.testing.assert_allclose([sims[i] for i, *_ in detalle], [s for _, s, *_ in detalle], rtol=1e-12)
+
+        vecinos = vecinos_usuario(X, u, k=4).tolist()
+        esperado = predecir_colaborativo_detalle(X, usuarios, peliculas, u, vecinos, traza=Traza())
+        obtenido = predecir_colaborativo(X, u, vecinos)
+        assert [p is None for p in obtenido] == [p is None for p in esperado]
+        np.testing.assert_allclose([p for p in obtenido if p is not None], [p for p in esperado if p is not None])
+    assert capsys.readouterr().out == ""
+
+
+@pytest.mark.parametrize("entrada", ENTRADAS)
+def test_prediccion_por_lote_igual_al_detalle(calificaciones, entrada):
+    R = _sin_comunes(calificaciones)
+    X = ENTRADAS[entrada](R)
+    usuarios = [f"u{i}" for i in range(R.shape[0])]
+    peliculas = [f"p{j}" for j in range(R.shape[1])]
+    objetivo = np.array([0, 1, 4, 9, 13])
+
+    vecinos = [vecinos_usuario(X, u, k=4).tolist() for u in objetivo]
+    # listas cortas (sin vecinos con similitud > 0) se rellenan con peso 0
+    vecinos_idx = np.zeros((len(objetivo), 4), dtype=int)
+    vecinos_sim = np.zeros((len(objetivo), 4))
+    for fila, lista in enumerate(vecinos):
+        vecinos_idx[fila, :len(lista)] = [v for v, _ in lista]
+        vecinos_sim[fila, :len(lista)] = [s for _, s in lista]
+    preds, predecible = predecir_colaborativo_lote(X, objetivo, vecinos_idx, vecinos_sim)
+
+    assert preds.shape == predecible.shape == (len(objetivo), R.shape[1])
+    assert not predecible[0].any() and not predecible[1].any()      # sin vecinos útiles
+    for fila, u in enumerate(objetivo):
+        esperado = predecir_colaborativo_detalle(X, usuarios, peliculas, u, vecinos[fila], traza=Traza())
+        np.testing.assert_array_equal(predecible[fila], [p is not None for p in esperado])
+        np.testing.assert_allclose(preds[fila, predecible[fila]], [p for p in esperado if p is not None])
+        assert not preds[fila, ~predecible[fila]].any()
+        assert not predecible[fila, R[u] != 0].any()                 # las ya vistas nunca
+
+
+def test_prediccion_por_lote_sin_vecinos_ni_cache(calificaciones):
+    with pytest.raises(ValueError):
+        predecir_colaborativo_lote(calificaciones(10, 5), [0, 1])
@@ -0,0 +1,22 @@
+import numpy as np
+import pytest
+
+from colaborativo import predecir_colaborativo_lote, vecinos_coseno
+from colaborativo_paralelo import predecir_paralelo, vecinos_paralelo
+
+
+@pytest.mark.parametrize("metodo_inicio", [None, "spawn"])
+def test_vecinos_paralelo_como_secuencial(calificaciones, metodo_inicio):
+    R = calificaciones(50, 30, 0.25)
+    _, sims = vecinos_coseno(R, k=5)
+    _, sims_p = vecinos_paralelo(R, k=5, procesos=2, tam_fragmento=16, tam_bloque=8, metodo_inicio=metodo_inicio)
+    np.testing.assert_allclose(sims_p, sims)
+
+
+def test_predecir_paralelo_como_secuencial(calificaciones):
+    R = calificaciones(50, 30, 0.25, semilla=1)
+    idx, sims, preds = predecir_paralelo(R, k=5, procesos=2, tam_fragmento=16, tam_bloque=8)
+    esperado, predecible = predecir_colaborativo_lote(R, np.arange(R.shape[0]), idx, sims)
+    filas, cols = preds.nonzero()
+    np.testing.assert_array_equal(preds.toarray() != 0, predecible)
+    np.testing.assert_allclose(preds.toarray()[filas, cols], esperado[filas, cols])
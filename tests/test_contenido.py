@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+import scipy.sparse as sp
+
+from contenido import IndicePeliculas, caracteristicas_hash, detalle_similitud_peliculas, similitud_peliculas
+from traza import Traza
+
+
+def _etiquetas(n=300, vocabulario=60, por_pelicula=4, semilla=0):
+    rng = np.random.default_rng(semilla)
+    return [[f"e{x}" for x in rng.integers(0, vocabulario, por_pelicula)] for _ in range(n)]
+
+
+@pytest.mark.parametrize("metodo", ["lsh", "ivf"])
+def test_indice_aproximado_disperso_no_densifica(metodo):
+    X = caracteristicas_hash(_etiquetas())
+    indice = IndicePeliculas(X, metodo, n_bits=4)
+    if metodo == "lsh":
+        assert indice.planos.shape[1] == len(np.unique(X.indices)) < X.shape[1]
+    else:
+        assert sp.issparse(indice.centroides)
+        assert indice.centroides.nnz <= X.nnz
+
+    exacto = {i for i, _ in similitud_peliculas(X, 7, k=5)}
+    aproximado = {i for i, _ in indice.consultar(7, k=5)}
+    assert len(exacto & aproximado) >= 3
+
+
+def test_guardar_cargar_sin_extension(tmp_path):
+    X = caracteristicas_hash(_etiquetas(50))
+    indice = IndicePeliculas(X, "ivf")
+    indice.guardar(tmp_path / "indice")
+    assert (tmp_path / "indice.npz").exists()
+    assert IndicePeliculas.cargar(tmp_path / "indice").consultar(3, 5) == indice.consultar(3, 5)
+    assert IndicePeliculas.cargar(tmp_path / "indice.npz").consultar(3, 5) == indice.consultar(3, 5)
+
+
+@pytest.mark.parametrize("k", [None, 3])
+def test_ruta_silenciosa_igual_al_detalle(k, capsys):
+    rng = np.random.default_rng(1)
+    X = (rng.random((15, 6)) < 0.4).astype(float)
+    X[4] = 0.0                                          # película sin rasgos: coseno 0
+    peliculas = [f"p{i}" for i in range(len(X))]
+    for i in (0, 4):
+        detalle = detalle_similitud_peliculas(X, i, peliculas, traza=Traza(), k=k)
+        silenciosa = similitud_peliculas(X, i, k=k)
+        assert [j for j, _ in silenciosa] == [j for j, _ in detalle]
+        np.testing.assert_allclose([s for _, s in silenciosa], [s for _, s in detalle], rtol=1e-12)
+    assert capsys.readouterr().out == ""
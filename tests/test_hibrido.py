@@ -0,0 +1,25 @@
+import numpy as np
+
+from hibrido import RecomendadorHibrido
+
+
+def test_escala_por_defecto_conserva_el_valor_absoluto():
+    # Usuario 0 solo tiene una película predecible por sus vecinos, con 2 de 5
+    R = np.array([[5.0, 0.0, 0.0],
+                  [5.0, 2.0, 0.0],
+                  [1.0, 0.0, 5.0]])
+    hibrido = RecomendadorHibrido(R, k_vecinos=1)
+    puntajes = hibrido.puntajes([0])[0]
+    assert puntajes[1] == np.float64(0.25)          # (2 - 1) / (5 - 1), no 1.0
+
+    por_fila = RecomendadorHibrido(R, k_vecinos=1, normalizacion="fila").puntajes([0])[0]
+    assert por_fila[1] == 1.0
+
+
+def test_bloques_por_defecto_como_bloques_de_uno(calificaciones):
+    R = calificaciones(40, 25, 0.3)
+    hibrido = RecomendadorHibrido(R, k_vecinos=5)
+    usuarios, top = hibrido.recomendar(n=4)
+    usuarios_1, top_1 = hibrido.recomendar(n=4, tam_bloque=1)
+    np.testing.assert_array_equal(usuarios, usuarios_1)
+    np.testing.assert_array_equal(top, top_1)
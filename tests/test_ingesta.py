@@ -0,0 +1,94 @@
+import numpy as np
+import pytest
+
+from ingesta import ConstructorMatriz, leer_calificaciones_csv, leer_calificaciones_parquet
+
+# (usuario, película, calificación, marca); los pares repetidos quedan en
+# bloques distintos con tam_bloque_bytes chico
+REGISTROS = [
+    (10, 7, 4.0, 100), (20, 7, 2.0, 100), (10, 8, 1.0, 100),
+    (10, 7, 5.0, 300),                          # más reciente: gana
+    (20, 7, 3.0, 50),                           # más antigua que la primera: pierde
+    (10, 8, 2.0, 100),                          # misma marca: gana la leída después
+    (30, 9, 1.0, 10), (10, 7, 1.0, 200),
+]
+
+
+def _csv(tmp_path, registros, con_marca=True):
+    ruta = tmp_path / "calificaciones.csv"
+    filas = [r if con_marca else r[:3] for r in registros]
+    ruta.write_text("usuario,item,calificacion,marca\n" + "".join(",".join(map(str, f)) + "\n" for f in filas))
+    return ruta
+
+
+def _como_dict(R):
+    coo = R.csr.tocoo()
+    return {(R.usuarios[f], R.items[c]): v for f, c, v in zip(coo.row, coo.col, coo.data)}
+
+
+def test_bloque_vacio_se_ignora():
+    constructor = ConstructorMatriz()
+    constructor.agregar([], [], [])
+    R = constructor.matriz()
+    assert R.shape == (0, 0)
+    assert R.nnz == 0
+    assert constructor.filas_leidas == 0
+
+
+def test_bloque_vacio_entre_bloques_con_datos():
+    constructor = ConstructorMatriz(compactar_cada=1)
+    constructor.agregar([1, 2], [10, 20], [4.0, 3.0])
+    constructor.agregar(np.array([], dtype=np.int64), np.array([], dtype=np.int64), [])
+    constructor.agregar([1], [10], [5.0])
+    R = constructor.matriz()
+    assert R.shape == (2, 2)
+    np.testing.assert_allclose(R.a_densa(), [[5.0, 0.0], [0.0, 3.0]])
+
+
+def test_compactar_sin_filas_devuelve_matriz_vacia():
+    constructor = ConstructorMatriz()
+    constructor._partes.append(tuple(np.empty(0, dtype=t) for t in (np.int64, np.int64, float, float, float)))
+    R = constructor.matriz()
+    assert R.shape == (0, 0)
+    assert R.nnz == 0
+
+
+@pytest.mark.parametrize("compactar_cada", [1, 3, 1000])
+def test_ultimo_por_marca_entre_bloques(tmp_path, compactar_cada):
+    R = leer_calificaciones_csv(_csv(tmp_path, REGISTROS), tam_bloque_bytes=16, compactar_cada=compactar_cada)
+    assert _como_dict(R) == {(10, 7): 5.0, (20, 7): 2.0, (10, 8): 2.0, (30, 9): 1.0}
+    assert R.usuarios == [10, 20, 30] and R.items == [7, 8, 9]
+
+
+def test_ultimo_sin_marca_es_orden_de_llegada(tmp_path):
+    R = leer_calificaciones_csv(_csv(tmp_path, REGISTROS, con_marca=False), columnas=(0, 1, 2),
+                                tam_bloque_bytes=16, compactar_cada=2)
+    assert _como_dict(R) == {(10, 7): 1.0, (20, 7): 3.0, (10, 8): 2.0, (30, 9): 1.0}
+
+
+@pytest.mark.parametrize("compactar_cada", [1, 3, 1000])
+def test_promedio_entre_bloques(tmp_path, compactar_cada):
+    R = leer_calificaciones_csv(_csv(tmp_path, REGISTROS), duplicados="promedio", tam_bloque_bytes=16,
+                                compactar_cada=compactar_cada)
+    assert _como_dict(R) == pytest.approx({(10, 7): 10.0 / 3, (20, 7): 2.5, (10, 8): 1.5, (30, 9): 1.0})
+
+
+@pytest.mark.parametrize("duplicados", ["ultimo", "promedio"])
+def test_csv_y_parquet_dan_la_misma_matriz(tmp_path, duplicados):
+    pa = pytest.importorskip("pyarrow")
+    pq = pytest.importorskip("pyarrow.parquet")
+    rng = np.random.default_rng(0)
+    registros = [(int(u), int(i), float(v), int(m)) for u, i, v, m in
+                 zip(rng.integers(0, 30, 400), rng.integers(0, 20, 400), rng.integers(1, 6, 400), rng.integers(0, 50, 400))]
+    tabla = pa.table({nombre: [r[j] for r in registros]
+                      for j, nombre in enumerate(("usuario", "item", "calificacion", "marca"))})
+    pq.write_table(tabla, tmp_path / "calificaciones.parquet")
+
+    desde_csv = leer_calificaciones_csv(_csv(tmp_path, registros), duplicados=duplicados,
+                                        tam_bloque_bytes=256, compactar_cada=50)
+    desde_parquet = leer_calificaciones_parquet(tmp_path / "calificaciones.parquet", duplicados=duplicados,
+                                                filas_por_lote=37, compactar_cada=50)
+    # la numeración de ids depende de los cortes de bloque; el contenido no
+    assert sorted(desde_csv.usuarios) == sorted(desde_parquet.usuarios)
+    assert _como_dict(desde_csv) == _como_dict(desde_parquet)
+    assert desde_csv.nnz == len({(u, i) for u, i, _, _ in registros})
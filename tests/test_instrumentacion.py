@@ -0,0 +1,87 @@
+import re
+
+import pytest
+
+import instrumentacion
+from instrumentacion import LIMITES, REGISTRO, Registro, contar, exportar_prometheus, instrumentar, medir
+
+LINEA = re.compile(r'^(\w+)\{([^}]*)\} (\S+)$')
+
+
+def _muestras(texto):
+    """{(nombre, etiquetas...): valor} de las líneas de muestra del texto."""
+    muestras = {}
+    for linea in texto.splitlines():
+        if linea.startswith("#"):
+            continue
+        nombre, etiquetas, valor = LINEA.match(linea).groups()
+        etiquetas = tuple(sorted(re.findall(r'(\w+)="([^"]*)"', etiquetas)))
+        muestras[(nombre, etiquetas)] = float(valor)
+    return muestras
+
+
+@pytest.fixture
+def metricas():
+    estado = instrumentacion.activo()
+    instrumentacion.activar()
+    REGISTRO.limpiar()
+    yield REGISTRO
+    REGISTRO.limpiar()
+    (instrumentacion.activar if estado else instrumentacion.desactivar)()
+
+
+def test_histograma_prometheus_acumulado():
+    registro = Registro()
+    duraciones = [0.00005, 0.0001, 0.003, 0.3, 0.3, 20.0]
+    for d in duraciones:
+        registro.observar("similitud", d)
+    registro.observar("otra", 0.01)
+    registro.contar("consultas", 3)
+
+    muestras = _muestras(registro.prometheus("prueba"))
+    cubetas = [muestras[("prueba_etapa_segundos_bucket", (("etapa", "similitud"), ("le", le)))]
+               for le in [repr(x) for x in LIMITES] + ["+Inf"]]
+    assert cubetas == sorted(cubetas)                            # acumuladas
+    assert cubetas[0] == 2                                       # le es inclusivo: 0.0001 <= 0.0001
+    assert cubetas[LIMITES.index(0.25)] == 3 and cubetas[LIMITES.index(0.5)] == 5
+    conteo = muestras[("prueba_etapa_segundos_count", (("etapa", "similitud"),))]
+    assert cubetas[-1] == conteo == len(duraciones)
+    assert muestras[("prueba_etapa_segundos_sum", (("etapa", "similitud"),))] == pytest.approx(sum(duraciones))
+    assert muestras[("prueba_etapa_segundos_count", (("etapa", "otra"),))] == 1
+    assert muestras[("prueba_eventos_total", (("nombre", "consultas"),))] == 3
+
+
+def test_medir_e_instrumentar(metricas):
+    vistas = []
+    instrumentacion.agregar_observador(lambda etapa, segundos: vistas.append(etapa))
+    try:
+        @instrumentar("funcion")
+        def falla():
+            raise RuntimeError
+
+        with medir("bloque"):
+            pass
+        with pytest.raises(RuntimeError):
+            falla()
+        contar("eventos", 2)
+    finally:
+        REGISTRO.observadores.pop()
+
+    etapas = metricas.instantanea()["etapas"]
+    assert etapas["bloque"]["conteo"] == 1 and etapas["funcion"]["conteo"] == 1
+    assert sum(etapas["funcion"]["cubetas"]) == 1
+    assert vistas == ["bloque", "funcion"]
+    assert 'recomendacion_eventos_total{nombre="eventos"} 2' in exportar_prometheus()
+
+
+def test_desactivado_no_registra(metricas):
+    instrumentacion.desactivar()
+
+    @instrumentar("funcion")
+    def nada():
+        return 1
+
+    with medir("bloque"):
+        assert nada() == 1
+    contar("eventos")
+    assert metricas.instantanea() == {"etapas": {}, "contadores": {}}
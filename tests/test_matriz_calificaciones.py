@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+import scipy.sparse as sp
+
+from matriz_calificaciones import MatrizCalificaciones, como_csr, como_matriz, forma_matriz, observadas_fila
+
+USUARIOS = ["ana", "beto", "ana", "caro", "ana"]
+ITEMS = [30, 10, 30, 20, 10]
+VALORES = [4.0, 5.0, 2.0, 3.0, 1.0]
+
+
+@pytest.mark.parametrize("duplicados, esperado", [("ultimo", 2.0), ("promedio", 3.0), ("suma", 6.0)])
+def test_tripletas_duplicadas(duplicados, esperado):
+    R = MatrizCalificaciones.desde_tripletas(USUARIOS, ITEMS, VALORES, duplicados)
+    assert R.usuarios == ["ana", "beto", "caro"] and R.items == [10, 20, 30]
+    assert R.nnz == 4
+    A = R.a_densa(faltante=np.nan)
+    assert A[R.indice_usuario["ana"], R.indice_item[30]] == esperado
+    assert A[R.indice_usuario["ana"], R.indice_item[10]] == 1.0
+    assert np.isnan(A[R.indice_usuario["beto"], R.indice_item[20]])
+
+
+def test_tripletas_invalidas():
+    with pytest.raises(ValueError):
+        MatrizCalificaciones.desde_tripletas(USUARIOS, ITEMS, VALORES[:-1])
+    with pytest.raises(ValueError):
+        MatrizCalificaciones.desde_tripletas(USUARIOS, ITEMS, VALORES, duplicados="primero")
+
+
+def test_ids_fuera_de_rango():
+    # ids grandes o negativos se numeran de forma compacta, sin reservar filas
+    R = MatrizCalificaciones.desde_tripletas([10**12, -5], [7, 2**40], [1.0, 2.0])
+    assert R.shape == (2, 2)
+    assert R.usuarios == [-5, 10**12] and R.items == [7, 2**40]
+    with pytest.raises(KeyError):
+        R.indice_usuario[3]
+    with pytest.raises(ValueError):
+        MatrizCalificaciones(sp.csr_matrix((2, 3)), usuarios=["a"])
+    with pytest.raises(ValueError):
+        MatrizCalificaciones(sp.csr_matrix((2, 3)), items=[1, 2, 3, 4])
+
+
+def test_ida_y_vuelta_entre_representaciones(calificaciones):
+    D = calificaciones(7, 5, 0.5)
+    desde_densa = MatrizCalificaciones.desde_densa(D)
+    desde_csr = MatrizCalificaciones(sp.coo_matrix(D))
+    filas, cols = np.nonzero(D)
+    desde_tripletas = MatrizCalificaciones.desde_tripletas(filas, cols, D[filas, cols])
+
+    for R in (desde_densa, desde_csr):
+        np.testing.assert_array_equal(R.a_densa(), D)
+        assert R.nnz == np.count_nonzero(D)
+        assert forma_matriz(R) == D.shape
+    # desde tripletas solo aparecen usuarios y películas con alguna calificación
+    np.testing.assert_array_equal(desde_tripletas.a_densa(), D[np.ix_(np.unique(filas), np.unique(cols))])
+
+    for entrada in (D, D.tolist(), sp.csr_matrix(D), sp.csc_matrix(D), desde_densa):
+        csr = como_csr(entrada)
+        assert sp.isspmatrix_csr(csr) and csr.dtype == float
+        np.testing.assert_array_equal(csr.toarray(), D)
+        matriz = como_matriz(entrada)
+        assert sp.issparse(matriz) == (sp.issparse(entrada) or isinstance(entrada, MatrizCalificaciones))
+        np.testing.assert_array_equal(matriz.toarray() if sp.issparse(matriz) else matriz, D)
+        assert observadas_fila(entrada, 2) == {j: v for j, v in enumerate(D[2]) if v != 0}
+
+    assert como_matriz(desde_densa) is desde_densa.csr
+    np.testing.assert_array_equal(desde_densa.mascara().toarray(), D != 0)
+
+
+def test_duplicados_en_csr_se_suman():
+    coo = sp.coo_matrix(([1.0, 2.0, 4.0], ([0, 0, 1], [1, 1, 0])), shape=(2, 2))
+    R = MatrizCalificaciones(coo)
+    np.testing.assert_array_equal(R.a_densa(), [[0.0, 3.0], [4.0, 0.0]])
+    assert R.nnz == 2
@@ -0,0 +1,72 @@
+import numpy as np
+import pytest
+import scipy.sparse as sp
+
+from colaborativo import predecir_colaborativo_lote, vecinos_coseno
+from contenido import similitud_peliculas
+from matriz_calificaciones import MatrizCalificaciones
+from precomputo import CacheSimilitudes, matriz_similitud_top_k
+
+
+@pytest.mark.parametrize("disperso", [False, True])
+@pytest.mark.parametrize("precalcular", [False, True])
+def test_cache_usuarios_coincide_con_colaborativo(calificaciones, disperso, precalcular):
+    R = calificaciones()
+    entrada = MatrizCalificaciones.desde_densa(R) if disperso else R
+    cache = CacheSimilitudes(entrada, k=5, precalcular=precalcular, similitud="comunes")
+
+    idx, sims = vecinos_coseno(R, k=5)
+    idx_c, sims_c = vecinos_coseno(R, k=5, cache=cache)
+    np.testing.assert_allclose(sims_c, sims)
+
+    usuarios = np.arange(10)
+    esperado = predecir_colaborativo_lote(R, usuarios, idx[usuarios], sims[usuarios])
+    obtenido = predecir_colaborativo_lote(R, usuarios, cache=cache)
+    np.testing.assert_allclose(obtenido[0], esperado[0])
+    np.testing.assert_array_equal(obtenido[1], esperado[1])
+
+
+@pytest.mark.parametrize("disperso", [False, True])
+@pytest.mark.parametrize("similitud", ["coseno", "comunes"])
+def test_actualizar_varias_invalida_como_recalcular(calificaciones, disperso, similitud):
+    R = calificaciones(semilla=1)
+    entrada = sp.csr_matrix(R) if disperso else R
+    cache = CacheSimilitudes(entrada, k=5, precalcular=True, similitud=similitud)
+    for u in range(R.shape[0]):
+        cache.vecinos(u)
+
+    nuevo = R.copy()
+    nuevo[3] = np.where(R[3] != 0, 6 - R[3], 0)          # mismas columnas: en el lugar
+    nuevo[7] = calificaciones(1, R.shape[1], 0.5, 2)[0]   # columnas nuevas: se rearma la CSR
+    cache.actualizar_varias({3: nuevo[3], 7: nuevo[7]})
+
+    fresca = CacheSimilitudes(sp.csr_matrix(nuevo) if disperso else nuevo, k=5, similitud=similitud)
+    for u in range(R.shape[0]):
+        assert [s for _, s in cache.vecinos(u)] == pytest.approx([s for _, s in fresca.vecinos(u)])
+
+
+def test_matriz_top_k_comunes_como_vecinos_coseno(calificaciones):
+    R = calificaciones(semilla=3)
+    top = matriz_similitud_top_k(R, k=4, similitud="comunes")
+    _, sims = vecinos_coseno(R, k=4)
+    np.testing.assert_allclose(top.data.reshape(sims.shape), sims)
+
+
+def test_cache_no_modifica_la_entrada(calificaciones):
+    R = sp.csr_matrix(calificaciones())
+    copia = R.copy()
+    cache = CacheSimilitudes(R, similitud="comunes")
+    cache.actualizar(0, np.full(R.shape[1], 2.0))
+    assert (R != copia).nnz == 0
+
+
+def test_normas_de_la_cache_en_similitud_peliculas():
+    rng = np.random.default_rng(0)
+    X = (rng.random((30, 8)) < 0.3).astype(float)
+    cache = CacheSimilitudes(X)
+    assert similitud_peliculas(X, 2, normas=cache.normas) == similitud_peliculas(X, 2)
+
+    X[5] = 1.0
+    cache.actualizar(5, X[5])
+    assert similitud_peliculas(X, 5, k=4, normas=cache.normas) == similitud_peliculas(X, 5, k=4)
+    assert CacheSimilitudes(X, similitud="comunes").normas is None
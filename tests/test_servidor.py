@@ -0,0 +1,41 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from servidor import ServicioRecomendaciones, _responder
+
+
+def _servicio():
+    R = np.array([[5, 3, 0, 1], [4, 0, 0, 1], [1, 1, 0, 5], [0, 0, 5, 4.0]])
+    U, s, Vt = np.linalg.svd(R)
+    return ServicioRecomendaciones(U[:, :2], np.diag(s[:2]), Vt[:2], R)
+
+
+@pytest.mark.parametrize("n", [-2, 0])
+def test_n_invalido_responde_400(n):
+    estado, _ = asyncio.run(_responder(_servicio(), "GET", f"/recomendar?usuario=2&n={n}"))
+    assert estado.startswith("400")
+    estado, _ = asyncio.run(_responder(_servicio(), "GET", f"/similares?item=1&n={n}"))
+    assert estado.startswith("400")
+
+
+def test_error_inesperado_responde_500():
+    servicio = _servicio()
+    servicio.lotes["svd"].procesar = lambda solicitudes: 1 / 0
+    estado, cuerpo = asyncio.run(_responder(servicio, "GET", "/recomendar?usuario=2&n=2"))
+    assert estado.startswith("500")
+    assert "ZeroDivisionError" in cuerpo["error"]
+
+
+@pytest.mark.parametrize("destino, parametro", [("/recomendar?n=2", "usuario"), ("/similares", "item")])
+def test_parametro_faltante_responde_400(destino, parametro):
+    estado, cuerpo = asyncio.run(_responder(_servicio(), "GET", destino))
+    assert estado.startswith("400")
+    assert cuerpo == {"error": f"falta el parámetro {parametro!r}"}
+
+
+def test_id_desconocido_sigue_siendo_404():
+    estado, cuerpo = asyncio.run(_responder(_servicio(), "GET", "/recomendar?usuario=99"))
+    assert estado.startswith("404")
+    assert "99" in cuerpo["error"]
@@ -0,0 +1,157 @@
+import tracemalloc
+
+import numpy as np
+import pytest
+import scipy.sparse as sp
+
+from matriz_calificaciones import MatrizCalificaciones
+from svd_system import (actualizar_svd_calificaciones, actualizar_svd_rango, iterar_top_n_svd, plegar_items,
+                        plegar_usuarios, predicciones_svd, predicciones_svd_detalle, svd_truncada,
+                        svd_y_reconstruccion, svd_y_reconstruccion_detalle)
+from traza import Traza
+
+
+def test_plegado_con_valor_singular_nulo_es_finito():
+    rng = np.random.default_rng(0)
+    U, _ = np.linalg.qr(rng.standard_normal((6, 3)))
+    V, _ = np.linalg.qr(rng.standard_normal((5, 3)))
+    S = np.diag([3.0, 1.0, 0.0])
+    filas = rng.random((2, 5))
+
+    U_nuevo, _ = plegar_usuarios(filas, S, V.T)
+    Vt_nuevo, _ = plegar_items(rng.random((6, 2)), U, S)
+    assert np.all(np.isfinite(U_nuevo)) and np.all(np.isfinite(Vt_nuevo))
+    assert np.all(U_nuevo[:, 2] == 0) and np.all(Vt_nuevo[2] == 0)
+    np.testing.assert_allclose(U_nuevo[:, :2], (filas @ V)[:, :2] / [3.0, 1.0])
+
+
+def test_ruta_silenciosa_igual_al_detalle(calificaciones, capsys):
+    R = calificaciones(8, 6, 0.5)
+    detalle = svd_y_reconstruccion_detalle(R, k=3, traza=Traza())
+    silenciosa = svd_y_reconstruccion(R, k=3)
+    for a, b in zip(silenciosa, detalle):
+        np.testing.assert_allclose(a, b)
+
+    U_k, S_k, Vt_k, _ = silenciosa
+    for u in range(R.shape[0]):
+        esperado = predicciones_svd_detalle(U_k, S_k, Vt_k, R, u, traza=Traza())
+        obtenido = predicciones_svd(U_k, S_k, Vt_k, R, u)
+        assert [p is None for p in obtenido] == [p is None for p in esperado] == list(R[u] != 0)
+        np.testing.assert_allclose([p for p in obtenido if p is not None], [p for p in esperado if p is not None])
+    assert capsys.readouterr().out == ""
+
+
+@pytest.mark.parametrize("k, tam_lote", [(7, 64), (7, 1), (3, 64)])
+def test_brand_como_svd_exacta(k, tam_lote):
+    rng = np.random.default_rng(0)
+    A = rng.random((9, 7))
+    U, s, Vt = np.linalg.svd(A, full_matrices=False)
+    U_k, S_k, Vt_k = U[:, :k], np.diag(s[:k]), Vt[:k]
+    usuarios, items, valores = [0, 3, 3, 8], [1, 2, 6, 0], [1.0, 2.0, -1.0, 0.5]
+    D = sp.csr_matrix((valores, (usuarios, items)), shape=A.shape).toarray()
+
+    U2, S2, Vt2, descartada = actualizar_svd_calificaciones(U_k, S_k, Vt_k, usuarios, items, valores, tam_lote)
+    exacta = np.linalg.svd(U_k @ S_k @ Vt_k + D, compute_uv=False)
+    np.testing.assert_allclose(np.diag(S2), exacta[:k], atol=1e-13)
+    np.testing.assert_allclose(U2.T @ U2, np.eye(k), atol=1e-13)
+    np.testing.assert_allclose(Vt2 @ Vt2.T, np.eye(k), atol=1e-13)
+    if k == A.shape[1]:
+        # rango completo: la actualización es exacta
+        np.testing.assert_allclose(U2 @ S2 @ Vt2, A + D, atol=1e-13)
+        assert descartada == pytest.approx(0.0, abs=1e-12)
+    else:
+        # un solo sub-lote: lo descartado es la cola de la SVD exacta
+        assert descartada == pytest.approx(np.sum(exacta[k:] ** 2))
+
+
+def test_brand_denso_y_disperso_coinciden():
+    rng = np.random.default_rng(1)
+    U, s, Vt = np.linalg.svd(rng.random((10, 8)), full_matrices=False)
+    X, Y = rng.random((10, 2)), rng.random((8, 2))
+    X[X < 0.6], Y[Y < 0.6] = 0.0, 0.0
+    denso = actualizar_svd_rango(U[:, :3], np.diag(s[:3]), Vt[:3], X, Y)
+    disperso = actualizar_svd_rango(U[:, :3], np.diag(s[:3]), Vt[:3], sp.csr_matrix(X), sp.csc_matrix(Y))
+    np.testing.assert_allclose(disperso[1], denso[1], atol=1e-13)
+    np.testing.assert_allclose(disperso[0] @ disperso[1] @ disperso[2], denso[0] @ denso[1] @ denso[2], atol=1e-13)
+
+
+def test_actualizacion_no_crea_indicadora_densa():
+    m, n, k, c = 200_000, 500, 4, 64
+    rng = np.random.default_rng(0)
+    U_k, _ = np.linalg.qr(rng.standard_normal((m, k)))
+    V_k, _ = np.linalg.qr(rng.standard_normal((n, k)))
+    usuarios = rng.choice(m, c, replace=False)
+    tracemalloc.start()
+    try:
+        actualizar_svd_calificaciones(U_k, np.diag([4.0, 3.0, 2.0, 1.0]), V_k.T, usuarios, rng.integers(0, n, c),
+                                      np.ones(c))
+        pico = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    assert pico < m * c * 8 / 4            # la indicadora (m x c) sola ocuparía m * c * 8 bytes
+
+
+def _rango_bajo(m=120, n=80, r=5, semilla=0):
+    rng = np.random.default_rng(semilla)
+    return rng.random((m, r)) @ rng.random((r, n)) + 1e-3 * rng.random((m, n))
+
+
+@pytest.mark.parametrize("metodo", ["aleatorio", "lanczos"])
+def test_svd_truncada_igual_a_la_exacta(metodo):
+    A = _rango_bajo()
+    k = 5
+    U, s, Vt = np.linalg.svd(A, full_matrices=False)
+    U_k, S_k, Vt_k, energia = svd_truncada(sp.csr_matrix(A), k, metodo=metodo, semilla=0)
+
+    assert U_k.shape == (A.shape[0], k) and S_k.shape == (k, k) and Vt_k.shape == (k, A.shape[1])
+    np.testing.assert_allclose(np.diag(S_k), s[:k], rtol=1e-8)
+    # mismo subespacio (los signos de los vectores pueden diferir)
+    np.testing.assert_allclose(U_k @ S_k @ Vt_k, (U[:, :k] * s[:k]) @ Vt[:k], atol=1e-8)
+    assert energia == pytest.approx(np.sum(s[:k] ** 2) / np.sum(s ** 2), rel=1e-10)
+
+
+def test_svd_truncada_aleatoria_en_espectro_plano():
+    # Sin hueco espectral el buscador aleatorio subestima los s_i: se tolera
+    # un 8% (ver _svd_aleatoria); Lanczos sigue siendo exacto.
+    A = sp.random(300, 200, density=0.1, random_state=0, format="csr")
+    s = np.linalg.svd(A.toarray(), compute_uv=False)
+    k = 10
+
+    _, S_k, _, energia = svd_truncada(A, k, semilla=0)
+    np.testing.assert_allclose(np.diag(S_k), s[:k], rtol=0.08)
+    assert 0 < energia <= np.sum(s[:k] ** 2) / np.sum(s ** 2) + 1e-12
+
+    _, S_k, _, _ = svd_truncada(A, k, metodo="lanczos", semilla=0)
+    np.testing.assert_allclose(np.diag(S_k), s[:k], rtol=1e-8)
+
+
+def test_svd_truncada_metodo_desconocido():
+    with pytest.raises(ValueError):
+        svd_truncada(_rango_bajo(), 2, metodo="qr")
+
+
+@pytest.mark.parametrize("entrada", [lambda R: R, sp.csr_matrix, MatrizCalificaciones.desde_densa])
+def test_top_n_por_bloques_igual_al_argsort_completo(calificaciones, entrada):
+    R = calificaciones(40, 25, 0.3, semilla=3)
+    R[7, :23] = 3.0                     # solo le quedan 2 sin ver: relleno -1
+    R[8] = 4.0                          # ya vio todas
+    U_k, S_k, Vt_k = svd_y_reconstruccion(R, k=4)[:3]
+    n = 5
+
+    puntajes = U_k @ S_k @ Vt_k
+    bloques = list(iterar_top_n_svd(U_k, S_k, Vt_k, entrada(R), n=n, tam_bloque=6))
+    assert [len(b) for b, _, _ in bloques] == [6] * 6 + [4]
+    items = np.vstack([i for _, i, _ in bloques])
+    valores = np.vstack([v for _, _, v in bloques])
+
+    for u in range(R.shape[0]):
+        sin_ver = np.flatnonzero(R[u] == 0)
+        orden = sin_ver[np.argsort(-puntajes[u, sin_ver], kind="stable")][:n]
+        relleno = n - len(orden)
+        np.testing.assert_array_equal(items[u], np.r_[orden, [-1] * relleno])
+        np.testing.assert_allclose(valores[u, :len(orden)], puntajes[u, orden])
+        assert np.all(np.isneginf(valores[u, len(orden):]))
+    assert (items[8] == -1).all()
+
+    _, sub_items, _ = next(iterar_top_n_svd(U_k, S_k, Vt_k, entrada(R), usuarios_idx=[7, 2], n=n))
+    np.testing.assert_array_equal(sub_items, items[[7, 2]])
@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+
+from topk import VECINO, top_k, top_k_filas, top_k_pares
+
+
+def _referencia(fila, k):
+    # sorted estable: a igual puntaje, la posición anterior primero
+    validos = [(i, p) for i, p in enumerate(fila) if p > -np.inf]
+    return sorted(validos, key=lambda par: par[1], reverse=True)[:k]
+
+
+@pytest.mark.parametrize("k", [1, 3, 8])
+def test_empates_en_orden_de_posicion(k):
+    rng = np.random.default_rng(0)
+    P = rng.integers(0, 3, (50, 12)).astype(float)       # muchos empates
+    top = top_k_filas(P, k)
+    assert top.dtype == VECINO and top.shape == (50, k)
+    for fila, resultado in zip(P, top):
+        assert resultado.tolist() == _referencia(fila, k)
+
+
+def test_k_mayor_o_igual_que_n():
+    P = np.array([[1.0, 3.0, 3.0], [0.0, -1.0, 2.0]])
+    top = top_k_filas(P, 10)
+    assert top.shape == (2, 3)
+    assert top[0].tolist() == [(1, 3.0), (2, 3.0), (0, 1.0)]
+    assert top[1].tolist() == [(2, 2.0), (0, 0.0), (1, -1.0)]
+    assert top_k(P[0], 10).tolist() == top[0].tolist()
+
+
+def test_relleno_con_nan_e_infinito():
+    P = np.array([[np.nan, 2.0, -np.inf, 1.0],
+                  [np.nan, np.nan, -np.inf, -np.inf]])
+    top = top_k_filas(P, 3)
+    assert top[0].tolist()[:2] == [(1, 2.0), (3, 1.0)]
+    assert top["indice"][0, 2] == -1 and top["puntaje"][0, 2] == -np.inf
+    assert (top["indice"][1] == -1).all() and (top["puntaje"][1] == -np.inf).all()
+    # top_k recorta el relleno
+    assert top_k(P[0], 3).tolist() == [(1, 2.0), (3, 1.0)]
+    assert len(top_k(P[1], 3)) == 0
+
+
+def test_umbral_soporte_y_excluir():
+    p = np.array([0.9, 0.2, 0.5, 0.5, 0.1])
+    assert top_k(p, 5, minimo=0.5).tolist() == [(0, 0.9), (2, 0.5), (3, 0.5)]
+    assert top_k(p, 5, soporte=[1, 5, 1, 5, 5], min_soporte=2).tolist() == [(3, 0.5), (1, 0.2), (4, 0.1)]
+    assert top_k(p, 2, excluir=0).tolist() == [(2, 0.5), (3, 0.5)]
+    assert top_k(p, 2, indices=np.arange(10, 15)).tolist() == [(10, 0.9), (12, 0.5)]
+
+    P = np.tile(p, (2, 1))
+    top = top_k_filas(P, 2, minimo=0.3, excluir=[0, 2])
+    assert top[0].tolist() == [(2, 0.5), (3, 0.5)]
+    assert top[1].tolist() == [(0, 0.9), (3, 0.5)]
+
+
+def test_pares_como_arreglo():
+    pares = [(0, 0.3, [1]), (1, float("nan"), None), (2, 0.7, [2]), (3, 0.3, [3])]
+    assert top_k_pares(pares, 2).tolist() == [(2, 0.7), (0, 0.3)]
+    assert top_k_pares(pares, 5, minimo=0.5).tolist() == [(2, 0.7)]
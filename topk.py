@@ -0,0 +1,123 @@
+# topk.py
+# ===============================================================
+# SELECCIÓN TOP-K PARCIAL
+# ===============================================================
+# Para quedarse con los k mejores no hace falta ordenar todo:
+#   sorted(lista)[:k]          O(n log n), y la lista guarda tuplas Python
+#   selección parcial + orden  O(n + k log k) sobre arreglos NumPy
+# El resultado es un arreglo estructurado (indice, puntaje): 16 bytes por
+# elemento, sin tuplas ni copias de sub-vectores. .tolist() devuelve la
+# lista [(indice, puntaje)] de siempre si hace falta.
+#
+# Criterio común a todas las funciones:
+#  - de mayor a menor puntaje; a igual puntaje, primero la posición anterior
+#    (el mismo resultado que sorted(..., reverse=True)[:k])
+#  - NaN y -inf nunca se seleccionan (-inf marca "excluido")
+#  - minimo: descarta puntajes menores que el umbral
+#  - soporte / min_soporte: descarta elementos con poco respaldo, p. ej.
+#    vecinos con menos de min_soporte películas calificadas en común
+# ===============================================================
+
+import heapq
+
+import numpy as np
+
+VECINO = np.dtype([("indice", np.int64), ("puntaje", np.float64)])
+
+
+# -------------------------
+# _filtrar
+# -------------------------
+# Copia de los puntajes con -inf en todo lo que no debe seleccionarse.
+def _filtrar(puntajes, minimo, soporte, min_soporte):
+    p = np.array(puntajes, dtype=float)
+    invalidos = ~(p > -np.inf)
+    if minimo is not None:
+        invalidos |= p < minimo
+    if soporte is not None and min_soporte is not None:
+        invalidos |= np.asarray(soporte).reshape(p.shape) < min_soporte
+    p[invalidos] = -np.inf
+    return p
+
+
+# -------------------------
+# top_k
+# -------------------------
+def top_k(puntajes, k, minimo=None, soporte=None, min_soporte=None, excluir=None, indices=None):
+    """
+    Los k mejores de un vector de puntajes, como arreglo estructurado VECINO.
+    - excluir: posición o posiciones que no pueden elegirse (p. ej. el propio usuario)
+    - indices: identificador de cada posición (por defecto, la posición)
+    - Devuelve como máximo k filas; menos si no quedan elementos válidos.
+    """
+    p = _filtrar(np.ravel(puntajes), minimo, soporte, min_soporte)
+    if excluir is not None:
+        p[excluir] = -np.inf
+    fila = top_k_filas(p[None, :], k, indices=indices)[0]
+    return fila[fila["puntaje"] > -np.inf]
+
+
+# -------------------------
+# top_k_filas
+# -------------------------
+# Por fila: np.argpartition (O(n)) deja los k mayores y el umbral (k-ésimo
+# mayor). Si hay iguales al umbral fuera de los elegidos, en esa fila se
+# eligen los mayores al umbral y, entre los iguales, los de posición más
+# baja hasta completar k. Solo los k elegidos se ordenan.
+def top_k_filas(puntajes, k, minimo=None, soporte=None, min_soporte=None, excluir=None, indices=None):
+    """
+    Los k mejores de cada fila de una matriz (b x n) de puntajes.
+    - excluir: (b,) posición a excluir en cada fila (p. ej. el propio usuario)
+    - Devuelve arreglo estructurado VECINO (b x k'), k' = min(k, n). Las filas
+      con menos de k' válidos se rellenan con indice = -1 y puntaje = -inf.
+    """
+    P = _filtrar(np.atleast_2d(puntajes), minimo, soporte, min_soporte)
+    b, n = P.shape
+    if excluir is not None:
+        P[np.arange(b), np.asarray(excluir, dtype=np.intp)] = -np.inf
+    k = max(min(k, n), 0)
+    resultado = np.empty((b, k), dtype=VECINO)
+    if k == 0:
+        return resultado
+
+    if k < n:
+        particion = np.argpartition(P, n - k, axis=1)
+        posiciones = particion[:, n - k:]
+        umbral = np.take_along_axis(P, particion[:, n - k:n - k + 1], axis=1)
+        iguales = P == umbral
+        empatadas = np.flatnonzero(iguales.sum(axis=1) > (np.take_along_axis(P, posiciones, axis=1) == umbral).sum(axis=1))
+        if len(empatadas):
+            Pe, iguales = P[empatadas], iguales[empatadas]
+            mayores = Pe > umbral[empatadas]
+            faltan = k - mayores.sum(axis=1, keepdims=True)
+            elegidos = mayores | (iguales & (np.cumsum(iguales, axis=1) <= faltan))
+            posiciones[empatadas] = np.nonzero(elegidos)[1].reshape(len(empatadas), k)
+    else:
+        posiciones = np.broadcast_to(np.arange(n), (b, n))
+
+    valores = np.take_along_axis(P, posiciones, axis=1)
+    orden = np.lexsort((posiciones, -valores), axis=1)
+    posiciones = np.take_along_axis(posiciones, orden, axis=1)
+    valores = np.take_along_axis(valores, orden, axis=1)
+
+    validos = valores > -np.inf
+    ids = posiciones if indices is None else np.asarray(indices)[posiciones]
+    resultado["indice"] = np.where(validos, ids, -1)
+    resultado["puntaje"] = valores
+    return resultado
+
+
+# -------------------------
+# top_k_pares
+# -------------------------
+# Para listas o generadores de tuplas (indice, puntaje, ...) como las que
+# devuelven las funciones *_detalle: un montículo de tamaño k (heapq),
+# O(n log k) y memoria O(k); los campos extra (sub-vectores) se descartan.
+def top_k_pares(pares, k, minimo=None):
+    """
+    Los k pares con mayor puntaje (segundo campo) como arreglo VECINO.
+    - minimo: descarta pares con puntaje menor
+    """
+    candidatos = ((p[0], p[1]) for p in pares if p[1] == p[1] and (minimo is None or p[1] >= minimo))
+    mejores = heapq.nlargest(k, candidatos, key=lambda p: p[1])
+    return np.array(mejores, dtype=VECINO)
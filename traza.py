@@ -0,0 +1,55 @@
+# traza.py
+# ===============================================================
+# TRAZA EXPLICATIVA: REGISTRO ESTRUCTURADO DE LOS PASOS DE CÁLCULO
+# ===============================================================
+# Las funciones *_detalle de cada recomendador explican cada suma, norma y
+# producto. Por defecto lo imprimen en consola; si reciben un objeto Traza,
+# los pasos se guardan como eventos (sección, texto) en lugar de imprimirse.
+# Las funciones silenciosas (sin sufijo _detalle) no construyen texto alguno.
+# ===============================================================
+
+
+# -------------------------
+# Traza
+# -------------------------
+class Traza:
+    """
+    Registro de pasos explicativos.
+    - eventos: lista de tuplas (seccion, texto) en orden de emisión
+    - seccion: nombre de la función que generó el paso
+    """
+
+    def __init__(self):
+        self.eventos = []
+
+    def registrar(self, seccion, texto):
+        self.eventos.append((seccion, texto))
+
+    def secciones(self):
+        """Nombres de sección en orden de primera aparición."""
+        return list(dict.fromkeys(seccion for seccion, _ in self.eventos))
+
+    def texto(self, seccion=None):
+        """Texto completo (o de una sola sección), igual al que se imprimiría."""
+        return "\n".join(t for s, t in self.eventos if seccion is None or s == seccion)
+
+    def __len__(self):
+        return len(self.eventos)
+
+    def __str__(self):
+        return self.texto()
+
+
+# -------------------------
+# salida_para
+# -------------------------
+# Devuelve una función con la firma de print: imprime si no hay traza,
+# o registra en la traza bajo la sección indicada.
+def salida_para(traza, seccion):
+    if traza is None:
+        return print
+
+    def registrar(*partes, sep=" "):
+        traza.registrar(seccion, sep.join(str(p) for p in partes))
+
+    return registrar